@@ -6,19 +6,31 @@ import os
 import secrets
 import sys
 import threading
-from typing import Optional, Tuple
+import time
+from typing import Optional, Tuple, Union
 from dotenv import load_dotenv
 
 from app.crypto.pki import load_ca_cert, load_certificate_from_file, validate_certificate, get_cert_fingerprint
-from app.crypto.dh import generate_private_key, compute_public_value, compute_shared_secret, derive_session_key, generate_dh_parameters
-from app.crypto.aes import encrypt_aes128, decrypt_aes128
+from app.crypto.dh import (
+    generate_private_key, compute_public_value, compute_shared_secret, derive_session_key, generate_dh_parameters,
+    validate_public_value, DH_GROUPS, DEFAULT_GROUP, X25519_GROUP, HANDSHAKE_CLASSIC, HANDSHAKE_COLLAPSED,
+    generate_group_keypair, compute_group_secret, derive_handshake_keys
+)
+from app.crypto.aes import encrypt_aes128, SessionCipher
 from app.crypto.sign import load_private_key, load_public_key_from_cert, sign_data, verify_signature
+from app.crypto.ticket import derive_resumption_secret, derive_resumed_session_key
+from app.crypto.integrity import (
+    INTEGRITY_RSA, INTEGRITY_HMAC, CLIENT_TO_SERVER, SERVER_TO_CLIENT, MessageAuthenticator, HashChain,
+    checkpoint_data
+)
 from app.common.protocol import (
     HelloMessage, ServerHelloMessage, RegisterMessage, LoginMessage,
-    DHClientMessage, DHServerMessage, ChatMessage, SessionReceipt
+    DHClientMessage, DHServerMessage, TicketMessage, CheckpointMessage, SessionReceipt
 )
 from app.common.utils import now_ms, b64e, b64d, sha256_hex
-from app.storage.transcript import Transcript
+from app.common.framing import FrameReader, FrameWriter, set_nodelay
+from app.common.wire import ENCODING_JSON, ChatFrame, encode_chat_message, decode_frame
+from app.storage.transcript import Transcript, transcript_options_from_env, receipt_data
 
 
 # Load environment variables
@@ -39,6 +51,8 @@ class SecureChatClient:
         self.host = host
         self.port = port
         self.socket = None
+        self.reader = None
+        self.writer = None
         
         # Certificate and key paths
         self.ca_cert_path = os.getenv("CA_CERT_PATH", "certs/ca_cert.pem")
@@ -61,14 +75,55 @@ class SecureChatClient:
         # Transcript directory
         self.transcript_dir = os.getenv("TRANSCRIPT_DIR", "transcripts")
         os.makedirs(self.transcript_dir, exist_ok=True)
+        self.transcript_options = transcript_options_from_env()
         
         # Sequence number for messages
         self.seqno = 1
+        
+        # Data plane encodings to offer, most preferred first (see app.common.wire)
+        self.wire_encodings = [e.strip() for e in os.getenv("WIRE_ENCODINGS", "binary,json").split(",") if e.strip()]
+        self.wire_encoding = ENCODING_JSON
+        
+        # Message integrity modes to offer, most preferred first (see app.crypto.integrity)
+        self.integrity_modes = [m.strip() for m in os.getenv("INTEGRITY_MODES", "rsa").split(",") if m.strip()]
+        self.integrity = INTEGRITY_RSA
+        
+        # Key agreement groups to offer, most preferred first (x25519 or see app.crypto.dh.DH_GROUPS);
+        # DH_EXPLICIT_PARAMS=1 sends p and g in full like legacy clients
+        self.dh_groups = [g.strip() for g in os.getenv("DH_GROUPS", f"{X25519_GROUP},{DEFAULT_GROUP}").split(",") if g.strip()]
+        self.dh_explicit = os.getenv("DH_EXPLICIT_PARAMS", "0") == "1"
+        self.dh_group: Optional[str] = None
+        
+        # Handshake modes to offer, most preferred first; in a collapsed handshake the
+        # session key comes out of the first exchange instead of a second one
+        self.handshake_modes = [m.strip() for m in os.getenv("HANDSHAKE_MODES", "collapsed,classic").split(",") if m.strip()]
+        self.handshake = HANDSHAKE_CLASSIC
+        self.handshake_session_key: Optional[bytes] = None
+        
+        # Session tickets: resume later without login or DH. SESSION_TICKET_FILE keeps
+        # the ticket (and its resumption secret, so keep the file private) across runs
+        self.session_tickets = os.getenv("SESSION_TICKETS", "1") == "1"
+        self.ticket_file = os.getenv("SESSION_TICKET_FILE")
+        self.session_ticket: Optional[dict] = self.load_ticket()
+        self.server_session_tickets = False
+        self.resumed = False
+        
+        # hmac mode: RSA checkpoint every CHECKPOINT_INTERVAL messages or CHECKPOINT_SECONDS
+        self.checkpoint_interval = int(os.getenv("CHECKPOINT_INTERVAL", 100))
+        self.checkpoint_seconds = float(os.getenv("CHECKPOINT_SECONDS", 30))
+        self.mac: Optional[MessageAuthenticator] = None
+        self.peer_mac: Optional[MessageAuthenticator] = None
+        self.chain: Optional[HashChain] = None
+        self.checkpoint_seq = 0
+        self.checkpoint_time = 0.0
     
     def connect(self):
         """Connect to the server."""
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.connect((self.host, self.port))
+        set_nodelay(self.socket)
+        self.reader = FrameReader(self.socket)
+        self.writer = FrameWriter(self.socket)
         print(f"Connected to server at {self.host}:{self.port}")
     
     def start(self):
@@ -82,8 +137,11 @@ class SecureChatClient:
             if not server_cert:
                 return
             
-            # Phase 2: Registration/Login
-            username = self.authentication(temp_aes_key)
+            # Phase 2: Registration/Login (skipped when resuming from a ticket)
+            if self.resumed:
+                username = self.session_ticket["username"]
+            else:
+                username = self.authentication(temp_aes_key)
             if not username:
                 return
             
@@ -91,12 +149,15 @@ class SecureChatClient:
             session_key = self.key_agreement()
             if not session_key:
                 return
+            if self.server_session_tickets:
+                self.receive_ticket(session_key, username)
             
             # Phase 4: Data Plane (Encrypted Chat)
             transcript = self.data_plane(server_cert, session_key, username)
             
             # Phase 5: Non-Repudiation (Session Receipt)
             self.non_repudiation(server_cert, transcript, username)
+            transcript.close()
             
         except Exception as e:
             print(f"Error in client: {e}")
@@ -114,19 +175,47 @@ class SecureChatClient:
             (server_cert, temp_aes_key) or (None, None) on failure
         """
         try:
+            # Keys from a previous connection never carry over
+            self.handshake_session_key = None
+            self.resumed = False
+            
             # Generate client nonce
             client_nonce = secrets.token_bytes(32)
             
             # Send client hello
             hello = HelloMessage(
                 client_cert=self.client_cert_pem,
-                nonce=b64e(client_nonce)
+                nonce=b64e(client_nonce),
+                encodings=self.wire_encodings,
+                integrity=self.integrity_modes,
+                dh_groups=None if self.dh_explicit else self.dh_groups,
+                handshakes=self.handshake_modes,
+                session_tickets=self.session_tickets,
+                ticket=self.session_ticket["ticket"] if self.session_ticket else None
             )
             self.send_message(self.socket, hello.model_dump_json())
             
             # Receive server hello
             data = self.receive_message(self.socket)
-            server_hello = ServerHelloMessage(**json.loads(data))
+            response = json.loads(data)
+            if response.get('status') == 'error':
+                # Server rejected the hello (e.g. BAD_CERT or BUSY)
+                print(f"Server refused connection: {response.get('message')}")
+                return None, None
+            server_hello = ServerHelloMessage(**response)
+            
+            # Servers without encoding/integrity negotiation report the JSON/RSA defaults
+            self.wire_encoding = server_hello.encoding
+            self.integrity = server_hello.integrity
+            # and no DH group, so p and g are sent in full, in a classic handshake
+            self.dh_group = server_hello.dh_group
+            self.handshake = server_hello.handshake
+            self.server_session_tickets = server_hello.session_tickets
+            self.resumed = bool(server_hello.resumed and self.session_ticket)
+            if self.session_ticket and not self.resumed:
+                # Expired, rotated out or unknown to this server: log in normally
+                print("Session ticket not accepted, logging in")
+                self.session_ticket = None
             
             # Load server certificate
             server_cert = load_certificate_from_file(server_hello.server_cert) if os.path.exists(server_hello.server_cert) else None
@@ -145,8 +234,19 @@ class SecureChatClient:
             
             print(f"Server certificate validated: {error_msg}")
             
-            # Perform temporary DH key exchange for credential encryption
-            temp_aes_key = self.temporary_dh_exchange()
+            if self.resumed:
+                # Ticket accepted: fresh session key from its secret, no DH and no login
+                salt = client_nonce + b64d(server_hello.nonce)
+                self.handshake_session_key = derive_resumed_session_key(b64d(self.session_ticket["secret"]), salt)
+                print(f"Resumed session for {self.session_ticket['username']}")
+                return server_cert, None
+            
+            if self.handshake == HANDSHAKE_COLLAPSED:
+                # Server's share came with the hello: one exchange gives both keys
+                temp_aes_key = self.collapsed_exchange(client_nonce, server_hello)
+            else:
+                # Perform temporary DH key exchange for credential encryption
+                temp_aes_key = self.temporary_dh_exchange()
             if not temp_aes_key:
                 return None, None
             
@@ -166,25 +266,8 @@ class SecureChatClient:
             Temporary AES key or None on failure
         """
         try:
-            # Generate DH parameters
-            p, g = generate_dh_parameters()
-            
-            # Generate client private key
-            client_private_key = generate_private_key()
-            
-            # Compute client public value
-            client_public_value = compute_public_value(client_private_key, p, g)
-            
-            # Send client DH message
-            dh_client = DHClientMessage(g=g, p=p, A=client_public_value)
-            self.send_message(self.socket, dh_client.model_dump_json())
-            
-            # Receive server DH message
-            data = self.receive_message(self.socket)
-            dh_server = DHServerMessage(**json.loads(data))
-            
-            # Compute shared secret
-            shared_secret = compute_shared_secret(client_private_key, dh_server.B, p)
+            # Exchange public values and compute shared secret
+            shared_secret = self.dh_exchange()
             
             # Derive AES key
             aes_key = derive_session_key(shared_secret)
@@ -197,6 +280,66 @@ class SecureChatClient:
             traceback.print_exc()
             return None
     
+    def dh_exchange(self) -> int:
+        """
+        Run one key exchange in the negotiated group (classic DH or X25519).
+        
+        Sends the group ID if the server negotiated one, else p and g in full.
+        
+        Returns:
+            Shared secret Ks
+        """
+        if self.dh_group:
+            # Negotiated group (classic DH or X25519): send its ID
+            client_private_key, client_public_value = generate_group_keypair(self.dh_group)
+            dh_client = DHClientMessage(group=self.dh_group, A=client_public_value)
+        else:
+            # Legacy server: our preferred classic group, p and g in full
+            group = next((name for name in self.dh_groups if name in DH_GROUPS), DEFAULT_GROUP)
+            p, g = generate_dh_parameters(group)
+            
+            # Generate client private key
+            client_private_key = generate_private_key()
+            
+            # Compute client public value
+            client_public_value = compute_public_value(client_private_key, p, g)
+            dh_client = DHClientMessage(g=g, p=p, A=client_public_value)
+        
+        # Send client DH message
+        self.send_message(self.socket, dh_client.model_dump_json(exclude_none=True))
+        
+        # Receive server DH message
+        data = self.receive_message(self.socket)
+        dh_server = DHServerMessage(**json.loads(data))
+        
+        if self.dh_group:
+            return compute_group_secret(self.dh_group, client_private_key, dh_server.B)
+        validate_public_value(dh_server.B, p)
+        return compute_shared_secret(client_private_key, dh_server.B, p)
+    
+    def collapsed_exchange(self, client_nonce: bytes, server_hello: ServerHelloMessage) -> bytes:
+        """
+        Collapsed handshake: answer the DH share from the server hello.
+        
+        Sends our share (the server does not reply to it) and derives both the
+        credential key and the session key from this one exchange.
+        
+        Returns:
+            Temporary (credential) AES key
+        """
+        if server_hello.dh_share is None or not self.dh_group:
+            raise ValueError("Collapsed handshake without a server DH share")
+        
+        client_private_key, client_public_value = generate_group_keypair(self.dh_group)
+        shared_secret = compute_group_secret(self.dh_group, client_private_key, server_hello.dh_share)
+        
+        dh_client = DHClientMessage(group=self.dh_group, A=client_public_value)
+        self.send_message(self.socket, dh_client.model_dump_json(exclude_none=True))
+        
+        salt = client_nonce + b64d(server_hello.nonce)
+        temp_aes_key, self.handshake_session_key = derive_handshake_keys(shared_secret, salt)
+        return temp_aes_key
+    
     def authentication(self, temp_aes_key: bytes) -> Optional[str]:
         """
         Handle authentication: registration or login.
@@ -289,26 +432,14 @@ class SecureChatClient:
         Returns:
             Session AES key or None on failure
         """
+        if self.handshake_session_key:
+            # Collapsed or resumed handshake: derived from the hello exchange, no second exchange
+            print("Session key established")
+            return self.handshake_session_key
+        
         try:
-            # Generate DH parameters
-            p, g = generate_dh_parameters()
-            
-            # Generate client private key
-            client_private_key = generate_private_key()
-            
-            # Compute client public value
-            client_public_value = compute_public_value(client_private_key, p, g)
-            
-            # Send client DH message
-            dh_client = DHClientMessage(g=g, p=p, A=client_public_value)
-            self.send_message(self.socket, dh_client.model_dump_json())
-            
-            # Receive server DH message
-            data = self.receive_message(self.socket)
-            dh_server = DHServerMessage(**json.loads(data))
-            
-            # Compute shared secret
-            shared_secret = compute_shared_secret(client_private_key, dh_server.B, p)
+            # Exchange public values and compute shared secret
+            shared_secret = self.dh_exchange()
             
             # Derive session AES key
             session_key = derive_session_key(shared_secret)
@@ -322,6 +453,42 @@ class SecureChatClient:
             traceback.print_exc()
             return None
     
+    def receive_ticket(self, session_key: bytes, username: str):
+        """Store the session ticket the server sends after key agreement."""
+        try:
+            data = self.receive_message(self.socket)
+            ticket = TicketMessage(**json.loads(data))
+            self.session_ticket = {
+                "ticket": ticket.ticket,
+                "secret": b64e(derive_resumption_secret(session_key)),
+                "username": username,
+                "expires_at": time.time() + ticket.lifetime
+            }
+            self.save_ticket()
+        except Exception as e:
+            print(f"Error receiving session ticket: {e}")
+    
+    def load_ticket(self) -> Optional[dict]:
+        """Load an unexpired session ticket from SESSION_TICKET_FILE, if any."""
+        if not self.session_tickets or not self.ticket_file or not os.path.exists(self.ticket_file):
+            return None
+        try:
+            with open(self.ticket_file, 'r') as f:
+                ticket = json.load(f)
+            if ticket.get("expires_at", 0) > time.time():
+                return ticket
+        except (OSError, ValueError) as e:
+            print(f"Ignoring session ticket file: {e}")
+        return None
+    
+    def save_ticket(self):
+        """Write the session ticket to SESSION_TICKET_FILE (owner-only permissions)."""
+        if not self.ticket_file:
+            return
+        fd = os.open(self.ticket_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.session_ticket, f)
+    
     def data_plane(self, server_cert: object, session_key: bytes, username: str) -> Transcript:
         """
         Handle encrypted chat messages.
@@ -331,7 +498,7 @@ class SecureChatClient:
         """
         # Initialize transcript
         transcript_file = os.path.join(self.transcript_dir, f"client_{username}_{now_ms()}.txt")
-        transcript = Transcript(transcript_file)
+        transcript = Transcript(transcript_file, **self.transcript_options)
         
         # Get server certificate fingerprint
         server_cert_fingerprint = get_cert_fingerprint(server_cert)
@@ -339,14 +506,24 @@ class SecureChatClient:
         # Get server public key
         server_public_key = load_public_key_from_cert(server_cert)
         
+        # Session cipher, built once from the session key
+        cipher = SessionCipher(session_key)
+        
         # Reset sequence number
         self.seqno = 1
         
+        if self.integrity == INTEGRITY_HMAC:
+            self.mac = MessageAuthenticator(session_key, CLIENT_TO_SERVER)
+            self.peer_mac = MessageAuthenticator(session_key, SERVER_TO_CLIENT)
+            self.chain = HashChain()
+            self.checkpoint_seq = 0
+            self.checkpoint_time = time.monotonic()
+        
         print("\n=== Chat Session ===")
         print("Type messages to send, or 'quit' to exit.")
         
         # Start a thread to receive messages
-        receive_thread = threading.Thread(target=self.receive_messages, args=(session_key, server_public_key, transcript, server_cert_fingerprint), daemon=True)
+        receive_thread = threading.Thread(target=self.receive_messages, args=(cipher, server_public_key, transcript, server_cert_fingerprint), daemon=True)
         receive_thread.start()
         
         try:
@@ -355,13 +532,15 @@ class SecureChatClient:
                 message = input().strip()
                 
                 if message.lower() == 'quit':
-                    # Send quit message
+                    # Cover the last messages with a checkpoint, then send quit message
+                    if self.chain and self.chain.seqno > self.checkpoint_seq:
+                        self.send_checkpoint(transcript)
                     self.send_message(self.socket, json.dumps({"type": "quit"}))
                     break
                 
                 if message:
                     # Send message
-                    self.send_chat_message(message, session_key, transcript, server_cert_fingerprint)
+                    self.send_chat_message(message, cipher, transcript, server_cert_fingerprint)
                     
         except KeyboardInterrupt:
             print("\nChat session interrupted")
@@ -372,20 +551,20 @@ class SecureChatClient:
         
         return transcript
     
-    def send_chat_message(self, plaintext: str, session_key: bytes, transcript: Transcript, peer_cert_fingerprint: str):
+    def send_chat_message(self, plaintext: str, cipher: SessionCipher, transcript: Transcript, peer_cert_fingerprint: str):
         """
         Send an encrypted chat message.
         
         Args:
             plaintext: Plaintext message
-            session_key: AES session key
+            cipher: Session cipher
             transcript: Transcript object
             peer_cert_fingerprint: Peer certificate fingerprint
         """
         try:
             # Encrypt message
             plaintext_bytes = plaintext.encode('utf-8')
-            ciphertext = encrypt_aes128(plaintext_bytes, session_key)
+            ciphertext = cipher.encrypt(plaintext_bytes)
             
             # Get timestamp
             timestamp = now_ms()
@@ -395,19 +574,16 @@ class SecureChatClient:
             ts_bytes = timestamp.to_bytes(8, byteorder='big')
             hash_data = seqno_bytes + ts_bytes + ciphertext
             
-            # Sign hash
-            signature = sign_data(hash_data, self.client_private_key)
-            
-            # Create chat message
-            chat_message = ChatMessage(
-                seqno=self.seqno,
-                ts=timestamp,
-                ct=b64e(ciphertext),
-                sig=b64e(signature)
-            )
+            # Sign hash (or tag it, in hmac integrity mode)
+            if self.mac:
+                signature = self.mac.tag(hash_data)
+                self.chain.update(self.seqno, hash_data)
+            else:
+                signature = sign_data(hash_data, self.client_private_key)
             
-            # Send message
-            self.send_message(self.socket, chat_message.model_dump_json())
+            # Encode and send chat message in the negotiated encoding
+            frame = encode_chat_message(self.seqno, timestamp, ciphertext, signature, self.wire_encoding)
+            self.send_message(self.socket, frame)
             
             # Add to transcript
             transcript.append_message(
@@ -421,17 +597,37 @@ class SecureChatClient:
             # Increment sequence number
             self.seqno += 1
             
+            if self.chain and (self.chain.seqno - self.checkpoint_seq >= self.checkpoint_interval
+                               or time.monotonic() - self.checkpoint_time >= self.checkpoint_seconds):
+                self.send_checkpoint(transcript)
+        
         except Exception as e:
             print(f"Error sending message: {e}")
             import traceback
             traceback.print_exc()
     
-    def receive_messages(self, session_key: bytes, server_public_key, transcript: Transcript, server_cert_fingerprint: str):
+    def send_checkpoint(self, transcript: Transcript):
+        """
+        Send an RSA-signed checkpoint over the hash chain (hmac integrity mode).
+        
+        Args:
+            transcript: Transcript object
+        """
+        seqno = self.chain.seqno
+        signature = sign_data(checkpoint_data(seqno, self.chain.head), self.client_private_key)
+        checkpoint = CheckpointMessage(seqno=seqno, chain=self.chain.head.hex(), sig=b64e(signature))
+        self.send_message(self.socket, checkpoint.model_dump_json())
+        transcript.append_checkpoint(checkpoint.seqno, checkpoint.chain, checkpoint.sig)
+        
+        self.checkpoint_seq = seqno
+        self.checkpoint_time = time.monotonic()
+    
+    def receive_messages(self, cipher: SessionCipher, server_public_key, transcript: Transcript, server_cert_fingerprint: str):
         """
         Receive and process messages from server.
         
         Args:
-            session_key: AES session key
+            cipher: Session cipher
             server_public_key: Server public key
             transcript: Transcript object
             server_cert_fingerprint: Server certificate fingerprint
@@ -444,30 +640,29 @@ class SecureChatClient:
                     continue
                 
                 try:
-                    msg_data = json.loads(data)
+                    msg_data = decode_frame(data)
                     
-                    if msg_data.get('type') == 'msg':
+                    if isinstance(msg_data, ChatFrame):
                         # Handle chat message from server
-                        msg = ChatMessage(**msg_data)
+                        msg = msg_data
                         
-                        # Verify signature
-                        seqno_bytes = msg.seqno.to_bytes(8, byteorder='big')
-                        ts_bytes = msg.ts.to_bytes(8, byteorder='big')
-                        ct_bytes = b64d(msg.ct)
-                        hash_data = seqno_bytes + ts_bytes + ct_bytes
-                        signature = b64d(msg.sig)
+                        # Verify signature (or HMAC tag)
+                        if self.peer_mac:
+                            is_valid = self.peer_mac.verify(msg.signed_data, msg.signature)
+                        else:
+                            is_valid = verify_signature(msg.signed_data, msg.signature, server_public_key)
                         
-                        if verify_signature(hash_data, signature, server_public_key):
+                        if is_valid:
                             # Decrypt message
-                            plaintext = decrypt_aes128(ct_bytes, session_key)
+                            plaintext = cipher.decrypt(msg.ciphertext)
                             print(f"Server: {plaintext.decode('utf-8')}")
                             
                             # Add to transcript
                             transcript.append_message(
                                 msg.seqno,
                                 msg.ts,
-                                msg.ct,
-                                msg.sig,
+                                msg.ct_b64,
+                                msg.sig_b64,
                                 server_cert_fingerprint
                             )
                         else:
@@ -500,12 +695,16 @@ class SecureChatClient:
         Generate and send session receipt for non-repudiation.
         """
         try:
-            # Compute transcript hash
+            # The receipt may only vouch for entries that are on disk
+            transcript.commit()
+            
+            # Compute transcript hash (and Merkle root, if kept)
             transcript_hash = transcript.compute_transcript_hash()
+            merkle_root = transcript.compute_merkle_root()
+            merkle_size = transcript.get_entry_count() if merkle_root else None
             
             # Sign transcript hash
-            hash_bytes = bytes.fromhex(transcript_hash)
-            signature = sign_data(hash_bytes, self.client_private_key)
+            signature = sign_data(receipt_data(transcript_hash, merkle_root, merkle_size), self.client_private_key)
             
             # Create session receipt
             receipt = SessionReceipt(
@@ -513,11 +712,13 @@ class SecureChatClient:
                 first_seq=transcript.get_first_seq() or 0,
                 last_seq=transcript.get_last_seq() or 0,
                 transcript_sha256=transcript_hash,
-                sig=b64e(signature)
+                sig=b64e(signature),
+                merkle_root=merkle_root,
+                merkle_size=merkle_size
             )
             
             # Send receipt
-            self.send_message(self.socket, receipt.model_dump_json())
+            self.send_message(self.socket, receipt.model_dump_json(exclude_none=True))
             
             print(f"Session receipt sent. Transcript hash: {transcript_hash}")
             
@@ -526,7 +727,7 @@ class SecureChatClient:
             import traceback
             traceback.print_exc()
     
-    def receive_message(self, sock: socket.socket, timeout: Optional[float] = None) -> str:
+    def receive_message(self, sock: socket.socket, timeout: Optional[float] = None) -> bytes:
         """
         Receive a message from the server.
         
@@ -535,50 +736,39 @@ class SecureChatClient:
             timeout: Socket timeout in seconds
         
         Returns:
-            Message string
+            Message bytes, or b"" on timeout or closed connection
         """
         if timeout:
             sock.settimeout(timeout)
         
+        if self.reader is None or self.reader.sock is not sock:
+            self.reader = FrameReader(sock)
+        
         try:
-            # Receive message length (first 4 bytes)
-            length_data = sock.recv(4)
-            if not length_data:
-                return ""
-            
-            message_length = int.from_bytes(length_data, byteorder='big')
-            
-            # Receive message data
-            message_data = b""
-            while len(message_data) < message_length:
-                chunk = sock.recv(message_length - len(message_data))
-                if not chunk:
-                    break
-                message_data += chunk
-            
-            return message_data.decode('utf-8')
+            frame = self.reader.read_frame()
+            if frame is None:
+                return b""
+            return bytes(frame)
         except socket.timeout:
-            return ""
+            return b""
         except Exception as e:
             print(f"Error receiving message: {e}")
-            return ""
+            return b""
     
-    def send_message(self, sock: socket.socket, message: str):
+    def send_message(self, sock: socket.socket, message: Union[str, bytes]):
         """
         Send a message to the server.
         
         Args:
             sock: Socket
-            message: Message string
+            message: Message string (UTF-8 encoded) or encoded frame bytes
         """
-        message_bytes = message.encode('utf-8')
-        message_length = len(message_bytes)
-        
-        # Send message length (4 bytes)
-        sock.sendall(message_length.to_bytes(4, byteorder='big'))
+        if self.writer is None or self.writer.sock is not sock:
+            self.writer = FrameWriter(sock)
+        message_bytes = message.encode('utf-8') if isinstance(message, str) else message
         
-        # Send message data
-        sock.sendall(message_bytes)
+        # Length prefix and body go out in a single sendmsg call
+        self.writer.send_frame(message_bytes)
 
 
 def main():
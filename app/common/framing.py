@@ -0,0 +1,193 @@
+"""Length-prefixed framing: 4-byte big-endian length || payload."""
+
+import socket
+import threading
+from typing import Iterator, Optional
+
+
+HEADER_SIZE = 4
+DEFAULT_BUFFER_SIZE = 64 * 1024
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+MAX_IOVECS = 512  # buffers per sendmsg call, well under the usual IOV_MAX of 1024
+
+
+class FrameReader:
+    """
+    Buffered reader for length-prefixed frames.
+    
+    Reads into one reusable bytearray with recv_into, so a frame is never
+    rebuilt by concatenating chunks. Partial headers and payloads are kept
+    across calls (including across socket timeouts), and when several frames
+    arrive in one recv they are all served from the buffer without further
+    syscalls.
+    
+    Frames are returned as memoryview slices of the internal buffer. A view
+    is only valid until the next call to read_frame(); copy it (bytes(view))
+    if it must outlive that.
+    """
+    
+    def __init__(self, sock: socket.socket, buffer_size: int = DEFAULT_BUFFER_SIZE, max_frame_size: int = MAX_FRAME_SIZE):
+        """
+        Initialize frame reader.
+        
+        Args:
+            sock: Connected socket to read from
+            buffer_size: Initial receive buffer size in bytes
+            max_frame_size: Largest accepted payload; bigger frames raise ValueError
+        """
+        self.sock = sock
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0  # first unconsumed byte
+        self._end = 0  # end of received data
+    
+    def read_frame(self) -> Optional[memoryview]:
+        """
+        Read the next frame, blocking (subject to the socket timeout) until complete.
+        
+        Returns:
+            Frame payload as a memoryview, or None if the peer closed the connection
+        
+        Raises:
+            socket.timeout: if the socket timeout expires; buffered data is kept
+            ValueError: if the peer announces a frame larger than max_frame_size
+        """
+        while True:
+            frame = self._next_buffered()
+            if frame is not None:
+                return frame
+            if self._fill() == 0:
+                return None
+    
+    def __iter__(self) -> Iterator[memoryview]:
+        """Yield frames until the peer closes the connection."""
+        while True:
+            frame = self.read_frame()
+            if frame is None:
+                return
+            yield frame
+    
+    def pending(self) -> int:
+        """Number of received bytes not yet returned as frames."""
+        return self._end - self._start
+    
+    def frame_ready(self) -> bool:
+        """True if a complete frame is buffered, so read_frame() will not block."""
+        available = self._end - self._start
+        if available < HEADER_SIZE:
+            return False
+        length = int.from_bytes(self._view[self._start:self._start + HEADER_SIZE], byteorder='big')
+        return available >= HEADER_SIZE + length
+    
+    def _next_buffered(self) -> Optional[memoryview]:
+        """Return the next complete frame already in the buffer, if any."""
+        available = self._end - self._start
+        if available < HEADER_SIZE:
+            return None
+        
+        length = int.from_bytes(self._view[self._start:self._start + HEADER_SIZE], byteorder='big')
+        if length > self.max_frame_size:
+            raise ValueError(f"Frame of {length} bytes exceeds limit of {self.max_frame_size}")
+        if available < HEADER_SIZE + length:
+            return None
+        
+        payload_start = self._start + HEADER_SIZE
+        self._start = payload_start + length
+        if self._start == self._end:
+            # Buffer drained: next recv starts at the front again
+            self._start = self._end = 0
+        return self._view[payload_start:payload_start + length]
+    
+    def _fill(self) -> int:
+        """Receive more data into the buffer; returns bytes read (0 on EOF)."""
+        pending = self._end - self._start
+        needed = HEADER_SIZE
+        if pending >= HEADER_SIZE:
+            needed += int.from_bytes(self._view[self._start:self._start + HEADER_SIZE], byteorder='big')
+        
+        if needed > len(self._buf):
+            # Grow into a fresh buffer; earlier views keep the old one alive
+            new_buf = bytearray(max(needed, 2 * len(self._buf)))
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+            self._start, self._end = 0, pending
+        elif self._start and len(self._buf) - self._start < needed:
+            # Not enough room after the pending bytes: move them to the front
+            self._view[:pending] = self._view[self._start:self._end]
+            self._start, self._end = 0, pending
+        
+        n = self.sock.recv_into(self._view[self._end:])
+        self._end += n
+        return n
+
+
+class FrameWriter:
+    """
+    Writer for length-prefixed frames.
+    
+    Each frame goes out as one scatter/gather sendmsg call carrying both the
+    header and the payload, so Nagle's algorithm never holds the payload back
+    waiting for the peer's (delayed) ACK of a separate 4-byte header write.
+    Frames can also be queued and flushed together in a single write.
+    Safe to share between threads.
+    """
+    
+    def __init__(self, sock: socket.socket):
+        """
+        Initialize frame writer.
+        
+        Args:
+            sock: Connected socket to write to
+        """
+        self.sock = sock
+        self._queue = []
+        self._lock = threading.Lock()
+    
+    def send_frame(self, payload: bytes):
+        """Send one frame immediately (after any queued frames)."""
+        with self._lock:
+            self._queue.append(len(payload).to_bytes(HEADER_SIZE, byteorder='big'))
+            self._queue.append(payload)
+            self._flush_locked()
+    
+    def queue_frame(self, payload: bytes):
+        """Queue a frame to be sent by the next flush() or send_frame()."""
+        with self._lock:
+            self._queue.append(len(payload).to_bytes(HEADER_SIZE, byteorder='big'))
+            self._queue.append(payload)
+    
+    def flush(self):
+        """Send all queued frames in as few syscalls as possible."""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        """Write out the queue; caller holds the lock."""
+        buffers, self._queue = self._queue, []
+        if not buffers:
+            return
+        
+        if not hasattr(self.sock, 'sendmsg'):
+            self.sock.sendall(b''.join(buffers))
+            return
+        
+        buffers = [memoryview(b) for b in buffers]
+        while buffers:
+            sent = self.sock.sendmsg(buffers[:MAX_IOVECS])
+            # Drop fully written buffers and trim a partially written one
+            while buffers and sent >= len(buffers[0]):
+                sent -= len(buffers[0])
+                buffers.pop(0)
+            if buffers and sent:
+                buffers[0] = buffers[0][sent:]
+
+
+def set_nodelay(sock: socket.socket):
+    """Disable Nagle's algorithm on a TCP socket (no-op for other sockets)."""
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
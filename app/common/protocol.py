@@ -1,7 +1,7 @@
-"""Pydantic models: hello, server_hello, register, login, dh_client, dh_server, msg, receipt."""
+"""Pydantic models: hello, server_hello, register, login, dh_client, dh_server, ticket, msg, checkpoint, receipt."""
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class HelloMessage(BaseModel):
@@ -9,6 +9,12 @@ class HelloMessage(BaseModel):
     type: str = "hello"
     client_cert: str  # PEM encoded certificate
     nonce: str  # base64 encoded nonce
+    encodings: Optional[List[str]] = None  # data plane encodings offered (see app.common.wire)
+    integrity: Optional[List[str]] = None  # message integrity modes offered (see app.crypto.integrity)
+    dh_groups: Optional[List[str]] = None  # named DH groups offered (see app.crypto.dh.DH_GROUPS)
+    handshakes: Optional[List[str]] = None  # handshake modes offered (see app.crypto.dh.SUPPORTED_HANDSHAKES)
+    session_tickets: bool = False  # client accepts a session ticket after key agreement
+    ticket: Optional[str] = None  # session ticket presented to resume (see app.crypto.ticket)
 
 
 class ServerHelloMessage(BaseModel):
@@ -16,6 +22,13 @@ class ServerHelloMessage(BaseModel):
     type: str = "server_hello"
     server_cert: str  # PEM encoded certificate
     nonce: str  # base64 encoded nonce
+    encoding: str = "json"  # data plane encoding chosen by the server
+    integrity: str = "rsa"  # message integrity mode chosen by the server
+    dh_group: Optional[str] = None  # named DH group chosen by the server (None: send explicit p, g)
+    handshake: str = "classic"  # handshake mode chosen by the server
+    dh_share: Optional[int] = None  # server public value B (collapsed handshake only)
+    session_tickets: bool = False  # server sends a session ticket after key agreement
+    resumed: bool = False  # ticket accepted: straight to the data plane
 
 
 class RegisterMessage(BaseModel):
@@ -35,10 +48,11 @@ class LoginMessage(BaseModel):
 
 
 class DHClientMessage(BaseModel):
-    """Diffie-Hellman client message with public parameters."""
+    """Diffie-Hellman client message: a named group or explicit parameters, and the public value."""
     type: str = "dh_client"
-    g: int  # generator
-    p: int  # prime modulus
+    group: Optional[str] = None  # named group ID (replaces p and g)
+    g: Optional[int] = None  # generator (explicit parameters only)
+    p: Optional[int] = None  # prime modulus (explicit parameters only)
     A: int  # public value g^a mod p
 
 
@@ -54,7 +68,22 @@ class ChatMessage(BaseModel):
     seqno: int  # sequence number
     ts: int  # timestamp in milliseconds
     ct: str  # base64 encoded ciphertext
-    sig: str  # base64 encoded RSA signature
+    sig: str  # base64 encoded RSA signature (HMAC-SHA256 tag in hmac integrity mode)
+
+
+class TicketMessage(BaseModel):
+    """Session ticket for resuming later, sent after key agreement."""
+    type: str = "ticket"
+    ticket: str  # opaque, sealed by the server
+    lifetime: int  # seconds the ticket stays valid
+
+
+class CheckpointMessage(BaseModel):
+    """RSA-signed hash chain head, sent periodically in hmac integrity mode."""
+    type: str = "checkpoint"
+    seqno: int  # last message covered
+    chain: str  # hexadecimal hash chain head after that message
+    sig: str  # base64 encoded RSA signature over checkpoint_data(seqno, chain)
 
 
 class SessionReceipt(BaseModel):
@@ -64,4 +93,6 @@ class SessionReceipt(BaseModel):
     first_seq: int  # first sequence number
     last_seq: int  # last sequence number
     transcript_sha256: str  # hexadecimal SHA-256 hash of transcript
-    sig: str  # base64 encoded RSA signature
+    sig: str  # base64 encoded RSA signature over receipt_data() (app.storage.transcript)
+    merkle_root: Optional[str] = None  # hexadecimal Merkle root over the entries (TRANSCRIPT_MERKLE)
+    merkle_size: Optional[int] = None  # number of entries under merkle_root
@@ -0,0 +1,193 @@
+"""Data plane wire encodings: JSON (default) and compact binary.
+
+The encoding is negotiated in the hello exchange (HelloMessage.encodings /
+ServerHelloMessage.encoding) and only changes how the hot data plane frames
+are sent: chat messages and acks. Everything else stays JSON.
+
+Binary frames start with a tag byte below 0x20, which can never start a JSON
+frame, so decode_frame() accepts either encoding without knowing what was
+negotiated. Chat messages decode to a ChatFrame with every field decoded
+exactly once. Layouts (big-endian):
+
+    msg: 0x01 | seqno u64 | ts u64 | sig_len u16 | ct_len u32 | ct | sig
+    ack: 0x02 | seqno u64
+"""
+
+import json
+import struct
+from binascii import a2b_base64
+from typing import List, Optional, Union
+
+from pydantic import ValidationError
+
+from app.common.protocol import ChatMessage
+from app.common.utils import b64e
+
+
+ENCODING_JSON = "json"
+ENCODING_BINARY = "binary"
+
+# In order of preference
+SUPPORTED_ENCODINGS = [ENCODING_BINARY, ENCODING_JSON]
+
+TAG_MSG = 0x01
+TAG_ACK = 0x02
+
+MSG_HEADER = struct.Struct('>BQQHI')
+ACK_FRAME = struct.Struct('>BQ')
+
+# seqno (8 bytes) || timestamp (8 bytes) prefix of the signed data
+SIGNED_PREFIX_SIZE = 16
+
+
+class ChatFrame:
+    """
+    Decoded chat message, each field decoded exactly once.
+    
+    signed_data holds seqno || ts || ciphertext, the exact bytes covered by
+    the sender's RSA signature, and ciphertext is a memoryview into that same
+    buffer, so the signature verifier and the decryptor share one copy.
+    Base64 forms (needed for the transcript) are kept from JSON frames or
+    computed lazily for binary ones.
+    """
+    
+    __slots__ = ('seqno', 'ts', 'signed_data', 'ciphertext', 'signature', '_ct_b64', '_sig_b64')
+    
+    type = "msg"
+    
+    def __init__(self, seqno: int, ts: int, signed_data: bytes, signature: bytes,
+                 ct_b64: Optional[str] = None, sig_b64: Optional[str] = None):
+        """
+        Initialize chat frame.
+        
+        Args:
+            seqno: Sequence number
+            ts: Timestamp in milliseconds
+            signed_data: seqno (8 bytes) || ts (8 bytes) || ciphertext
+            signature: Raw RSA signature
+            ct_b64: Base64 ciphertext, if already known
+            sig_b64: Base64 signature, if already known
+        """
+        self.seqno = seqno
+        self.ts = ts
+        self.signed_data = signed_data
+        self.ciphertext = memoryview(signed_data)[SIGNED_PREFIX_SIZE:]
+        self.signature = signature
+        self._ct_b64 = ct_b64
+        self._sig_b64 = sig_b64
+    
+    @classmethod
+    def from_message(cls, msg: ChatMessage) -> "ChatFrame":
+        """Build from a validated ChatMessage, decoding ct and sig once."""
+        signed_data = b''.join((
+            msg.seqno.to_bytes(8, byteorder='big'),
+            msg.ts.to_bytes(8, byteorder='big'),
+            a2b_base64(msg.ct)
+        ))
+        return cls(msg.seqno, msg.ts, signed_data, a2b_base64(msg.sig), msg.ct, msg.sig)
+    
+    @property
+    def ct_b64(self) -> str:
+        """Base64 ciphertext, as stored in the transcript."""
+        if self._ct_b64 is None:
+            self._ct_b64 = b64e(self.ciphertext)
+        return self._ct_b64
+    
+    @property
+    def sig_b64(self) -> str:
+        """Base64 signature, as stored in the transcript."""
+        if self._sig_b64 is None:
+            self._sig_b64 = b64e(self.signature)
+        return self._sig_b64
+
+
+def negotiate_encoding(offered: Optional[List[str]]) -> str:
+    """Pick our most preferred encoding the peer offered; JSON for legacy peers."""
+    if offered:
+        for encoding in SUPPORTED_ENCODINGS:
+            if encoding in offered:
+                return encoding
+    return ENCODING_JSON
+
+
+def encode_chat_message(seqno: int, ts: int, ciphertext: bytes, signature: bytes, encoding: str) -> bytes:
+    """
+    Encode a chat message frame.
+    
+    Args:
+        seqno: Sequence number
+        ts: Timestamp in milliseconds
+        ciphertext: Raw ciphertext
+        signature: Raw RSA signature
+        encoding: ENCODING_JSON or ENCODING_BINARY
+    
+    Returns:
+        Frame payload
+    """
+    if encoding == ENCODING_BINARY:
+        header = MSG_HEADER.pack(TAG_MSG, seqno, ts, len(signature), len(ciphertext))
+        return b''.join((header, ciphertext, signature))
+    
+    return json.dumps({
+        "type": "msg",
+        "seqno": seqno,
+        "ts": ts,
+        "ct": b64e(ciphertext),
+        "sig": b64e(signature)
+    }).encode('utf-8')
+
+
+def encode_ack(seqno: int, encoding: str) -> bytes:
+    """Encode an acknowledgment frame."""
+    if encoding == ENCODING_BINARY:
+        return ACK_FRAME.pack(TAG_ACK, seqno)
+    return json.dumps({"status": "ack", "seqno": seqno}).encode('utf-8')
+
+
+def decode_frame(data: bytes) -> Union[ChatFrame, dict]:
+    """
+    Decode a data plane frame in either encoding.
+    
+    Chat messages become a ChatFrame. JSON chat messages are validated
+    straight from the frame bytes with ChatMessage.model_validate_json
+    (no intermediate dict); binary ones are unpacked without base64. Any
+    other frame is returned as its JSON dict (binary acks decode to the
+    same dict shape as JSON acks).
+    
+    Raises:
+        ValueError: if the frame is malformed (json.JSONDecodeError for bad
+        JSON, pydantic.ValidationError for a bad chat message)
+    """
+    tag = data[0] if data else None
+    
+    if tag == TAG_MSG:
+        if len(data) < MSG_HEADER.size:
+            raise ValueError("Truncated binary chat message")
+        _, seqno, ts, sig_len, ct_len = MSG_HEADER.unpack_from(data)
+        ct_end = MSG_HEADER.size + ct_len
+        if len(data) != ct_end + sig_len:
+            raise ValueError("Binary chat message length mismatch")
+        view = memoryview(data)
+        # seqno and ts are already big-endian u64 at offsets 1..17
+        signed_data = b''.join((view[1:1 + SIGNED_PREFIX_SIZE], view[MSG_HEADER.size:ct_end]))
+        return ChatFrame(seqno, ts, signed_data, bytes(view[ct_end:]))
+    
+    if tag == TAG_ACK:
+        if len(data) != ACK_FRAME.size:
+            raise ValueError("Malformed binary ack")
+        _, seqno = ACK_FRAME.unpack(data)
+        return {"status": "ack", "seqno": seqno}
+    
+    if b'"msg"' in data:
+        # Probably a chat message: validate directly from bytes
+        try:
+            msg = ChatMessage.model_validate_json(data)
+            if msg.type == "msg":
+                return ChatFrame.from_message(msg)
+        except ValidationError:
+            pass
+    
+    frame = json.loads(data)
+    if isinstance(frame, dict) and frame.get('type') == 'msg':
+        return ChatFrame.from_message(ChatMessage(**frame))
+    return frame
@@ -3,6 +3,7 @@
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
+from typing import List
 import os
 
 
@@ -60,3 +61,99 @@ def decrypt_aes128(ciphertext: bytes, key: bytes) -> bytes:
     plaintext = unpadder.update(padded_plaintext) + unpadder.finalize()
     
     return plaintext
+
+
+BLOCK_SIZE = 16
+
+# PKCS#7 pad strings, indexed by pad length
+_PADDING = [bytes([n]) * n for n in range(BLOCK_SIZE + 1)]
+
+
+class SessionCipher:
+    """
+    AES-128(ECB)+PKCS#7 bound to one session key.
+    
+    Created once per session: the key is checked and the Cipher built once,
+    and a single long-lived encryptor and decryptor are reused for every
+    message. ECB carries no state between blocks, so feeding whole padded
+    messages through the same context gives exactly what encrypt_aes128 /
+    decrypt_aes128 produce. Padding is applied and checked inline instead of
+    through a fresh padder object per message.
+    
+    Encryption and decryption use separate contexts, so one thread may send
+    while another receives; each direction is not itself thread-safe.
+    """
+    
+    def __init__(self, key: bytes):
+        """
+        Initialize session cipher.
+        
+        Args:
+            key: The 16-byte AES session key
+        """
+        if len(key) != 16:
+            raise ValueError("AES key must be 16 bytes (128 bits)")
+        
+        cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
+        self._encryptor = cipher.encryptor()
+        self._decryptor = cipher.decryptor()
+    
+    def encrypt(self, plaintext: bytes) -> bytes:
+        """Encrypt one message; same output as encrypt_aes128."""
+        return self._encryptor.update(plaintext + _PADDING[BLOCK_SIZE - len(plaintext) % BLOCK_SIZE])
+    
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        """
+        Decrypt one message; same output as decrypt_aes128.
+        
+        Raises:
+            ValueError: if the ciphertext length or padding is invalid
+        """
+        if not ciphertext or len(ciphertext) % BLOCK_SIZE:
+            # A partial block would stay buffered in the context and corrupt the next message
+            raise ValueError("Ciphertext length must be a non-zero multiple of 16 bytes")
+        return self._unpad(self._decryptor.update(ciphertext))
+    
+    def encrypt_batch(self, plaintexts: List[bytes]) -> List[bytes]:
+        """Encrypt several messages with a single cipher call."""
+        padded = [p + _PADDING[BLOCK_SIZE - len(p) % BLOCK_SIZE] for p in plaintexts]
+        output = self._encryptor.update(b''.join(padded))
+        
+        ciphertexts = []
+        offset = 0
+        for p in padded:
+            end = offset + len(p)
+            ciphertexts.append(output[offset:end])
+            offset = end
+        return ciphertexts
+    
+    def decrypt_batch(self, ciphertexts: List[bytes]) -> List[bytes]:
+        """
+        Decrypt several messages with a single cipher call.
+        
+        Raises:
+            ValueError: if any ciphertext length or padding is invalid
+        """
+        for c in ciphertexts:
+            if not c or len(c) % BLOCK_SIZE:
+                raise ValueError("Ciphertext length must be a non-zero multiple of 16 bytes")
+        output = self._decryptor.update(b''.join(ciphertexts))
+        
+        plaintexts = []
+        offset = 0
+        for c in ciphertexts:
+            end = offset + len(c)
+            n = output[end - 1]
+            if not 1 <= n <= BLOCK_SIZE or output[end - n:end] != _PADDING[n]:
+                raise ValueError("Invalid padding bytes.")
+            plaintexts.append(output[offset:end - n])
+            offset = end
+        return plaintexts
+    
+    @staticmethod
+    def _unpad(padded) -> bytes:
+        """Strip and check PKCS#7 padding."""
+        n = padded[-1]
+        if not 1 <= n <= BLOCK_SIZE or padded[-n:] != _PADDING[n]:
+            raise ValueError("Invalid padding bytes.")
+        return padded[:-n]
@@ -1,15 +1,58 @@
-"""Classic DH helpers + Trunc16(SHA256(Ks)) derivation."""
+"""Classic DH and X25519 helpers + Trunc16(SHA256(Ks)) derivation."""
 
 import secrets
 import hashlib
-from typing import Tuple
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
 
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 
-# Standard DH parameters (RFC 5114)
-# Using a 2048-bit prime for security
-# Note: In production, use well-known safe primes or generate them securely
-DH_P = 0xFFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3BE39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA051015728E5A8AAAC42DAD33170D04507A33A85521ABDF1CBA64ECFB850458DBEF0A8AEA71575D060C7DB3970F85A6E1E4C7ABF5AE8CDB0933D71E8C94E04A25619DCEE3D2261AD2EE6BF12FFA06D98A0864D87602733EC86A64521F2B18177B200CBBE117577A615D6C770988C0BAD946E208E24FA074E5AB3143DB5BFCE0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF
-DH_G = 2
+
+# Named groups (all safe primes with generator 2): the RFC 3526 MODP groups
+# and the RFC 7919 FFDHE groups. A named group is sent as its ID instead of
+# p and g, and the server can trust and precompute for it.
+MODP_2048 = 0xFFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3BE39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA051015728E5A8AACAA68FFFFFFFFFFFFFFFF
+MODP_3072 = 0xFFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3BE39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA051015728E5A8AAAC42DAD33170D04507A33A85521ABDF1CBA64ECFB850458DBEF0A8AEA71575D060C7DB3970F85A6E1E4C7ABF5AE8CDB0933D71E8C94E04A25619DCEE3D2261AD2EE6BF12FFA06D98A0864D87602733EC86A64521F2B18177B200CBBE117577A615D6C770988C0BAD946E208E24FA074E5AB3143DB5BFCE0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF
+MODP_4096 = 0xFFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7EDEE386BFB5A899FA5AE9F24117C4B1FE649286651ECE45B3DC2007CB8A163BF0598DA48361C55D39A69163FA8FD24CF5F83655D23DCA3AD961C62F356208552BB9ED529077096966D670C354E4ABC9804F1746C08CA18217C32905E462E36CE3BE39E772C180E86039B2783A2EC07A28FB5C55DF06F4C52C9DE2BCBF6955817183995497CEA956AE515D2261898FA051015728E5A8AAAC42DAD33170D04507A33A85521ABDF1CBA64ECFB850458DBEF0A8AEA71575D060C7DB3970F85A6E1E4C7ABF5AE8CDB0933D71E8C94E04A25619DCEE3D2261AD2EE6BF12FFA06D98A0864D87602733EC86A64521F2B18177B200CBBE117577A615D6C770988C0BAD946E208E24FA074E5AB3143DB5BFCE0FD108E4B82D120A92108011A723C12A787E6D788719A10BDBA5B2699C327186AF4E23C1A946834B6150BDA2583E9CA2AD44CE8DBBBC2DB04DE8EF92E8EFC141FBECAA6287C59474E6BC05D99B2964FA090C3A2233BA186515BE7ED1F612970CEE2D7AFB81BDD762170481CD0069127D5B05AA993B4EA988D8FDDC186FFB7DC90A6C08F4DF435C934063199FFFFFFFFFFFFFFFF
+FFDHE_2048 = 0xFFFFFFFFFFFFFFFFADF85458A2BB4A9AAFDC5620273D3CF1D8B9C583CE2D3695A9E13641146433FBCC939DCE249B3EF97D2FE363630C75D8F681B202AEC4617AD3DF1ED5D5FD65612433F51F5F066ED0856365553DED1AF3B557135E7F57C935984F0C70E0E68B77E2A689DAF3EFE8721DF158A136ADE73530ACCA4F483A797ABC0AB182B324FB61D108A94BB2C8E3FBB96ADAB760D7F4681D4F42A3DE394DF4AE56EDE76372BB190B07A7C8EE0A6D709E02FCE1CDF7E2ECC03404CD28342F619172FE9CE98583FF8E4F1232EEF28183C3FE3B1B4C6FAD733BB5FCBC2EC22005C58EF1837D1683B2C6F34A26C1B2EFFA886B423861285C97FFFFFFFFFFFFFFFF
+FFDHE_3072 = 0xFFFFFFFFFFFFFFFFADF85458A2BB4A9AAFDC5620273D3CF1D8B9C583CE2D3695A9E13641146433FBCC939DCE249B3EF97D2FE363630C75D8F681B202AEC4617AD3DF1ED5D5FD65612433F51F5F066ED0856365553DED1AF3B557135E7F57C935984F0C70E0E68B77E2A689DAF3EFE8721DF158A136ADE73530ACCA4F483A797ABC0AB182B324FB61D108A94BB2C8E3FBB96ADAB760D7F4681D4F42A3DE394DF4AE56EDE76372BB190B07A7C8EE0A6D709E02FCE1CDF7E2ECC03404CD28342F619172FE9CE98583FF8E4F1232EEF28183C3FE3B1B4C6FAD733BB5FCBC2EC22005C58EF1837D1683B2C6F34A26C1B2EFFA886B4238611FCFDCDE355B3B6519035BBC34F4DEF99C023861B46FC9D6E6C9077AD91D2691F7F7EE598CB0FAC186D91CAEFE130985139270B4130C93BC437944F4FD4452E2D74DD364F2E21E71F54BFF5CAE82AB9C9DF69EE86D2BC522363A0DABC521979B0DEADA1DBF9A42D5C4484E0ABCD06BFA53DDEF3C1B20EE3FD59D7C25E41D2B66C62E37FFFFFFFFFFFFFFFF
+FFDHE_4096 = 0xFFFFFFFFFFFFFFFFADF85458A2BB4A9AAFDC5620273D3CF1D8B9C583CE2D3695A9E13641146433FBCC939DCE249B3EF97D2FE363630C75D8F681B202AEC4617AD3DF1ED5D5FD65612433F51F5F066ED0856365553DED1AF3B557135E7F57C935984F0C70E0E68B77E2A689DAF3EFE8721DF158A136ADE73530ACCA4F483A797ABC0AB182B324FB61D108A94BB2C8E3FBB96ADAB760D7F4681D4F42A3DE394DF4AE56EDE76372BB190B07A7C8EE0A6D709E02FCE1CDF7E2ECC03404CD28342F619172FE9CE98583FF8E4F1232EEF28183C3FE3B1B4C6FAD733BB5FCBC2EC22005C58EF1837D1683B2C6F34A26C1B2EFFA886B4238611FCFDCDE355B3B6519035BBC34F4DEF99C023861B46FC9D6E6C9077AD91D2691F7F7EE598CB0FAC186D91CAEFE130985139270B4130C93BC437944F4FD4452E2D74DD364F2E21E71F54BFF5CAE82AB9C9DF69EE86D2BC522363A0DABC521979B0DEADA1DBF9A42D5C4484E0ABCD06BFA53DDEF3C1B20EE3FD59D7C25E41D2B669E1EF16E6F52C3164DF4FB7930E9E4E58857B6AC7D5F42D69F6D187763CF1D5503400487F55BA57E31CC7A7135C886EFB4318AED6A1E012D9E6832A907600A918130C46DC778F971AD0038092999A333CB8B7A1A1DB93D7140003C2A4ECEA9F98D0ACC0A8291CDCEC97DCF8EC9B55A7F88A46B4DB5A851F44182E1C68A007E5E655F6AFFFFFFFFFFFFFFFF
+
+DH_GROUPS: Dict[str, Tuple[int, int]] = {
+    "modp2048": (MODP_2048, 2),
+    "modp3072": (MODP_3072, 2),
+    "modp4096": (MODP_4096, 2),
+    "ffdhe2048": (FFDHE_2048, 2),
+    "ffdhe3072": (FFDHE_3072, 2),
+    "ffdhe4096": (FFDHE_4096, 2),
+}
+
+# Elliptic-curve key agreement (RFC 7748), negotiated like a named group
+X25519_GROUP = "x25519"
+SUPPORTED_GROUPS = [X25519_GROUP] + list(DH_GROUPS)
+
+# Standard DH parameters: the 3072-bit MODP group (RFC 3526 group 15)
+DEFAULT_GROUP = "modp3072"
+DH_P, DH_G = DH_GROUPS[DEFAULT_GROUP]
+
+# Smallest prime accepted for a custom (unnamed) group
+MIN_CUSTOM_BITS = 2048
+
+# Handshake modes. "classic" runs one exchange for the credential key and a
+# second for the session key. "collapsed" sends the server's share in the
+# server hello and derives both keys from that single exchange.
+HANDSHAKE_CLASSIC = "classic"
+HANDSHAKE_COLLAPSED = "collapsed"
+SUPPORTED_HANDSHAKES = [HANDSHAKE_COLLAPSED, HANDSHAKE_CLASSIC]
+
+# HKDF labels, one per key derived from a collapsed handshake
+CREDENTIAL_KEY_LABEL = b"securechat credential key"
+SESSION_KEY_LABEL = b"securechat session key"
 
 
 def generate_private_key() -> int:
@@ -44,6 +87,291 @@ def derive_session_key(shared_secret: int) -> bytes:
     return hash_value[:16]
 
 
-def generate_dh_parameters() -> Tuple[int, int]:
-    """Generate or return standard DH parameters (p, g)."""
-    return (DH_P, DH_G)
+def x25519_generate_private_key() -> X25519PrivateKey:
+    """Generate a random private key for X25519."""
+    return X25519PrivateKey.generate()
+
+
+def x25519_public_value(private_key: X25519PrivateKey) -> int:
+    """Public value as an integer (the little-endian u-coordinate of RFC 7748), sent as A or B."""
+    raw = private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return int.from_bytes(raw, byteorder='little')
+
+
+def x25519_shared_secret(private_key: X25519PrivateKey, peer_public_value: int) -> int:
+    """
+    Compute the X25519 shared secret.
+    
+    Returned as an integer (the 32-byte output read big-endian) so it feeds
+    derive_session_key exactly like a classic DH shared secret.
+    
+    Raises:
+        ValueError: if the peer value is out of range or a low-order point
+    """
+    if not 0 <= peer_public_value < 1 << 256:
+        raise ValueError("X25519 public value out of range")
+    peer_key = X25519PublicKey.from_public_bytes(peer_public_value.to_bytes(32, byteorder='little'))
+    return int.from_bytes(private_key.exchange(peer_key), byteorder='big')
+
+
+def generate_group_keypair(group: str) -> Tuple[object, int]:
+    """
+    Generate a keypair in a named group or X25519.
+    
+    Returns:
+        (private_key, public_value)
+    """
+    if group == X25519_GROUP:
+        private_key = x25519_generate_private_key()
+        return private_key, x25519_public_value(private_key)
+    p, g = get_group(group)
+    private_key = generate_private_key()
+    return private_key, compute_public_value(private_key, p, g)
+
+
+def compute_group_secret(group: str, private_key: object, peer_public_value: int) -> int:
+    """
+    Compute the shared secret in a named group or X25519.
+    
+    Raises:
+        ValueError: if the peer public value is degenerate
+    """
+    if group == X25519_GROUP:
+        return x25519_shared_secret(private_key, peer_public_value)
+    p, _ = get_group(group)
+    validate_public_value(peer_public_value, p)
+    return compute_shared_secret(private_key, peer_public_value, p)
+
+
+def negotiate_handshake(offered: Optional[List[str]], dh_group: Optional[str]) -> str:
+    """
+    Collapsed if the peer offered it and a named group was agreed (the server
+    picks the group before it has heard the client's share); classic otherwise.
+    """
+    if dh_group and offered and HANDSHAKE_COLLAPSED in offered:
+        return HANDSHAKE_COLLAPSED
+    return HANDSHAKE_CLASSIC
+
+
+def derive_handshake_keys(shared_secret: int, salt: bytes) -> Tuple[bytes, bytes]:
+    """
+    Derive the credential and session keys from one exchange (collapsed handshake).
+    
+    Each key is HKDF-SHA256 over big-endian(Ks), salted with the client and
+    server hello nonces and expanded under its own label, so knowing one key
+    says nothing about the other.
+    
+    Args:
+        shared_secret: Ks from the exchange
+        salt: client nonce || server nonce
+    
+    Returns:
+        (credential AES key, session AES key)
+    """
+    secret_bytes = shared_secret.to_bytes((shared_secret.bit_length() + 7) // 8, byteorder='big')
+    keys = []
+    for label in (CREDENTIAL_KEY_LABEL, SESSION_KEY_LABEL):
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=16, salt=salt, info=label)
+        keys.append(hkdf.derive(secret_bytes))
+    return keys[0], keys[1]
+
+
+def generate_dh_parameters(group: str = DEFAULT_GROUP) -> Tuple[int, int]:
+    """Return the DH parameters (p, g) of a named group (the standard group by default)."""
+    return get_group(group)
+
+
+def get_group(name: str) -> Tuple[int, int]:
+    """
+    Look up a named group.
+    
+    Returns:
+        (p, g)
+    
+    Raises:
+        ValueError: if the name is not a known group
+    """
+    try:
+        return DH_GROUPS[name]
+    except KeyError:
+        raise ValueError(f"Unknown DH group: {name}") from None
+
+
+def find_group(p: int, g: int) -> Optional[str]:
+    """Name of the group with parameters (p, g), or None for a custom group."""
+    for name, params in DH_GROUPS.items():
+        if params == (p, g):
+            return name
+    return None
+
+
+def negotiate_group(offered: Optional[List[str]], supported: List[str]) -> Optional[str]:
+    """Pick the first group the peer offered that we support; None for legacy peers (explicit p, g)."""
+    if offered:
+        for name in offered:
+            if name in supported:
+                return name
+    return None
+
+
+def validate_public_value(public_value: int, p: int):
+    """
+    Reject degenerate peer public values (0, 1, p - 1 and anything outside [0, p)).
+    
+    Raises:
+        ValueError: if the value is out of range
+    """
+    if not 1 < public_value < p - 1:
+        raise ValueError("DH public value out of range")
+
+
+@lru_cache(maxsize=64)
+def is_valid_custom_group(p: int, g: int) -> bool:
+    """
+    Check a custom group: p a safe prime of at least MIN_CUSTOM_BITS and 1 < g < p - 1.
+    
+    The primality tests cost dozens of modular exponentiations, so results
+    are cached per (p, g).
+    """
+    if p.bit_length() < MIN_CUSTOM_BITS or not 1 < g < p - 1:
+        return False
+    return _is_probable_prime(p) and _is_probable_prime((p - 1) // 2)
+
+
+def _is_probable_prime(n: int, rounds: int = 32) -> bool:
+    """Miller-Rabin probable prime test with random bases."""
+    if n < 4:
+        return n in (2, 3)
+    if n % 2 == 0:
+        return False
+    
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    
+    for _ in range(rounds):
+        a = secrets.randbelow(n - 3) + 2
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+class DHKeyPool:
+    """
+    Background-filled pool of precomputed (private, g^x mod p) keypairs.
+    
+    compute_public_value does not depend on the peer, so a refill thread
+    computes keypairs ahead of time and a handshake only has to compute the
+    shared secret inline. When the pool runs dry, acquire() computes a pair
+    inline rather than waiting.
+    
+    By default every pair is handed out once and then dropped (max_uses=1).
+    A larger max_uses lets a pair serve several handshakes, trading forward
+    secrecy between those sessions for fewer exponentiations.
+    """
+    
+    def __init__(self, p: int = DH_P, g: int = DH_G, size: int = 16, low_water: int = 4, max_uses: int = 1):
+        """
+        Initialize the pool and start its refill thread.
+        
+        Args:
+            p: Prime modulus of the group the pairs belong to
+            g: Generator
+            size: Number of pairs to fill up to
+            low_water: Refill starts when fewer pairs than this remain
+            max_uses: Handshakes each pair may serve (1 = single use)
+        """
+        self.p = p
+        self.g = g
+        self.size = size
+        self.low_water = max(1, min(low_water, size))
+        self.max_uses = max(1, max_uses)
+        self.hits = 0
+        self.misses = 0
+        
+        # [private, public, remaining uses]
+        self._pairs: Deque[List[int]] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._top_up = False
+        self._thread = threading.Thread(target=self._refill, name="dh-pool-refill", daemon=True)
+        self._thread.start()
+    
+    def matches(self, p: int, g: int) -> bool:
+        """True if the pool's pairs belong to group (p, g)."""
+        return p == self.p and g == self.g
+    
+    def acquire(self) -> Tuple[int, int]:
+        """
+        Take a keypair for one handshake.
+        
+        Returns:
+            (private_key, public_value)
+        """
+        with self._cond:
+            if self._pairs:
+                pair = self._pairs[0]
+                pair[2] -= 1
+                if pair[2] == 0:
+                    self._pairs.popleft()
+                else:
+                    # Reusable pair: serve others before it comes round again
+                    self._pairs.rotate(-1)
+                self.hits += 1
+                if len(self._pairs) < self.low_water:
+                    self._cond.notify_all()
+                return pair[0], pair[1]
+            self.misses += 1
+            self._cond.notify_all()
+        
+        private_key = generate_private_key()
+        return private_key, compute_public_value(private_key, self.p, self.g)
+    
+    def available(self) -> int:
+        """Number of pairs currently in the pool."""
+        with self._cond:
+            return len(self._pairs)
+    
+    def wait_full(self, timeout: float = None) -> bool:
+        """Top the pool up and block until it is full; returns False on timeout."""
+        with self._cond:
+            self._top_up = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: len(self._pairs) >= self.size or self._closed, timeout)
+    
+    def close(self):
+        """Stop the refill thread and drop all precomputed pairs."""
+        with self._cond:
+            self._closed = True
+            self._pairs.clear()
+            self._cond.notify_all()
+    
+    def _refill(self):
+        """Refill thread: top the pool up to size whenever it drops below low_water."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pairs) < self.low_water or self._top_up or self._closed)
+                if self._closed:
+                    return
+                self._top_up = False
+            
+            while True:
+                with self._cond:
+                    if self._closed:
+                        return
+                    if len(self._pairs) >= self.size:
+                        self._cond.notify_all()
+                        break
+                # Exponentiate without holding the lock so acquire() never waits on it
+                private_key = generate_private_key()
+                public_value = compute_public_value(private_key, self.p, self.g)
+                with self._cond:
+                    self._pairs.append([private_key, public_value, self.max_uses])
@@ -5,9 +5,14 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
 from cryptography.hazmat.backends import default_backend
 from cryptography.x509.oid import NameOID
-from datetime import datetime
-from typing import Optional
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+import hashlib
 import os
+import ssl
+import threading
+import time
 
 
 def load_ca_cert(ca_cert_path: str) -> x509.Certificate:
@@ -133,3 +138,142 @@ def load_certificate_from_file(cert_path: str) -> x509.Certificate:
     """Load certificate from file."""
     with open(cert_path, 'rb') as f:
         return x509.load_pem_x509_certificate(f.read(), default_backend())
+
+
+class CachedCertificate:
+    """A validated certificate with everything a handshake needs from it."""
+    
+    __slots__ = ('cert', 'fingerprint', 'public_key', 'expires_at', 'results')
+    
+    def __init__(self, cert: x509.Certificate, fingerprint: str):
+        """
+        Initialize cache entry.
+        
+        Args:
+            cert: Parsed certificate
+            fingerprint: SHA-256 fingerprint (hex)
+        """
+        self.cert = cert
+        self.fingerprint = fingerprint
+        self.public_key = cert.public_key()
+        self.expires_at = _not_valid_after_timestamp(cert)
+        # (CA fingerprint, expected CN) -> validation message, successful validations only
+        self.results: Dict[Tuple[str, Optional[str]], str] = {}
+
+
+class CertificateCache:
+    """
+    Size-bounded LRU cache of validated certificates, keyed by fingerprint.
+    
+    A hit skips PEM parsing, the RSA check of the CA signature and public
+    key extraction; the fingerprint is computed from the PEM's DER bytes
+    without parsing. Entries expire at the certificate's not_valid_after.
+    Only successful validations are cached, so certificates that fail (for
+    example junk sent by an unauthenticated peer) can never evict good
+    entries, and a not-yet-valid certificate is re-checked next time.
+    Safe to share between threads.
+    """
+    
+    def __init__(self, max_size: int = 1024):
+        """
+        Initialize certificate cache.
+        
+        Args:
+            max_size: Maximum number of certificates kept
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedCertificate]" = OrderedDict()
+        self._lock = threading.Lock()
+        # id(ca_cert) -> (ca_cert, fingerprint); holding the cert keeps the id from being reused
+        self._ca_fingerprints: Dict[int, Tuple[x509.Certificate, str]] = {}
+    
+    def validate_pem(
+        self,
+        pem_data: str,
+        ca_cert: x509.Certificate,
+        expected_cn: Optional[str] = None
+    ) -> Tuple[Optional[CachedCertificate], bool, str]:
+        """
+        Parse and validate a PEM certificate, using the cache when possible.
+        
+        Args:
+            pem_data: PEM encoded certificate
+            ca_cert: Trusted CA certificate
+            expected_cn: Required Common Name, if any
+        
+        Returns:
+            (entry, is_valid, message); entry is None only if the PEM cannot be parsed
+        """
+        key = (self._ca_fingerprint(ca_cert), expected_cn)
+        fingerprint = _pem_fingerprint(pem_data)
+        entry = None
+        
+        if fingerprint is not None:
+            with self._lock:
+                entry = self._entries.get(fingerprint)
+                if entry is not None and time.time() > entry.expires_at:
+                    del self._entries[fingerprint]
+                    entry = None
+                if entry is not None and key in entry.results:
+                    self._entries.move_to_end(fingerprint)
+                    self.hits += 1
+                    return entry, True, entry.results[key]
+                self.misses += 1
+        else:
+            with self._lock:
+                self.misses += 1
+        
+        if entry is None:
+            try:
+                cert = load_cert_from_pem(pem_data)
+            except Exception as e:
+                return None, False, f"BAD_CERT: Cannot parse certificate: {str(e)}"
+            entry = CachedCertificate(cert, get_cert_fingerprint(cert))
+        
+        is_valid, message = validate_certificate(entry.cert, ca_cert, expected_cn)
+        if is_valid:
+            with self._lock:
+                entry.results[key] = message
+                self._entries[entry.fingerprint] = entry
+                self._entries.move_to_end(entry.fingerprint)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return entry, is_valid, message
+    
+    def _ca_fingerprint(self, ca_cert: x509.Certificate) -> str:
+        """Fingerprint of a CA certificate, computed once per certificate object."""
+        cached = self._ca_fingerprints.get(id(ca_cert))
+        if cached is None or cached[0] is not ca_cert:
+            if len(self._ca_fingerprints) >= 16:
+                self._ca_fingerprints.clear()
+            cached = (ca_cert, get_cert_fingerprint(ca_cert))
+            self._ca_fingerprints[id(ca_cert)] = cached
+        return cached[1]
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+    
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+
+def _pem_fingerprint(pem_data: str) -> Optional[str]:
+    """SHA-256 fingerprint of a PEM certificate without parsing it (None if not plain PEM)."""
+    try:
+        return hashlib.sha256(ssl.PEM_cert_to_DER_cert(pem_data.strip())).hexdigest()
+    except Exception:
+        return None
+
+
+def _not_valid_after_timestamp(cert: x509.Certificate) -> float:
+    """Certificate expiry as a POSIX timestamp."""
+    not_valid_after = getattr(cert, 'not_valid_after_utc', None)
+    if not_valid_after is None:
+        not_valid_after = cert.not_valid_after.replace(tzinfo=timezone.utc)
+    return not_valid_after.timestamp()
@@ -2,9 +2,14 @@
 
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from cryptography.hazmat.primitives.serialization import (
+    load_pem_private_key, load_pem_public_key, load_der_public_key, Encoding, PublicFormat
+)
 from cryptography.hazmat.backends import default_backend
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 import hashlib
+import multiprocessing
 
 
 def load_private_key(key_path: str) -> rsa.RSAPrivateKey:
@@ -71,3 +76,143 @@ def verify_signature(data: bytes, signature: bytes, public_key: rsa.RSAPublicKey
         return True
     except Exception:
         return False
+
+
+# Smallest number of operations sent to a worker as one task (amortizes IPC)
+MIN_CHUNK = 8
+
+# Public keys kept per worker process, keyed by certificate fingerprint
+PUBLIC_KEY_CACHE_SIZE = 1024
+
+# Per-worker state, set up by _init_worker in each pool process
+_worker_private_key: Optional[rsa.RSAPrivateKey] = None
+_worker_public_keys: Dict[str, rsa.RSAPublicKey] = {}
+
+
+def _init_worker(private_key_path: Optional[str]):
+    """Pool process initializer: load the signing key once per worker."""
+    global _worker_private_key
+    if private_key_path:
+        _worker_private_key = load_private_key(private_key_path)
+
+
+def _worker_public_key(fingerprint: str, public_key_der: bytes) -> rsa.RSAPublicKey:
+    """Return the worker's cached public key for a certificate fingerprint."""
+    public_key = _worker_public_keys.get(fingerprint)
+    if public_key is None:
+        if len(_worker_public_keys) >= PUBLIC_KEY_CACHE_SIZE:
+            # Evict the oldest entry
+            del _worker_public_keys[next(iter(_worker_public_keys))]
+        public_key = load_der_public_key(public_key_der, backend=default_backend())
+        _worker_public_keys[fingerprint] = public_key
+    return public_key
+
+
+def _verify_chunk(fingerprint: str, public_key_der: bytes, items: List[Tuple[bytes, bytes]]) -> List[bool]:
+    """Verify (data, signature) pairs in a pool process."""
+    public_key = _worker_public_key(fingerprint, public_key_der)
+    return [verify_signature(data, signature, public_key) for data, signature in items]
+
+
+def _sign_chunk(items: List[bytes]) -> List[bytes]:
+    """Sign data items in a pool process."""
+    if _worker_private_key is None:
+        raise ValueError("CryptoExecutor was created without a private key")
+    return [sign_data(data, _worker_private_key) for data in items]
+
+
+class CryptoExecutor:
+    """
+    Runs RSA sign/verify on a process pool.
+    
+    RSA operations hold the interpreter for their whole duration, so doing
+    them on connection threads caps one session's throughput and stalls every
+    other session. The executor moves them to worker processes. Public keys
+    are shipped as DER with their certificate fingerprint and parsed once per
+    worker; the signing key is loaded once per worker from its file.
+    
+    Batch calls split their items into contiguous chunks, one task each, and
+    yield results in input order, so callers can apply sequence-number
+    checks exactly as if every item had been handled inline.
+    """
+    
+    def __init__(self, workers: int, private_key_path: Optional[str] = None):
+        """
+        Initialize crypto executor.
+        
+        Args:
+            workers: Number of worker processes
+            private_key_path: PEM private key for sign(); None for verify-only
+        """
+        self.workers = workers
+        # spawn, not fork: the pool is started lazily from threaded servers
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(private_key_path,)
+        )
+        self._public_key_der: Dict[str, bytes] = {}
+    
+    def verify(self, data: bytes, signature: bytes, public_key: rsa.RSAPublicKey, fingerprint: str) -> "Future[bool]":
+        """Verify one signature; the future resolves to True if it is valid."""
+        future = self._pool.submit(_verify_chunk, fingerprint, self._der(public_key, fingerprint), [(bytes(data), signature)])
+        result: "Future[bool]" = Future()
+        future.add_done_callback(lambda f: _resolve_first(f, result))
+        return result
+    
+    def verify_batch(self, items: List[Tuple[bytes, bytes]], public_key: rsa.RSAPublicKey, fingerprint: str) -> Iterator[bool]:
+        """
+        Verify (data, signature) pairs signed by one key.
+        
+        All chunks are submitted before this returns; the iterator then
+        yields each verdict in input order, blocking only until the chunk
+        holding it is done.
+        """
+        public_key_der = self._der(public_key, fingerprint)
+        items = [(bytes(data), signature) for data, signature in items]
+        futures = [self._pool.submit(_verify_chunk, fingerprint, public_key_der, chunk) for chunk in self._chunks(items)]
+        return (verdict for future in futures for verdict in future.result())
+    
+    def sign(self, data: bytes) -> "Future[bytes]":
+        """Sign data with the executor's private key."""
+        future = self._pool.submit(_sign_chunk, [bytes(data)])
+        result: "Future[bytes]" = Future()
+        future.add_done_callback(lambda f: _resolve_first(f, result))
+        return result
+    
+    def sign_batch(self, items: List[bytes]) -> Iterator[bytes]:
+        """Sign several data items; signatures are yielded in input order."""
+        futures = [self._pool.submit(_sign_chunk, chunk) for chunk in self._chunks([bytes(d) for d in items])]
+        return (signature for future in futures for signature in future.result())
+    
+    def shutdown(self):
+        """Stop the worker processes."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _der(self, public_key: rsa.RSAPublicKey, fingerprint: str) -> bytes:
+        """DER SubjectPublicKeyInfo for a key, serialized once per fingerprint."""
+        der = self._public_key_der.get(fingerprint)
+        if der is None:
+            if len(self._public_key_der) >= PUBLIC_KEY_CACHE_SIZE:
+                del self._public_key_der[next(iter(self._public_key_der))]
+            der = public_key.public_bytes(Encoding.DER, PublicFormat.SubjectPublicKeyInfo)
+            self._public_key_der[fingerprint] = der
+        return der
+    
+    def _chunks(self, items: list) -> List[list]:
+        """Split items into at most one contiguous chunk per worker."""
+        size = max(MIN_CHUNK, -(-len(items) // self.workers))
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _resolve_first(future: Future, result: Future):
+    """Complete result with the single item of a one-item chunk future."""
+    if future.cancelled():
+        result.cancel()
+        return
+    exception = future.exception()
+    if exception is not None:
+        result.set_exception(exception)
+    else:
+        result.set_result(future.result()[0])
@@ -0,0 +1,185 @@
+"""Session resumption tickets: AES-GCM sealed (username, cert fingerprint, secret).
+
+After key agreement the server sends the client an opaque ticket. Both sides
+derive the ticket's resumption secret from the session key, so the secret
+itself never crosses the wire. On reconnect the client presents the ticket
+in its hello; if it opens, has not expired and names the same client
+certificate, the server skips the credential DH, the login and the session
+key exchange, and both sides derive a fresh session key from the secret and
+the two hello nonces.
+
+    resumption secret  = HKDF-SHA256(session key, info = "securechat resumption secret")
+    resumed session key = HKDF-SHA256(secret, salt = client nonce || server nonce,
+                                      info = "securechat resumed session key")
+    ticket = base64(epoch u32 || nonce (12) || AES-256-GCM(key_epoch, payload, aad = epoch))
+
+Ticket keys rotate every rotation period (one key per epoch). With a
+configured master secret the epoch keys are derived from it, so every
+server process (and a restarted server) accepts the same tickets; without
+one each process draws random epoch keys and forgets them once every
+ticket they sealed has expired.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from app.common.utils import b64e, b64d
+
+
+RESUMPTION_SECRET_LABEL = b"securechat resumption secret"
+RESUMED_KEY_LABEL = b"securechat resumed session key"
+TICKET_KEY_LABEL = b"securechat ticket key"
+
+EPOCH_SIZE = 4
+NONCE_SIZE = 12
+
+
+def _hkdf(secret: bytes, length: int, info: bytes, salt: Optional[bytes] = None) -> bytes:
+    """HKDF-SHA256."""
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=salt, info=info).derive(secret)
+
+
+def derive_resumption_secret(session_key: bytes) -> bytes:
+    """Resumption secret bound into a ticket issued for a session."""
+    return _hkdf(session_key, 32, RESUMPTION_SECRET_LABEL)
+
+
+def derive_resumed_session_key(resumption_secret: bytes, salt: bytes) -> bytes:
+    """
+    Fresh AES-128 session key for a resumed session.
+    
+    Args:
+        resumption_secret: Secret from the ticket
+        salt: client nonce || server nonce of the resuming hello exchange
+    """
+    return _hkdf(resumption_secret, 16, RESUMED_KEY_LABEL, salt)
+
+
+class TicketContents:
+    """What a ticket vouches for."""
+    
+    __slots__ = ('username', 'fingerprint', 'secret', 'expires_at')
+    
+    def __init__(self, username: str, fingerprint: str, secret: bytes, expires_at: float):
+        """
+        Initialize ticket contents.
+        
+        Args:
+            username: Authenticated username
+            fingerprint: SHA-256 fingerprint (hex) of the client certificate
+            secret: Resumption secret
+            expires_at: Unix time the ticket expires
+        """
+        self.username = username
+        self.fingerprint = fingerprint
+        self.secret = secret
+        self.expires_at = expires_at
+
+
+class TicketKeyring:
+    """
+    Seals and opens session tickets, rotating the ticket key every
+    rotation seconds. Safe to share between threads.
+    """
+    
+    def __init__(self, lifetime: float = 3600, rotation: float = 3600, master_secret: Optional[bytes] = None):
+        """
+        Initialize ticket keyring.
+        
+        Args:
+            lifetime: Seconds a ticket stays valid
+            rotation: Seconds each ticket key is used for sealing
+            master_secret: Shared secret to derive epoch keys from (random per process if None)
+        """
+        self.lifetime = lifetime
+        self.rotation = max(1.0, rotation)
+        self.master_secret = master_secret
+        self._keys: Dict[int, AESGCM] = {}
+        self._lock = threading.Lock()
+    
+    def seal(self, contents: TicketContents) -> str:
+        """Encrypt and authenticate a ticket with the current epoch key."""
+        epoch = self._epoch(time.time())
+        aad = epoch.to_bytes(EPOCH_SIZE, byteorder='big')
+        nonce = os.urandom(NONCE_SIZE)
+        payload = json.dumps({
+            "u": contents.username,
+            "fp": contents.fingerprint,
+            "rs": b64e(contents.secret),
+            "exp": contents.expires_at
+        }).encode('utf-8')
+        return b64e(aad + nonce + self._key(epoch).encrypt(nonce, payload, aad))
+    
+    def issue(self, username: str, fingerprint: str, session_key: bytes) -> str:
+        """Seal a fresh ticket for a session that has just established its key."""
+        return self.seal(TicketContents(
+            username, fingerprint, derive_resumption_secret(session_key), time.time() + self.lifetime
+        ))
+    
+    def open(self, ticket: str) -> Optional[TicketContents]:
+        """
+        Open a ticket.
+        
+        Returns:
+            The ticket contents, or None if it is malformed, forged, sealed
+            with a retired key or expired
+        """
+        try:
+            blob = b64d(ticket)
+        except Exception:
+            return None
+        if len(blob) <= EPOCH_SIZE + NONCE_SIZE:
+            return None
+        
+        now = time.time()
+        aad = blob[:EPOCH_SIZE]
+        epoch = int.from_bytes(aad, byteorder='big')
+        if not self._oldest_epoch(now) <= epoch <= self._epoch(now):
+            return None
+        key = self._key(epoch, create=False)
+        if key is None:
+            return None
+        
+        try:
+            payload = json.loads(key.decrypt(blob[EPOCH_SIZE:EPOCH_SIZE + NONCE_SIZE], blob[EPOCH_SIZE + NONCE_SIZE:], aad))
+            contents = TicketContents(payload["u"], payload["fp"], b64d(payload["rs"]), float(payload["exp"]))
+        except (InvalidTag, ValueError, KeyError, TypeError):
+            return None
+        if contents.expires_at <= now:
+            return None
+        return contents
+    
+    def _epoch(self, now: float) -> int:
+        """Rotation period containing a point in time."""
+        return int(now // self.rotation)
+    
+    def _oldest_epoch(self, now: float) -> int:
+        """Oldest epoch whose tickets can still be unexpired."""
+        return self._epoch(now - self.lifetime)
+    
+    def _key(self, epoch: int, create: bool = True) -> Optional[AESGCM]:
+        """Ticket key for an epoch; random keys are only created for sealing."""
+        with self._lock:
+            key = self._keys.get(epoch)
+            if key is None:
+                if self.master_secret is not None:
+                    key = AESGCM(_hkdf(self.master_secret, 32, TICKET_KEY_LABEL, epoch.to_bytes(8, byteorder='big')))
+                elif create:
+                    key = AESGCM(AESGCM.generate_key(bit_length=256))
+                else:
+                    return None
+                self._keys[epoch] = key
+                
+                # Forget keys whose tickets have all expired
+                oldest = self._oldest_epoch(time.time())
+                for old in [e for e in self._keys if e < oldest]:
+                    del self._keys[old]
+            return key
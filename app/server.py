@@ -1,24 +1,44 @@
 """Server skeleton — plain TCP; no TLS. See assignment spec."""
 
+import argparse
+import asyncio
 import socket
 import json
 import os
 import secrets
+import signal
 import sys
-from typing import Optional, Tuple
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from dotenv import load_dotenv
 
-from app.crypto.pki import load_ca_cert, load_certificate_from_file, validate_certificate, get_cert_fingerprint
-from app.crypto.dh import generate_private_key, compute_public_value, compute_shared_secret, derive_session_key, generate_dh_parameters
-from app.crypto.aes import encrypt_aes128, decrypt_aes128
-from app.crypto.sign import load_private_key, load_public_key_from_cert, sign_data, verify_signature
+from app.crypto.pki import load_ca_cert, load_certificate_from_file, CertificateCache, CachedCertificate
+from app.crypto.dh import (
+    generate_private_key, compute_public_value, compute_shared_secret, derive_session_key, generate_dh_parameters,
+    DHKeyPool, SUPPORTED_GROUPS, DEFAULT_GROUP, X25519_GROUP, HANDSHAKE_CLASSIC, HANDSHAKE_COLLAPSED,
+    get_group, find_group, negotiate_group, negotiate_handshake, validate_public_value, is_valid_custom_group,
+    generate_group_keypair, compute_group_secret, derive_handshake_keys
+)
+from app.crypto.aes import encrypt_aes128, decrypt_aes128, SessionCipher
+from app.crypto.sign import load_private_key, sign_data, verify_signature, CryptoExecutor
+from app.crypto.ticket import TicketKeyring, derive_resumed_session_key
+from app.crypto.integrity import (
+    INTEGRITY_RSA, INTEGRITY_HMAC, CLIENT_TO_SERVER, MessageAuthenticator, HashChain,
+    negotiate_integrity, checkpoint_data
+)
 from app.common.protocol import (
     HelloMessage, ServerHelloMessage, RegisterMessage, LoginMessage,
-    DHClientMessage, DHServerMessage, ChatMessage, SessionReceipt
+    DHClientMessage, DHServerMessage, TicketMessage, CheckpointMessage, SessionReceipt
 )
 from app.common.utils import now_ms, b64e, b64d, sha256_hex
-from app.storage.db import register_user, authenticate_user, init_database
-from app.storage.transcript import Transcript
+from app.common.framing import FrameReader, FrameWriter, MAX_FRAME_SIZE, set_nodelay
+from app.common.wire import ENCODING_JSON, ChatFrame, negotiate_encoding, encode_ack, decode_frame
+from app.storage.db import get_password_hasher
+from app.storage.userstore import create_user_store
+from app.storage.transcript import Transcript, transcript_options_from_env, receipt_data
 
 
 # Load environment variables
@@ -61,20 +81,134 @@ class SecureChatServer:
         # Transcript directory
         self.transcript_dir = os.getenv("TRANSCRIPT_DIR", "transcripts")
         os.makedirs(self.transcript_dir, exist_ok=True)
+        self.transcript_options = transcript_options_from_env()
+        
+        # Validated client certificates, keyed by fingerprint
+        self.cert_cache = CertificateCache(int(os.getenv("CERT_CACHE_SIZE", 1024)))
+        
+        # Named DH groups (and X25519) we accept; explicit p/g outside them only if allowed
+        self.dh_groups = [g.strip() for g in os.getenv("DH_GROUPS", ",".join(SUPPORTED_GROUPS)).split(",") if g.strip()]
+        unknown = [name for name in self.dh_groups if name not in SUPPORTED_GROUPS]
+        if unknown:
+            raise ValueError(f"Unknown DH groups: {', '.join(unknown)}")
+        self.dh_allow_custom = os.getenv("DH_ALLOW_CUSTOM_GROUPS", "0") == "1"
+        
+        # Precomputed DH keypairs, one pool per named group created on first use (0 = compute per handshake)
+        self.dh_pool_size = int(os.getenv("DH_POOL_SIZE", 16))
+        self.dh_pool_low_water = int(os.getenv("DH_POOL_LOW_WATER", max(1, self.dh_pool_size // 4)))
+        self.dh_pool_max_uses = int(os.getenv("DH_POOL_MAX_USES", 1))
+        self.dh_pools: Dict[str, DHKeyPool] = {}
+        self._dh_pools_lock = threading.Lock()
+        if DEFAULT_GROUP in self.dh_groups:
+            # Warm the standard group, which legacy clients always use
+            self.dh_pool_for(DEFAULT_GROUP)
+        
+        # Session resumption tickets (TICKET_LIFETIME=0 disables); with TICKET_SECRET
+        # every worker process and restart accepts the same tickets
+        ticket_lifetime = int(os.getenv("TICKET_LIFETIME", 3600))
+        ticket_secret = os.getenv("TICKET_SECRET")
+        self.tickets = None
+        if ticket_lifetime > 0:
+            self.tickets = TicketKeyring(
+                lifetime=ticket_lifetime,
+                rotation=int(os.getenv("TICKET_ROTATION", ticket_lifetime)),
+                master_secret=bytes.fromhex(ticket_secret) if ticket_secret else None
+            )
+        
+        # hmac integrity mode: most messages a client may send without an RSA checkpoint
+        self.checkpoint_interval = int(os.getenv("CHECKPOINT_INTERVAL", 100))
+        
+        # User store backend (USER_STORE=mysql/sqlite/memory)
+        self.users = create_user_store()
+        # asyncio engine: logins wait for the password hashing pool on these
+        # threads, not on the default executor that carries chat traffic.
+        # The other engines call the hasher from the session's own thread
+        # (the accept loop for the blocking engine), which waits for the KDF
+        hasher = get_password_hasher()
+        self.auth_executor = ThreadPoolExecutor(
+            max_workers=hasher.workers + hasher.queue_depth, thread_name_prefix="auth"
+        )
+        
+        # Connection handling limits
+        self.backlog = int(os.getenv("SERVER_BACKLOG", 5))
+        self.pool_size = int(os.getenv("SERVER_POOL_SIZE", 32))
+        self.queue_depth = int(os.getenv("SERVER_QUEUE_DEPTH", 64))
+        
+        # Optional process pool for RSA signature checks (0 = verify inline)
+        crypto_workers = int(os.getenv("SERVER_CRYPTO_WORKERS", 0))
+        self.crypto = CryptoExecutor(crypto_workers) if crypto_workers > 0 else None
+        self.crypto_batch = int(os.getenv("SERVER_CRYPTO_BATCH", 64))
+        
+        # Set by PreforkSupervisor workers so they can share the listening port
+        self.reuse_port = False
+        
+        # Graceful shutdown state (see request_drain)
+        self.draining = False
+        self._async_stop = None
+        self._active_sessions = set()
+        
+        # Per-connection (FrameReader, FrameWriter); buffered data must survive between calls
+        self._framing = weakref.WeakKeyDictionary()
+        self._framing_lock = threading.Lock()
     
-    def start(self):
-        """Start the server."""
+    def close(self):
+        """Stop background helpers (crypto executor, DH keypair refill, user store connections)."""
+        if self.crypto:
+            self.crypto.shutdown()
+        with self._dh_pools_lock:
+            for pool in self.dh_pools.values():
+                pool.close()
+            self.dh_pools.clear()
+        self.auth_executor.shutdown(wait=False)
+        
+        stats = self.users.stats()
+        if stats:
+            print(f"DB pool: {stats['checkouts']} checkouts, {stats['waits']} waited "
+                  f"(avg {stats['wait_avg_ms']} ms, max {stats['wait_max_ms']} ms), "
+                  f"{stats['timeouts']} timeouts, {stats['created']} connections opened")
+        self.users.close()
+    
+    def dh_pool_for(self, group: str) -> Optional[DHKeyPool]:
+        """Keypair pool for a named group, started on first use; None if pooling is off (or for X25519)."""
+        if self.dh_pool_size <= 0 or group == X25519_GROUP:
+            return None
+        with self._dh_pools_lock:
+            pool = self.dh_pools.get(group)
+            if pool is None:
+                p, g = get_group(group)
+                pool = DHKeyPool(
+                    p, g,
+                    size=self.dh_pool_size,
+                    low_water=self.dh_pool_low_water,
+                    max_uses=self.dh_pool_max_uses
+                )
+                self.dh_pools[group] = pool
+            return pool
+    
+    def listen(self) -> socket.socket:
+        """Create, bind and listen on the server socket."""
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.socket.bind((self.host, self.port))
-        self.socket.listen(5)
+        self.socket.listen(self.backlog)
+        return self.socket
+    
+    def start(self):
+        """Start the server."""
+        self.listen()
         print(f"Server listening on {self.host}:{self.port}")
         
         while True:
+            client_socket = None
             try:
                 client_socket, client_address = self.socket.accept()
                 print(f"Client connected from {client_address}")
                 self.handle_client(client_socket, client_address)
+            except BlockingIOError:
+                # Draining and no queued connections left
+                break
             except KeyboardInterrupt:
                 print("\nServer shutting down...")
                 break
@@ -85,80 +219,161 @@ class SecureChatServer:
                 if client_socket:
                     client_socket.close()
     
+        self.socket.close()
+    
+    def serve_threaded(self):
+        """
+        Start the server on a bounded thread pool.
+        
+        Accepted sockets are handed to a pool of pool_size workers. At most
+        queue_depth further connections may wait for a free worker; beyond
+        that, new clients get an immediate BUSY error frame and are closed
+        instead of piling up in the listen backlog.
+        """
+        self.listen()
+        print(f"Server listening on {self.host}:{self.port} "
+              f"(thread pool: {self.pool_size} workers, queue depth {self.queue_depth})")
+        
+        admission = threading.BoundedSemaphore(self.pool_size + self.queue_depth)
+        
+        def run(client_socket: socket.socket, client_address: Tuple[str, int]):
+            try:
+                self.handle_client(client_socket, client_address)
+            finally:
+                admission.release()
+        
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="securechat") as executor:
+            while True:
+                try:
+                    client_socket, client_address = self.socket.accept()
+                except BlockingIOError:
+                    # Draining and no queued connections left
+                    break
+                except KeyboardInterrupt:
+                    print("\nServer shutting down...")
+                    break
+                except OSError as e:
+                    print(f"Error accepting client: {e}")
+                    continue
+                
+                if not admission.acquire(blocking=False):
+                    print(f"Rejecting client {client_address}: server busy")
+                    self.reject_busy(client_socket)
+                    continue
+                
+                print(f"Client connected from {client_address}")
+                try:
+                    executor.submit(run, client_socket, client_address)
+                except Exception as e:
+                    print(f"Error handling client: {e}")
+                    admission.release()
+                    client_socket.close()
+            
+            self.socket.close()
+    
+    def request_drain(self, signum: Optional[int] = None, frame: Optional[object] = None):
+        """
+        Stop accepting new connections and let in-flight sessions finish.
+        
+        Safe to install as a signal handler. The blocking and thread pool
+        engines return once their current sessions end; the asyncio engine
+        waits for all active connection coroutines.
+        """
+        self.draining = True
+        if self._async_stop is not None:
+            loop, stop_event = self._async_stop
+            loop.call_soon_threadsafe(stop_event.set)
+        elif self.socket is not None:
+            # accept() is interrupted by the signal and retried non-blocking, so the
+            # engine serves connections already queued on this socket, then stops
+            try:
+                self.socket.setblocking(False)
+            except OSError:
+                pass
+    
+    def reject_busy(self, client_socket: socket.socket):
+        """Send a BUSY error frame and close the connection."""
+        try:
+            client_socket.settimeout(1.0)
+            self.send_error(client_socket, "BUSY: Server at capacity, try again later")
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+    
     def handle_client(self, client_socket: socket.socket, client_address: Tuple[str, int]):
         """Handle a client connection."""
+        set_nodelay(client_socket)
+        session = None
         try:
             # Phase 1: Control Plane (Negotiation and Authentication)
-            client_cert, temp_aes_key = self.control_plane(client_socket)
-            if not client_cert:
+            session, temp_aes_key = self.control_plane(client_socket)
+            if not session:
                 return
             
-            # Phase 2: Registration/Login
-            username = self.authentication(client_socket, client_cert, temp_aes_key)
+            # Phase 2: Registration/Login (skipped when resuming from a ticket)
+            if session.resumed:
+                username = session.username
+            else:
+                username = self.authentication(client_socket, session.client_cert, temp_aes_key)
             if not username:
                 return
             
-            # Phase 3: Key Agreement (Session Key)
-            session_key = self.key_agreement(client_socket, client_cert)
+            # Phase 3: Key Agreement (Session Key; already derived in a collapsed or resumed handshake)
+            session_key = session.handshake_session_key or self.key_agreement(client_socket, session.client_cert)
             if not session_key:
                 return
+            if session.session_tickets:
+                # Ticket for the next reconnect
+                self.send_message(client_socket, self.build_ticket(session, session_key, username))
             
             # Phase 4: Data Plane (Encrypted Chat)
-            transcript = self.data_plane(client_socket, client_cert, session_key, username, client_address)
+            transcript = self.data_plane(client_socket, session, session_key, username, client_address)
             
-            # Phase 5: Non-Repudiation (Session Receipt)
-            self.non_repudiation(client_socket, client_cert, transcript, username)
+            # Phase 5: Non-Repudiation (Session Receipt; none for a rejected session)
+            if not session.rejected:
+                self.non_repudiation(client_socket, session.client_cert, transcript, username)
             
         except Exception as e:
             print(f"Error in client handler: {e}")
             import traceback
             traceback.print_exc()
         finally:
+            if session and session.transcript:
+                session.transcript.close()
             client_socket.close()
     
-    def control_plane(self, client_socket: socket.socket) -> Tuple[Optional[object], Optional[bytes]]:
+    def control_plane(self, client_socket: socket.socket) -> Tuple[Optional["ClientSession"], Optional[bytes]]:
         """
         Control plane: certificate exchange and temporary DH key agreement.
         
         Returns:
-            (client_cert, temp_aes_key) or (None, None) on failure
+            (session, temp_aes_key) or (None, None) on failure
         """
         try:
-            # Receive client hello
+            # Receive client hello and validate client certificate
             data = self.receive_message(client_socket)
-            hello = HelloMessage(**json.loads(data))
-            
-            # Load client certificate
-            client_cert = load_certificate_from_file(hello.client_cert) if os.path.exists(hello.client_cert) else None
-            if not client_cert:
-                # Try to load from PEM string
-                from app.crypto.pki import load_cert_from_pem
-                client_cert = load_cert_from_pem(hello.client_cert)
-            
-            # Validate client certificate
-            is_valid, error_msg = validate_certificate(client_cert, self.ca_cert)
-            if not is_valid:
+            session, error_msg = self.process_hello(data)
+            if not session:
                 self.send_error(client_socket, error_msg)
                 return None, None
             
-            print(f"Client certificate validated: {error_msg}")
-            
-            # Generate server nonce
-            server_nonce = secrets.token_bytes(32)
-            
             # Send server hello
-            server_hello = ServerHelloMessage(
-                server_cert=self.server_cert_pem,
-                nonce=b64e(server_nonce)
-            )
-            self.send_message(client_socket, server_hello.model_dump_json())
+            self.send_message(client_socket, self.build_server_hello(session))
             
-            # Perform temporary DH key exchange for credential encryption
-            temp_aes_key = self.temporary_dh_exchange(client_socket)
+            if session.resumed:
+                # Ticket accepted: no credential key needed
+                return session, None
+            if session.handshake == HANDSHAKE_COLLAPSED:
+                # Our share went out in the server hello; the client's needs no reply
+                temp_aes_key = self.process_client_share(self.receive_message(client_socket), session)
+            else:
+                # Perform temporary DH key exchange for credential encryption
+                temp_aes_key = self.temporary_dh_exchange(client_socket)
             if not temp_aes_key:
                 return None, None
             
-            return client_cert, temp_aes_key
+            return session, temp_aes_key
             
         except Exception as e:
             print(f"Error in control plane: {e}")
@@ -176,27 +391,10 @@ class SecureChatServer:
         try:
             # Receive client DH message (client sends p, g, A)
             data = self.receive_message(client_socket)
-            dh_client = DHClientMessage(**json.loads(data))
-            
-            # Use client's DH parameters (p, g)
-            p = dh_client.p
-            g = dh_client.g
-            
-            # Generate server private key
-            server_private_key = generate_private_key()
-            
-            # Compute server public value
-            server_public_value = compute_public_value(server_private_key, p, g)
-            
-            # Compute shared secret
-            shared_secret = compute_shared_secret(server_private_key, dh_client.A, p)
-            
-            # Derive AES key
-            aes_key = derive_session_key(shared_secret)
+            aes_key, response = self.process_dh_client(data)
             
             # Send server DH message (server responds with B)
-            dh_server = DHServerMessage(B=server_public_value)
-            self.send_message(client_socket, dh_server.model_dump_json())
+            self.send_message(client_socket, response)
             
             return aes_key
             
@@ -216,47 +414,9 @@ class SecureChatServer:
         try:
             # Receive encrypted authentication message
             encrypted_data = self.receive_message(client_socket)
-            encrypted_bytes = b64d(encrypted_data)
-            
-            # Decrypt authentication message
-            decrypted_data = decrypt_aes128(encrypted_bytes, temp_aes_key)
-            auth_data = json.loads(decrypted_data.decode('utf-8'))
-            
-            if auth_data.get('type') == 'register':
-                # Handle registration
-                # For registration, password is sent as plaintext (encrypted with AES)
-                # The server will generate salt and compute hash
-                email = auth_data.get('email')
-                username = auth_data.get('username')
-                password = auth_data.get('pwd')  # Plaintext password
-                
-                # Register user (server generates salt and computes hash)
-                success, message = register_user(email, username, password)
-                if success:
-                    self.send_message(client_socket, json.dumps({"status": "success", "message": "Registration successful"}))
-                    return username
-                else:
-                    self.send_message(client_socket, json.dumps({"status": "error", "message": message}))
-                    return None
-                    
-            elif auth_data.get('type') == 'login':
-                # Handle login
-                # For login, password is sent as plaintext (encrypted with AES)
-                # The server retrieves salt from database and verifies
-                email = auth_data.get('email')
-                password = auth_data.get('pwd')  # Plaintext password
-                
-                # Authenticate user (server retrieves salt and verifies)
-                is_authenticated, result = authenticate_user(email, password)
-                if is_authenticated:
-                    self.send_message(client_socket, json.dumps({"status": "success", "message": "Login successful", "username": result}))
-                    return result
-                else:
-                    self.send_message(client_socket, json.dumps({"status": "error", "message": result}))
-                    return None
-            else:
-                self.send_message(client_socket, json.dumps({"status": "error", "message": "Invalid authentication type"}))
-                return None
+            username, response = self.process_auth(encrypted_data, temp_aes_key)
+            self.send_message(client_socket, response)
+            return username
                 
         except Exception as e:
             print(f"Error in authentication: {e}")
@@ -275,27 +435,10 @@ class SecureChatServer:
         try:
             # Receive client DH message (client sends p, g, A)
             data = self.receive_message(client_socket)
-            dh_client = DHClientMessage(**json.loads(data))
-            
-            # Use client's DH parameters (p, g)
-            p = dh_client.p
-            g = dh_client.g
-            
-            # Generate server private key
-            server_private_key = generate_private_key()
-            
-            # Compute server public value
-            server_public_value = compute_public_value(server_private_key, p, g)
-            
-            # Compute shared secret
-            shared_secret = compute_shared_secret(server_private_key, dh_client.A, p)
-            
-            # Derive session AES key
-            session_key = derive_session_key(shared_secret)
+            session_key, response = self.process_dh_client(data)
             
             # Send server DH message (server responds with B)
-            dh_server = DHServerMessage(B=server_public_value)
-            self.send_message(client_socket, dh_server.model_dump_json())
+            self.send_message(client_socket, response)
             
             print("Session key established")
             return session_key
@@ -306,25 +449,15 @@ class SecureChatServer:
             traceback.print_exc()
             return None
     
-    def data_plane(self, client_socket: socket.socket, client_cert: object, session_key: bytes, username: str, client_address: Tuple[str, int]) -> Transcript:
+    def data_plane(self, client_socket: socket.socket, session: "ClientSession", session_key: bytes, username: str, client_address: Tuple[str, int]) -> Transcript:
         """
         Handle encrypted chat messages.
         
         Returns:
             Transcript object
         """
-        # Initialize transcript
-        transcript_file = os.path.join(self.transcript_dir, f"server_{username}_{now_ms()}.txt")
-        transcript = Transcript(transcript_file)
-        
-        # Get client certificate fingerprint
-        client_cert_fingerprint = get_cert_fingerprint(client_cert)
-        
-        # Get client public key
-        client_public_key = load_public_key_from_cert(client_cert)
-        
-        # Sequence number tracking
-        expected_seqno = 1
+        self.open_session(session, session_key, username)
+        reader, writer = self.connection_framing(client_socket)
         
         print("Entering data plane. Type messages to send, or 'quit' to exit.")
         
@@ -333,64 +466,27 @@ class SecureChatServer:
                 # Receive message
                 try:
                     data = self.receive_message(client_socket, timeout=1.0)
-                    if data:
-                        msg_data = json.loads(data)
+                    if not data:
+                        # Client closed the connection
+                        break
                         
-                        if msg_data.get('type') == 'msg':
-                            # Handle chat message
-                            msg = ChatMessage(**msg_data)
+                    batch = [data]
+                    if self.crypto:
+                        # Take pipelined messages along so their signatures are checked in parallel
+                        while len(batch) < self.crypto_batch and reader.frame_ready():
+                            batch.append(self.receive_message(client_socket))
                             
-                            # Verify sequence number (replay protection)
-                            if msg.seqno != expected_seqno:
-                                self.send_error(client_socket, f"REPLAY: Expected seqno {expected_seqno}, got {msg.seqno}")
-                                continue
-                            
-                            # Verify timestamp (freshness)
-                            current_time = now_ms()
-                            if abs(current_time - msg.ts) > 300000:  # 5 minutes tolerance
-                                self.send_error(client_socket, "STALE: Message timestamp is too old")
-                                continue
-                            
-                            # Verify signature
-                            # Compute hash: SHA256(seqno || timestamp || ciphertext)
-                            # Concatenate as bytes: seqno (8 bytes) || timestamp (8 bytes) || ciphertext (bytes)
-                            seqno_bytes = msg.seqno.to_bytes(8, byteorder='big')
-                            ts_bytes = msg.ts.to_bytes(8, byteorder='big')
-                            ct_bytes = b64d(msg.ct)
-                            hash_data = seqno_bytes + ts_bytes + ct_bytes
-                            signature = b64d(msg.sig)
-                            
-                            if not verify_signature(hash_data, signature, client_public_key):
-                                self.send_error(client_socket, "SIG_FAIL: Signature verification failed")
-                                continue
-                            
-                            # Decrypt message
-                            ciphertext = b64d(msg.ct)
-                            plaintext = decrypt_aes128(ciphertext, session_key)
-                            
-                            print(f"Client ({username}): {plaintext.decode('utf-8')}")
-                            
-                            # Add to transcript
-                            transcript.append_message(
-                                msg.seqno,
-                                msg.ts,
-                                msg.ct,
-                                msg.sig,
-                                client_cert_fingerprint
-                            )
-                            
-                            expected_seqno += 1
-                            
-                            # Send acknowledgment
-                            self.send_message(client_socket, json.dumps({"status": "ack", "seqno": msg.seqno}))
-                            
-                        elif msg_data.get('type') == 'receipt':
-                            # Handle session receipt
-                            receipt = SessionReceipt(**msg_data)
-                            print(f"Received session receipt from client")
-                            break
-                        elif msg_data.get('type') == 'quit':
+                    done = False
+                    for response, done in self.process_data_frames(batch, session):
+                        if response:
+                            writer.queue_frame(response)
+                        if done:
                             break
+                    # Coalesce replies to pipelined messages into one write
+                    if done or not reader.frame_ready():
+                        writer.flush()
+                    if done:
+                        break
                             
                 except socket.timeout:
                     # No message received, continue
@@ -410,40 +506,600 @@ class SecureChatServer:
             import traceback
             traceback.print_exc()
         
-        return transcript
+        return session.transcript
     
     def non_repudiation(self, client_socket: socket.socket, client_cert: object, transcript: Transcript, username: str):
         """
         Generate and send session receipt for non-repudiation.
         """
         try:
-            # Compute transcript hash
-            transcript_hash = transcript.compute_transcript_hash()
-            
-            # Sign transcript hash
-            hash_bytes = bytes.fromhex(transcript_hash)
-            signature = sign_data(hash_bytes, self.server_private_key)
-            
-            # Create session receipt
-            receipt = SessionReceipt(
-                peer="server",
-                first_seq=transcript.get_first_seq() or 0,
-                last_seq=transcript.get_last_seq() or 0,
-                transcript_sha256=transcript_hash,
-                sig=b64e(signature)
+            self.send_message(client_socket, self.build_receipt(transcript))
+            
+        except Exception as e:
+            print(f"Error generating session receipt: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    # ------------------------------------------------------------------
+    # Protocol steps shared by the blocking and asyncio engines.
+    # Each takes a decoded frame and returns the frame(s) to send back,
+    # so both engines speak exactly the same wire protocol.
+    # ------------------------------------------------------------------
+    
+    def process_hello(self, data: bytes) -> Tuple[Optional["ClientSession"], str]:
+        """
+        Parse the client hello, validate the client certificate and negotiate
+        the data plane encoding and message integrity mode.
+        
+        Returns:
+            (session, status) where session is None if validation failed
+        """
+        hello = HelloMessage(**json.loads(data))
+        
+        # Client certificate PEM (or a path to one)
+        pem_data = hello.client_cert
+        if os.path.exists(pem_data):
+            with open(pem_data, 'r') as f:
+                pem_data = f.read()
+        
+        # Parse and validate client certificate (cached by fingerprint)
+        client_cert, is_valid, error_msg = self.cert_cache.validate_pem(pem_data, self.ca_cert)
+        if not is_valid:
+            return None, error_msg
+        
+        print(f"Client certificate validated: {error_msg}")
+        dh_group = negotiate_group(hello.dh_groups, self.dh_groups)
+        session = ClientSession(
+            client_cert,
+            encoding=negotiate_encoding(hello.encodings),
+            integrity=negotiate_integrity(hello.integrity),
+            dh_group=dh_group,
+            handshake=negotiate_handshake(hello.handshakes, dh_group)
+        )
+        session.client_nonce = b64d(hello.nonce)
+        session.session_tickets = bool(self.tickets and hello.session_tickets)
+        
+        if hello.ticket and self.tickets:
+            # Resume if the ticket opens, is unexpired and names this certificate
+            ticket = self.tickets.open(hello.ticket)
+            if ticket and ticket.fingerprint == client_cert.fingerprint:
+                session.resumed = True
+                session.username = ticket.username
+                session.resumption_secret = ticket.secret
+                print(f"Resuming session for {ticket.username} from ticket")
+        return session, error_msg
+    
+    def build_server_hello(self, session: "ClientSession") -> str:
+        """Build the server hello frame with a fresh server nonce."""
+        # Generate server nonce
+        server_nonce = secrets.token_bytes(32)
+        
+        dh_share = None
+        if session.resumed:
+            # Ticket resumption: fresh session key from the ticket's secret, no DH at all
+            session.handshake_session_key = derive_resumed_session_key(
+                session.resumption_secret, session.client_nonce + server_nonce
+            )
+        elif session.handshake == HANDSHAKE_COLLAPSED:
+            # Collapsed handshake: send our DH share now, keys are salted with both nonces
+            session.dh_private_key, dh_share = self.server_keypair(session.dh_group)
+            session.key_salt = session.client_nonce + server_nonce
+        
+        server_hello = ServerHelloMessage(
+            server_cert=self.server_cert_pem,
+            nonce=b64e(server_nonce),
+            encoding=session.encoding,
+            integrity=session.integrity,
+            dh_group=session.dh_group,
+            handshake=session.handshake,
+            dh_share=dh_share,
+            session_tickets=session.session_tickets,
+            resumed=session.resumed
+        )
+        return server_hello.model_dump_json()
+    
+    def build_ticket(self, session: "ClientSession", session_key: bytes, username: str) -> str:
+        """Build a session ticket frame binding username, certificate and a secret derived from session_key."""
+        ticket = self.tickets.issue(username, session.client_cert_fingerprint, session_key)
+        return TicketMessage(ticket=ticket, lifetime=int(self.tickets.lifetime)).model_dump_json()
+    
+    def process_client_share(self, data: bytes, session: "ClientSession") -> bytes:
+        """
+        Collapsed handshake: take the client's DH share and derive both keys.
+        
+        Returns:
+            Temporary (credential) AES key; the session key is kept in
+            session.handshake_session_key
+        """
+        dh_client = DHClientMessage(**json.loads(data))
+        if dh_client.group != session.dh_group:
+            raise ValueError("DH share is not in the negotiated group")
+        
+        shared_secret = compute_group_secret(session.dh_group, session.dh_private_key, dh_client.A)
+        session.dh_private_key = None
+        
+        temp_aes_key, session.handshake_session_key = derive_handshake_keys(shared_secret, session.key_salt)
+        return temp_aes_key
+    
+    def server_keypair(self, group: str) -> Tuple[object, int]:
+        """
+        Server keypair for a named group or X25519, precomputed when a pool is running.
+        
+        Returns:
+            (private_key, public_value)
+        """
+        pool = self.dh_pool_for(group)
+        if pool:
+            # Precomputed server keypair: only the shared secret is computed inline
+            return pool.acquire()
+        return generate_group_keypair(group)
+    
+    def process_dh_client(self, data: bytes) -> Tuple[bytes, str]:
+        """
+        Answer a client DH message.
+        
+        Returns:
+            (derived AES key, server DH frame)
+        """
+        dh_client = DHClientMessage(**json.loads(data))
+        
+        # Named group, or the client's explicit DH parameters (p, g)
+        group, p, g = self.resolve_dh_group(dh_client)
+        
+        if group is not None:
+            server_private_key, server_public_value = self.server_keypair(group)
+            shared_secret = compute_group_secret(group, server_private_key, dh_client.A)
+        else:
+            validate_public_value(dh_client.A, p)
+            
+            # Generate server private key
+            server_private_key = generate_private_key()
+            
+            # Compute server public value
+            server_public_value = compute_public_value(server_private_key, p, g)
+            
+            # Compute shared secret
+            shared_secret = compute_shared_secret(server_private_key, dh_client.A, p)
+        
+        # Derive AES key
+        aes_key = derive_session_key(shared_secret)
+        
+        dh_server = DHServerMessage(B=server_public_value)
+        return aes_key, dh_server.model_dump_json()
+    
+    def resolve_dh_group(self, dh_client: DHClientMessage) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+        """
+        Work out the group of a client DH message.
+        
+        Returns:
+            (group name or None for a custom group, p, g); p and g are None for X25519
+        
+        Raises:
+            ValueError: if the group is unknown, not accepted or (custom) invalid
+        """
+        if dh_client.group is not None:
+            if dh_client.group not in self.dh_groups:
+                raise ValueError(f"DH group not accepted: {dh_client.group}")
+            if dh_client.group == X25519_GROUP:
+                return X25519_GROUP, None, None
+            p, g = get_group(dh_client.group)
+            return dh_client.group, p, g
+        
+        if dh_client.p is None or dh_client.g is None:
+            raise ValueError("DH client message needs a group or p and g")
+        
+        # Legacy clients send a named group's parameters in full
+        group = find_group(dh_client.p, dh_client.g)
+        if group is not None:
+            if group not in self.dh_groups:
+                raise ValueError(f"DH group not accepted: {group}")
+            return group, dh_client.p, dh_client.g
+        
+        if not self.dh_allow_custom:
+            raise ValueError("Custom DH groups are not allowed")
+        if not is_valid_custom_group(dh_client.p, dh_client.g):
+            raise ValueError("Invalid custom DH group")
+        return None, dh_client.p, dh_client.g
+    
+    def process_auth(self, encrypted_data: bytes, temp_aes_key: bytes) -> Tuple[Optional[str], str]:
+        """
+        Decrypt and handle a registration or login request.
+        
+        Returns:
+            (username or None, response frame)
+        """
+        encrypted_bytes = b64d(encrypted_data)
+        
+        # Decrypt authentication message
+        decrypted_data = decrypt_aes128(encrypted_bytes, temp_aes_key)
+        auth_data = json.loads(decrypted_data.decode('utf-8'))
+        
+        if auth_data.get('type') == 'register':
+            # Handle registration
+            # For registration, password is sent as plaintext (encrypted with AES)
+            # The server will generate salt and compute hash
+            email = auth_data.get('email')
+            username = auth_data.get('username')
+            password = auth_data.get('pwd')  # Plaintext password
+            
+            # Register user (server generates salt and computes hash)
+            success, message = self.users.register_user(email, username, password)
+            if success:
+                return username, json.dumps({"status": "success", "message": "Registration successful"})
+            return None, json.dumps({"status": "error", "message": message})
+        
+        elif auth_data.get('type') == 'login':
+            # Handle login
+            # For login, password is sent as plaintext (encrypted with AES)
+            # The server retrieves salt from database and verifies
+            email = auth_data.get('email')
+            password = auth_data.get('pwd')  # Plaintext password
+            
+            # Authenticate user (server retrieves salt and verifies)
+            is_authenticated, result = self.users.authenticate_user(email, password)
+            if is_authenticated:
+                return result, json.dumps({"status": "success", "message": "Login successful", "username": result})
+            return None, json.dumps({"status": "error", "message": result})
+        
+        return None, json.dumps({"status": "error", "message": "Invalid authentication type"})
+    
+    def open_session(self, session: "ClientSession", session_key: bytes, username: str) -> "ClientSession":
+        """Set up the data plane state for an authenticated client."""
+        session.session_key = session_key
+        session.cipher = SessionCipher(session_key)
+        session.username = username
+        
+        if session.integrity == INTEGRITY_HMAC:
+            session.mac = MessageAuthenticator(session_key, CLIENT_TO_SERVER)
+            session.chain = HashChain()
+        
+        # Initialize transcript
+        transcript_file = os.path.join(self.transcript_dir, f"server_{username}_{now_ms()}.txt")
+        session.transcript = Transcript(transcript_file, **self.transcript_options)
+        
+        return session
+    
+    def process_data_frame(self, data: bytes, session: "ClientSession") -> Tuple[Optional[bytes], bool]:
+        """
+        Handle one data plane frame (JSON or binary encoding).
+        
+        Returns:
+            (response frame or None, True if the chat session is over)
+        """
+        return self.process_decoded_frame(decode_frame(data), session)
+    
+    def process_data_frames(self, frames: List[bytes], session: "ClientSession") -> Iterator[Tuple[Optional[bytes], bool]]:
+        """
+        Handle a run of pipelined data plane frames.
+        
+        With a crypto executor, the signatures of all chat messages in the run
+        are checked in parallel up front. Verdicts come back in arrival order
+        and frames are then processed one by one, so replay (seqno) checks
+        see exactly the sequence they would one frame at a time.
+        
+        Yields:
+            (response frame or None, True if the chat session is over) per frame
+        """
+        decoded = []
+        decode_error = None
+        for data in frames:
+            try:
+                decoded.append(decode_frame(data))
+            except Exception as e:
+                # Frames before the bad one are still handled
+                decode_error = e
+                break
+        
+        verdicts = None
+        if self.crypto and session.integrity == INTEGRITY_RSA:
+            chat = [(f.signed_data, f.signature) for f in decoded if isinstance(f, ChatFrame)]
+            if chat:
+                verdicts = self.crypto.verify_batch(chat, session.client_public_key, session.client_cert_fingerprint)
+        
+        for frame in decoded:
+            verified = next(verdicts) if verdicts and isinstance(frame, ChatFrame) else None
+            yield self.process_decoded_frame(frame, session, verified)
+        
+        if decode_error:
+            raise decode_error
+    
+    def process_decoded_frame(self, msg_data: Union[ChatFrame, dict], session: "ClientSession",
+                              verified: Optional[bool] = None) -> Tuple[Optional[bytes], bool]:
+        """
+        Handle one decoded data plane frame.
+        
+        Args:
+            msg_data: Result of decode_frame()
+            session: Client session
+            verified: Signature verdict if already checked, None to check here
+        
+        Returns:
+            (response frame or None, True if the chat session is over)
+        """
+        if isinstance(msg_data, ChatFrame):
+            # Handle chat message (fields already decoded exactly once)
+            msg = msg_data
+            
+            # Verify sequence number (replay protection)
+            if msg.seqno != session.expected_seqno:
+                return self.error_frame(f"REPLAY: Expected seqno {session.expected_seqno}, got {msg.seqno}").encode('utf-8'), False
+            
+            # hmac mode: every checkpoint_interval messages must be covered by an RSA checkpoint
+            if session.chain and session.chain.seqno - session.checkpoint_seqno >= self.checkpoint_interval:
+                return self.reject(session, f"CHECKPOINT_REQUIRED: No checkpoint after seqno {session.checkpoint_seqno}")
+            
+            # Verify timestamp (freshness)
+            current_time = now_ms()
+            if abs(current_time - msg.ts) > 300000:  # 5 minutes tolerance
+                return self.error_frame("STALE: Message timestamp is too old").encode('utf-8'), False
+            
+            # Verify signature (or HMAC tag) over seqno (8 bytes) || timestamp (8 bytes) || ciphertext
+            if verified is None:
+                verified = self.verify_chat_signature(msg, session)
+            if not verified:
+                return self.error_frame("SIG_FAIL: Signature verification failed").encode('utf-8'), False
+            
+            # Decrypt message (ciphertext is a view into signed_data)
+            plaintext = session.cipher.decrypt(msg.ciphertext)
+            
+            print(f"Client ({session.username}): {plaintext.decode('utf-8')}")
+            
+            # Add to transcript
+            session.transcript.append_message(
+                msg.seqno,
+                msg.ts,
+                msg.ct_b64,
+                msg.sig_b64,
+                session.client_cert_fingerprint
             )
+            if session.chain:
+                session.chain.update(msg.seqno, msg.signed_data)
+            
+            session.expected_seqno += 1
+            
+            # Send acknowledgment
+            return encode_ack(msg.seqno, session.encoding), False
+        
+        elif msg_data.get('type') == 'checkpoint':
+            return self.process_checkpoint(CheckpointMessage(**msg_data), session), False
+        elif msg_data.get('type') in ('receipt', 'quit'):
+            # hmac mode: the session may only end on a checkpoint covering every message
+            if session.chain and session.chain.seqno > session.checkpoint_seqno:
+                return self.reject(session, f"CHECKPOINT_REQUIRED: Messages after seqno {session.checkpoint_seqno} "
+                                            f"are not covered by a checkpoint")
+            if msg_data.get('type') == 'receipt':
+                # Handle session receipt
+                receipt = SessionReceipt(**msg_data)
+                print(f"Received session receipt from client")
+            return None, True
+        
+        return None, False
+    
+    def reject(self, session: "ClientSession", error_message: str) -> Tuple[bytes, bool]:
+        """End a session on a protocol violation: error frame, and no receipt."""
+        print(f"Rejecting session of {session.username}: {error_message}")
+        session.rejected = True
+        return self.error_frame(error_message).encode('utf-8'), True
+    
+    def verify_chat_signature(self, msg: ChatFrame, session: "ClientSession") -> bool:
+        """Check a chat message's RSA signature or, in hmac integrity mode, its tag."""
+        if session.mac:
+            return session.mac.verify(msg.signed_data, msg.signature)
+        return self.verify_client_signature(msg.signed_data, msg.signature, session)
+    
+    def verify_client_signature(self, data: bytes, signature: bytes, session: "ClientSession") -> bool:
+        """Check an RSA signature by the client, on the crypto executor if there is one."""
+        if self.crypto:
+            return self.crypto.verify(data, signature, session.client_public_key, session.client_cert_fingerprint).result()
+        return verify_signature(data, signature, session.client_public_key)
+    
+    def process_checkpoint(self, checkpoint: CheckpointMessage, session: "ClientSession") -> Optional[bytes]:
+        """
+        Check a checkpoint against our own hash chain and record it.
+        
+        Returns:
+            Error frame, or None if the checkpoint is valid
+        """
+        if not session.chain:
+            return self.error_frame("CHECKPOINT_FAIL: Session is not in hmac integrity mode").encode('utf-8')
+        
+        # The client's chain must cover exactly the messages we accepted
+        if checkpoint.seqno != session.chain.seqno or checkpoint.chain != session.chain.head.hex():
+            return self.error_frame(f"CHECKPOINT_FAIL: Hash chain mismatch at seqno {checkpoint.seqno}").encode('utf-8')
+        
+        data = checkpoint_data(checkpoint.seqno, session.chain.head)
+        if not self.verify_client_signature(data, b64d(checkpoint.sig), session):
+            return self.error_frame("SIG_FAIL: Checkpoint signature verification failed").encode('utf-8')
+        
+        session.transcript.append_checkpoint(checkpoint.seqno, checkpoint.chain, checkpoint.sig)
+        session.checkpoint_seqno = checkpoint.seqno
+        return None
+    
+    def build_receipt(self, transcript: Transcript) -> str:
+        """Compute, sign and serialize the session receipt for a transcript."""
+        # The receipt may only vouch for entries that are on disk
+        transcript.commit()
+        
+        # Compute transcript hash (and Merkle root, if kept)
+        transcript_hash = transcript.compute_transcript_hash()
+        merkle_root = transcript.compute_merkle_root()
+        merkle_size = transcript.get_entry_count() if merkle_root else None
+        
+        # Sign transcript hash
+        signature = sign_data(receipt_data(transcript_hash, merkle_root, merkle_size), self.server_private_key)
+        
+        # Create session receipt
+        receipt = SessionReceipt(
+            peer="server",
+            first_seq=transcript.get_first_seq() or 0,
+            last_seq=transcript.get_last_seq() or 0,
+            transcript_sha256=transcript_hash,
+            sig=b64e(signature),
+            merkle_root=merkle_root,
+            merkle_size=merkle_size
+        )
+        
+        print(f"Session receipt sent. Transcript hash: {transcript_hash}")
+        return receipt.model_dump_json(exclude_none=True)
+    
+    # ------------------------------------------------------------------
+    # asyncio engine
+    # ------------------------------------------------------------------
+    
+    def serve_async(self):
+        """Start the server on the asyncio engine (one coroutine per connection)."""
+        try:
+            asyncio.run(self._serve_async())
+        except KeyboardInterrupt:
+            print("\nServer shutting down...")
+    
+    async def _serve_async(self):
+        """Listen and serve clients until a drain is requested."""
+        stop_event = asyncio.Event()
+        self._async_stop = (asyncio.get_running_loop(), stop_event)
+        
+        server = await asyncio.start_server(
+            self.handle_client_async, self.host, self.port,
+            backlog=self.backlog, reuse_port=self.reuse_port or None
+        )
+        print(f"Server listening on {self.host}:{self.port} (asyncio engine)")
+        async with server:
+            await stop_event.wait()
+        
+        # Draining: the listener is closed, wait for sessions in flight
+        if self._active_sessions:
+            print(f"Draining {len(self._active_sessions)} active session(s)...")
+            await asyncio.gather(*self._active_sessions, return_exceptions=True)
+    
+    async def handle_client_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Handle a client connection on the asyncio engine.
+        
+        Runs the same five phases as handle_client(). CPU-bound crypto
+        (DH exponentiation, RSA) and blocking database calls are pushed to
+        the default executor so one session never stalls the event loop;
+        logins (password hashing) get their own executor.
+        """
+        client_address = writer.get_extra_info('peername')
+        print(f"Client connected from {client_address}")
+        task = asyncio.current_task()
+        self._active_sessions.add(task)
+        session = None
+        try:
+            # Phase 1: Control Plane (Negotiation and Authentication)
+            data = await self.receive_message_async(reader)
+            session, error_msg = await asyncio.to_thread(self.process_hello, data)
+            if not session:
+                await self.send_message_async(writer, self.error_frame(error_msg))
+                return
+            await self.send_message_async(writer, await asyncio.to_thread(self.build_server_hello, session))
+            
+            if session.resumed:
+                # Ticket accepted: no credential key, no login
+                username = session.username
+            else:
+                data = await self.receive_message_async(reader)
+                if session.handshake == HANDSHAKE_COLLAPSED:
+                    # Our share went out in the server hello; the client's needs no reply
+                    temp_aes_key = await asyncio.to_thread(self.process_client_share, data, session)
+                else:
+                    temp_aes_key, response = await asyncio.to_thread(self.process_dh_client, data)
+                    await self.send_message_async(writer, response)
+                
+                # Phase 2: Registration/Login
+                data = await self.receive_message_async(reader)
+                try:
+                    username, response = await asyncio.get_running_loop().run_in_executor(
+                        self.auth_executor, self.process_auth, data, temp_aes_key
+                    )
+                except Exception as e:
+                    print(f"Error in authentication: {e}")
+                    await self.send_message_async(writer, json.dumps({"status": "error", "message": str(e)}))
+                    return
+                await self.send_message_async(writer, response)
+                if not username:
+                    return
             
-            # Send receipt
-            self.send_message(client_socket, receipt.model_dump_json())
+            # Phase 3: Key Agreement (Session Key; already derived in a collapsed or resumed handshake)
+            session_key = session.handshake_session_key
+            if not session_key:
+                data = await self.receive_message_async(reader)
+                session_key, response = await asyncio.to_thread(self.process_dh_client, data)
+                await self.send_message_async(writer, response)
+            print("Session key established")
+            if session.session_tickets:
+                # Ticket for the next reconnect
+                await self.send_message_async(writer, self.build_ticket(session, session_key, username))
             
-            print(f"Session receipt sent. Transcript hash: {transcript_hash}")
+            # Phase 4: Data Plane (Encrypted Chat)
+            self.open_session(session, session_key, username)
+            try:
+                while True:
+                    data = await self.receive_message_async(reader)
+                    if not data:
+                        break
+                    response, done = await asyncio.to_thread(self.process_data_frame, data, session)
+                    if response:
+                        await self.send_message_async(writer, response)
+                    if done:
+                        break
+            except Exception as e:
+                print(f"Error receiving message: {e}")
             
+            # Phase 5: Non-Repudiation (Session Receipt; none for a rejected session)
+            if not session.rejected:
+                receipt = await asyncio.to_thread(self.build_receipt, session.transcript)
+                await self.send_message_async(writer, receipt)
+        
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Client {client_address} disconnected: {e}")
         except Exception as e:
-            print(f"Error generating session receipt: {e}")
+            print(f"Error in client handler: {e}")
             import traceback
             traceback.print_exc()
+        finally:
+            self._active_sessions.discard(task)
+            if session and session.transcript:
+                await asyncio.to_thread(session.transcript.close)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
     
-    def receive_message(self, client_socket: socket.socket, timeout: Optional[float] = None) -> str:
+    async def receive_message_async(self, reader: asyncio.StreamReader) -> bytes:
+        """
+        Receive a length-prefixed message on the asyncio engine.
+        
+        Returns:
+            Message bytes, or b"" if the peer closed the connection
+        
+        Raises:
+            ValueError: if the peer announces a frame larger than MAX_FRAME_SIZE
+        """
+        try:
+            length_data = await reader.readexactly(4)
+        except asyncio.IncompleteReadError:
+            return b""
+        
+        message_length = int.from_bytes(length_data, byteorder='big')
+        if message_length > MAX_FRAME_SIZE:
+            # Same limit as FrameReader; the handler closes the connection
+            raise ValueError(f"Frame of {message_length} bytes exceeds limit of {MAX_FRAME_SIZE}")
+        return await reader.readexactly(message_length)
+    
+    async def send_message_async(self, writer: asyncio.StreamWriter, message: Union[str, bytes]):
+        """
+        Send a length-prefixed message on the asyncio engine.
+        
+        The header and body are written together; asyncio already enables
+        TCP_NODELAY on its TCP transports.
+        """
+        message_bytes = message.encode('utf-8') if isinstance(message, str) else message
+        writer.write(len(message_bytes).to_bytes(4, byteorder='big') + message_bytes)
+        await writer.drain()
+    
+    def receive_message(self, client_socket: socket.socket, timeout: Optional[float] = None) -> bytes:
         """
         Receive a message from the client.
         
@@ -452,66 +1108,279 @@ class SecureChatServer:
             timeout: Socket timeout in seconds
         
         Returns:
-            Message string
+            Message bytes, or b"" if the client closed the connection
         """
         if timeout:
             client_socket.settimeout(timeout)
         
-        # Receive message length (first 4 bytes)
-        length_data = client_socket.recv(4)
-        if not length_data:
-            return ""
+        reader, _ = self.connection_framing(client_socket)
+        frame = reader.read_frame()
+        if frame is None:
+            return b""
+        return bytes(frame)
         
-        message_length = int.from_bytes(length_data, byteorder='big')
-        
-        # Receive message data
-        message_data = b""
-        while len(message_data) < message_length:
-            chunk = client_socket.recv(message_length - len(message_data))
-            if not chunk:
-                break
-            message_data += chunk
+    def connection_framing(self, client_socket: socket.socket) -> Tuple[FrameReader, FrameWriter]:
+        """Get the frame reader and writer for a client socket."""
+        with self._framing_lock:
+            framing = self._framing.get(client_socket)
+            if framing is None:
+                framing = self._framing[client_socket] = (FrameReader(client_socket), FrameWriter(client_socket))
+            return framing
         
-        return message_data.decode('utf-8')
-    
-    def send_message(self, client_socket: socket.socket, message: str):
+    def send_message(self, client_socket: socket.socket, message: Union[str, bytes]):
         """
         Send a message to the client.
         
         Args:
             client_socket: Client socket
-            message: Message string
+            message: Message string (UTF-8 encoded) or encoded frame bytes
         """
-        message_bytes = message.encode('utf-8')
-        message_length = len(message_bytes)
-        
-        # Send message length (4 bytes)
-        client_socket.sendall(message_length.to_bytes(4, byteorder='big'))
+        _, writer = self.connection_framing(client_socket)
+        message_bytes = message.encode('utf-8') if isinstance(message, str) else message
         
-        # Send message data
-        client_socket.sendall(message_bytes)
+        # Length prefix and body go out in a single sendmsg call
+        writer.send_frame(message_bytes)
     
     def send_error(self, client_socket: socket.socket, error_message: str):
         """Send an error message to the client."""
-        error_response = json.dumps({"status": "error", "message": error_message})
-        self.send_message(client_socket, error_response)
+        self.send_message(client_socket, self.error_frame(error_message))
+    
+    def error_frame(self, error_message: str) -> str:
+        """Build an error frame."""
+        return json.dumps({"status": "error", "message": error_message})
+
+
+class ClientSession:
+    """
+    Per-connection state, created once the client hello is accepted.
+    
+    The session key (and its cipher), username, transcript and, in hmac
+    integrity mode, the MAC and hash chain are filled in by open_session()
+    after authentication and key agreement.
+    """
+    
+    def __init__(self, client_cert: CachedCertificate, encoding: str = ENCODING_JSON, integrity: str = INTEGRITY_RSA,
+                 dh_group: Optional[str] = None, handshake: str = HANDSHAKE_CLASSIC):
+        """
+        Initialize client session.
+        
+        Args:
+            client_cert: Validated client certificate (from the certificate cache)
+            encoding: Negotiated data plane encoding
+            integrity: Negotiated message integrity mode
+            dh_group: Negotiated named DH group (None: client sends explicit p, g)
+            handshake: Negotiated handshake mode
+        """
+        self.client_cert = client_cert.cert
+        self.encoding = encoding
+        self.integrity = integrity
+        self.dh_group = dh_group
+        self.handshake = handshake
+        
+        # Collapsed handshake state: hello nonces, our DH private key until the
+        # client's share arrives, then the session key derived with the credential key
+        self.client_nonce = b""
+        self.key_salt = b""
+        self.dh_private_key: Optional[object] = None
+        self.handshake_session_key: Optional[bytes] = None
+        
+        # Session tickets: whether to issue one, and the ticket we resumed from
+        self.session_tickets = False
+        self.resumed = False
+        self.resumption_secret: Optional[bytes] = None
+        self.session_key: Optional[bytes] = None
+        self.cipher: Optional[SessionCipher] = None
+        self.mac: Optional[MessageAuthenticator] = None
+        self.chain: Optional[HashChain] = None
+        self.checkpoint_seqno = 0  # last message covered by a verified checkpoint (hmac mode)
+        self.rejected = False  # ended on a protocol violation; gets no receipt
+        self.username: Optional[str] = None
+        self.transcript: Optional[Transcript] = None
+        
+        # Client certificate fingerprint and public key, computed once per certificate
+        self.client_cert_fingerprint = client_cert.fingerprint
+        self.client_public_key = client_cert.public_key
+        
+        # Sequence number tracking
+        self.expected_seqno = 1
+
+
+class PreforkSupervisor:
+    """
+    Pre-fork supervisor: N worker processes share one port via SO_REUSEPORT.
+    
+    RSA and 2048-bit DH are CPU-bound and hold the GIL, so a single process
+    saturates one core. Each worker is a full SecureChatServer (loading the
+    CA, server certificate and key once, right after fork) and the kernel
+    load-balances incoming connections across them. Crashed workers are
+    restarted; SIGTERM drains every worker before exiting.
+    """
+    
+    def __init__(self, host: str, port: int, workers: int, engine: str = "blocking", drain_timeout: float = 30.0):
+        """
+        Initialize supervisor.
+        
+        Args:
+            host: Server host
+            port: Server port
+            workers: Number of worker processes
+            engine: Connection engine run by each worker
+            drain_timeout: Seconds to wait for workers to drain before killing them
+        """
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.engine = engine
+        self.drain_timeout = drain_timeout
+        self.children = {}  # pid -> start time
+        self.stopping = False
+    
+    def run(self):
+        """Start the workers and supervise them until SIGTERM/SIGINT."""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        
+        for _ in range(self.workers):
+            self._spawn()
+        print(f"Supervisor {os.getpid()} started {self.workers} workers on {self.host}:{self.port} ({self.engine} engine)")
+        
+        while not self.stopping:
+            pid, status = self._reap()
+            if pid and not self.stopping:
+                started = self.children.pop(pid)
+                print(f"Worker {pid} exited with status {status}; restarting")
+                # Avoid a tight fork loop if workers die straight after start
+                if time.monotonic() - started < 1.0:
+                    time.sleep(1.0)
+                self._spawn()
+            elif not pid:
+                time.sleep(0.2)
+        
+        self._drain()
+    
+    def _spawn(self) -> int:
+        """Fork one worker process."""
+        pid = os.fork()
+        if pid == 0:
+            self._worker_main()
+        self.children[pid] = time.monotonic()
+        return pid
+    
+    def _worker_main(self):
+        """Worker process entry point; never returns."""
+        status = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            server = SecureChatServer(self.host, self.port)
+            server.reuse_port = True
+            signal.signal(signal.SIGTERM, server.request_drain)
+            try:
+                if self.engine == "asyncio":
+                    server.serve_async()
+                elif self.engine == "threadpool":
+                    server.serve_threaded()
+                else:
+                    server.start()
+            finally:
+                server.close()
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            print(f"Worker {os.getpid()} failed: {e}")
+            status = 1
+        finally:
+            sys.stdout.flush()
+            os._exit(status)
+    
+    def _reap(self) -> Tuple[int, int]:
+        """Reap one exited worker without blocking; returns (0, 0) if none."""
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return 0, 0
+        if pid:
+            return pid, os.waitstatus_to_exitcode(status)
+        return 0, 0
+    
+    def _handle_stop(self, signum: int, frame: Optional[object]):
+        """Signal handler: begin graceful shutdown."""
+        self.stopping = True
+    
+    def _drain(self):
+        """Ask every worker to drain, then kill stragglers after drain_timeout."""
+        print(f"Supervisor draining {len(self.children)} workers...")
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        
+        deadline = time.monotonic() + self.drain_timeout
+        while self.children and time.monotonic() < deadline:
+            pid, _ = self._reap()
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        
+        for pid in self.children:
+            print(f"Worker {pid} did not drain in time; killing")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+        print("Supervisor stopped")
 
 
 def main():
     """Main server entry point."""
-    # Initialize database
+    # Create or migrate the users table of the configured store, once, before any worker starts
     try:
-        init_database()
+        store = create_user_store()
+        store.init()
+        store.close()
     except Exception as e:
         print(f"Warning: Database initialization failed: {e}")
         print("Continuing anyway...")
     
     # Create and start server
+    parser = argparse.ArgumentParser(description="SecureChat server")
+    parser.add_argument(
+        "--engine",
+        choices=["blocking", "asyncio", "threadpool"],
+        default=os.getenv("SERVER_ENGINE", "blocking"),
+        help="Connection engine (default: blocking, or SERVER_ENGINE)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("SERVER_WORKERS", 1)),
+        help="Worker processes sharing the port via SO_REUSEPORT (default: 1, or SERVER_WORKERS)"
+    )
+    args = parser.parse_args()
+    
     host = os.getenv("SERVER_HOST", "localhost")
     port = int(os.getenv("SERVER_PORT", 8888))
     
+    if args.workers > 1:
+        drain_timeout = float(os.getenv("SERVER_DRAIN_TIMEOUT", 30))
+        PreforkSupervisor(host, port, args.workers, args.engine, drain_timeout).run()
+        return
+    
     server = SecureChatServer(host, port)
-    server.start()
+    try:
+        if args.engine == "asyncio":
+            server.serve_async()
+        elif args.engine == "threadpool":
+            server.serve_threaded()
+        else:
+            server.start()
+    finally:
+        server.close()
 
 
 if __name__ == "__main__":
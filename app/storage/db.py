@@ -1,11 +1,36 @@
-"""MySQL users table + salted hashing (no chat storage)."""
+"""MySQL users table + salted hashing (no chat storage).
+
+Passwords are hashed with a configurable KDF (PASSWORD_KDF) whose name and
+parameters are stored with each user in the kdf column:
+    
+    sha256                  hex(SHA256(salt || password)), the original scheme
+    scrypt$<n>$<r>$<p>      hex(scrypt(password, salt, n, r, p, 32 bytes))
+    pbkdf2-sha256$<iters>   hex(PBKDF2-HMAC-SHA256(password, salt, iters, 32 bytes))
+
+A user whose stored KDF differs from the configured one is re-hashed on
+their next successful login. The slow KDFs run on a bounded thread pool
+(hashlib releases the interpreter while hashing) that turns logins away
+once too many are queued, so a login burst cannot starve chat traffic.
+"""
 
 import pymysql
+import csv
 import os
 import secrets
 import hashlib
 import sys
-from typing import Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Set, TextIO, Tuple, Union
+
+from app.storage.pool import ConnectionPool
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
 
 
 def get_db_connection():
@@ -17,15 +42,64 @@ def get_db_connection():
         password=os.getenv('DB_PASSWORD', 'scpass'),
         database=os.getenv('DB_NAME', 'securechat'),
         charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
+        cursorclass=pymysql.cursors.DictCursor,
+        # A pooled connection must not carry an open read snapshot into its next checkout
+        autocommit=True
     )
 
 
+def get_pool() -> ConnectionPool:
+    """
+    Connection pool shared by the threads of this process, created on first
+    use with DB_POOL_MIN_SIZE connections opened up front.
+    
+    A forked child (prefork worker) gets its own pool; the sockets inherited
+    from the parent are left alone rather than closed, since closing them
+    would also end the parent's sessions.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            pool = ConnectionPool(
+                get_db_connection,
+                min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+                max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),
+                ping_interval=float(os.getenv('DB_POOL_PING_INTERVAL', 5))
+            )
+            try:
+                pool.fill()
+            except Exception as e:
+                # Checkouts open connections on demand (and report errors) instead
+                print(f"Error opening database connections: {e}")
+            _pool = pool
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def pool_stats() -> Optional[dict]:
+    """Wait-time and connection metrics of this process's pool, or None if it was never used."""
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            return None
+        return _pool.stats()
+
+
+def close_pool():
+    """Close this process's pool (idle connections now, checked-out ones on return)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+
 def init_database():
     """Initialize database and create users table."""
-    conn = get_db_connection()
     try:
-        with conn.cursor() as cursor:
+        with get_pool().connection() as conn, conn.cursor() as cursor:
             # Create users table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -33,17 +107,24 @@ def init_database():
                     username VARCHAR(255) NOT NULL UNIQUE,
                     salt VARBINARY(16) NOT NULL,
                     pwd_hash CHAR(64) NOT NULL,
+                    kdf VARCHAR(64) NOT NULL DEFAULT 'sha256',
                     PRIMARY KEY (username),
                     INDEX idx_email (email)
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
             """)
-        conn.commit()
+            
+            # Tables created before per-user KDFs: existing hashes are SHA-256
+            cursor.execute(
+                "SELECT COUNT(*) AS n FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' AND COLUMN_NAME = 'kdf'"
+            )
+            if cursor.fetchone()['n'] == 0:
+                cursor.execute("ALTER TABLE users ADD COLUMN kdf VARCHAR(64) NOT NULL DEFAULT 'sha256'")
+            conn.commit()
         print("Database initialized successfully.")
     except Exception as e:
         print(f"Error initializing database: {e}")
         raise
-    finally:
-        conn.close()
 
 
 def generate_salt() -> bytes:
@@ -64,6 +145,210 @@ def compute_password_hash(password: str, salt: bytes) -> str:
     return hash_value.hex()
 
 
+KDF_SHA256 = "sha256"
+KDF_SCRYPT = "scrypt"
+KDF_PBKDF2 = "pbkdf2-sha256"
+
+HASH_BYTES = 32  # every KDF fills the same CHAR(64) pwd_hash column
+
+
+def configured_kdf() -> str:
+    """KDF and parameters for new hashes, from PASSWORD_KDF and its parameter variables."""
+    name = os.getenv("PASSWORD_KDF", KDF_SCRYPT).strip().lower()
+    if name == KDF_SCRYPT:
+        return "{}${}${}${}".format(
+            KDF_SCRYPT,
+            int(os.getenv("PASSWORD_SCRYPT_N", 16384)),
+            int(os.getenv("PASSWORD_SCRYPT_R", 8)),
+            int(os.getenv("PASSWORD_SCRYPT_P", 1))
+        )
+    if name in (KDF_PBKDF2, "pbkdf2"):
+        return "{}${}".format(KDF_PBKDF2, int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 600000)))
+    if name == KDF_SHA256:
+        return KDF_SHA256
+    raise ValueError(f"Unknown PASSWORD_KDF: {name} (expected scrypt, pbkdf2 or sha256)")
+
+
+def hash_password(password: str, salt: bytes, kdf: str) -> str:
+    """
+    Hash a password with a KDF as stored in the kdf column.
+    
+    Args:
+        password: Plain text password
+        salt: Per-user salt
+        kdf: KDF name and parameters (see module docstring)
+    
+    Returns:
+        Hex hash (64 characters)
+    
+    Raises:
+        ValueError: for an unknown or malformed KDF
+    """
+    name, *params = kdf.split("$")
+    if name == KDF_SHA256 and not params:
+        return compute_password_hash(password, salt)
+    if name == KDF_SCRYPT and len(params) == 3:
+        n, r, p = (int(x) for x in params)
+        return hashlib.scrypt(
+            password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r + (1 << 20), dklen=HASH_BYTES
+        ).hex()
+    if name == KDF_PBKDF2 and len(params) == 1:
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, int(params[0]), HASH_BYTES).hex()
+    raise ValueError(f"Unknown password KDF: {kdf}")
+
+
+class HasherBusy(Exception):
+    """Too many password hashes are queued; the login should be retried later."""
+
+
+class PasswordHasher:
+    """
+    Bounded pool for password hashing.
+    
+    At most workers hashes run at once and at most queue_depth more wait;
+    beyond that hash() raises HasherBusy at once rather than queueing, so
+    a burst of logins is turned away instead of piling up behind the KDF.
+    
+    hash() still blocks its caller until the hash is done. Only the asyncio
+    engine keeps serving other sessions meanwhile, because it calls hash()
+    from its auth executor. The blocking engine runs each session inside
+    the accept loop and a threadpool worker waits on its own thread, so
+    for those engines the pool bounds concurrency and admission but a
+    login still stalls its caller for one KDF run.
+    """
+    
+    def __init__(self, kdf: str, workers: int = 2, queue_depth: int = 32):
+        """
+        Initialize password hasher.
+        
+        Args:
+            kdf: KDF for new hashes
+            workers: Hashes computed concurrently
+            queue_depth: Hashes allowed to wait for a worker
+        """
+        self.kdf = kdf
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+    
+    def hash(self, password: str, salt: bytes, kdf: Optional[str] = None) -> str:
+        """
+        Hash a password on the pool and wait for the result (the calling
+        thread blocks; see the class docstring).
+        
+        Args:
+            password: Plain text password
+            salt: Per-user salt
+            kdf: Stored KDF to verify against (default: the configured one)
+        
+        Raises:
+            HasherBusy: if the queue is full
+        """
+        kdf = kdf or self.kdf
+        if kdf == KDF_SHA256:
+            # Cheap enough to run inline
+            return compute_password_hash(password, salt)
+        
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise HasherBusy("Too many logins in progress, try again later")
+            self._in_flight += 1
+        try:
+            return self._executor.submit(hash_password, password, salt, kdf).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+    
+    def hash_many(self, items: Iterable[Tuple[str, bytes]]) -> List[str]:
+        """Hash (password, salt) pairs with the configured KDF on all workers; no queue limit (offline use)."""
+        if self.kdf == KDF_SHA256:
+            return [compute_password_hash(password, salt) for password, salt in items]
+        return list(self._executor.map(lambda item: hash_password(item[0], item[1], self.kdf), items))
+    
+    def close(self):
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=False)
+
+
+_hasher: Optional[PasswordHasher] = None
+_hasher_pid: Optional[int] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Password hashing pool of this process, created on first use (PASSWORD_* settings)."""
+    global _hasher, _hasher_pid
+    with _pool_lock:
+        if _hasher is None or _hasher_pid != os.getpid():
+            _hasher = PasswordHasher(
+                configured_kdf(),
+                workers=int(os.getenv("PASSWORD_HASH_WORKERS", 2)),
+                queue_depth=int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+            )
+            _hasher_pid = os.getpid()
+        return _hasher
+
+
+def new_password_hash(password: str) -> Tuple[bytes, str, str]:
+    """
+    Salt and hash a password with the configured KDF, on the hashing pool.
+    
+    Returns:
+        (salt, pwd_hash, kdf)
+    
+    Raises:
+        HasherBusy: if the hashing queue is full
+    """
+    hasher = get_password_hasher()
+    salt = generate_salt()
+    return salt, hasher.hash(password, salt), hasher.kdf
+
+
+def check_password(
+    user: Optional[dict],
+    password: str,
+    update_hash: Callable[[str, bytes, str, str], None]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password against a user record, upgrading an outdated hash.
+    
+    Args:
+        user: Record from get_user_by_email (None if not found)
+        password: Plain text password
+        update_hash: Stores (username, salt, pwd_hash, kdf) for the user
+    
+    Returns:
+        (is_authenticated, username_or_error_message)
+    """
+    if not user:
+        return False, "User not found"
+    
+    hasher = get_password_hasher()
+    kdf = user.get('kdf') or KDF_SHA256
+    try:
+        computed_hash = hasher.hash(password, user['salt'], kdf)
+    except HasherBusy as e:
+        return False, f"BUSY: {e}"
+    
+    # Compare with stored hash (constant-time comparison to prevent timing attacks)
+    if not constant_time_compare(computed_hash, user['pwd_hash']):
+        return False, "Invalid password"
+    
+    if kdf != hasher.kdf:
+        # Only now do we have the password to re-hash with the configured KDF
+        try:
+            salt, pwd_hash, new_kdf = new_password_hash(password)
+            update_hash(user['username'], salt, pwd_hash, new_kdf)
+        except Exception as e:
+            # Keep the old hash; the next login tries again
+            print(f"Could not upgrade password hash for {user['username']}: {e}")
+    return True, user['username']
+
+
 def register_user(email: str, username: str, password: str) -> Tuple[bool, str]:
     """
     Register a new user with salted password hash.
@@ -76,9 +361,14 @@ def register_user(email: str, username: str, password: str) -> Tuple[bool, str]:
     Returns:
         (success, error_message)
     """
-    conn = get_db_connection()
+    # Hash before taking a connection: the KDF is the slow part
     try:
-        with conn.cursor() as cursor:
+        salt, pwd_hash, kdf = new_password_hash(password)
+    except HasherBusy as e:
+        return False, f"BUSY: {e}"
+    
+    try:
+        with get_pool().connection() as conn, conn.cursor() as cursor:
             # Check if username or email already exists
             cursor.execute(
                 "SELECT username, email FROM users WHERE username = %s OR email = %s",
@@ -91,24 +381,239 @@ def register_user(email: str, username: str, password: str) -> Tuple[bool, str]:
                 if existing['email'] == email:
                     return False, "Email already exists"
             
-            # Generate salt
-            salt = generate_salt()
-            
-            # Compute password hash
-            pwd_hash = compute_password_hash(password, salt)
-            
             # Insert user
             cursor.execute(
-                "INSERT INTO users (email, username, salt, pwd_hash) VALUES (%s, %s, %s, %s)",
-                (email, username, salt, pwd_hash)
+                "INSERT INTO users (email, username, salt, pwd_hash, kdf) VALUES (%s, %s, %s, %s, %s)",
+                (email, username, salt, pwd_hash, kdf)
             )
             conn.commit()
             return True, "User registered successfully"
     except Exception as e:
-        conn.rollback()
+        # The pool has already rolled the connection back
         return False, f"Registration failed: {str(e)}"
+
+
+# (email, username, salt, pwd_hash, kdf), in users column order
+UserRecord = Tuple[str, str, bytes, str, str]
+
+BULK_CHUNK_SIZE = 1000
+# MySQL error code for a duplicate key in a unique index
+ER_DUP_ENTRY = 1062
+
+# A CSV text stream or an iterable of dicts / (email, username, password) tuples
+UserRows = Union[TextIO, Iterable]
+
+
+def iter_user_rows(source: UserRows) -> Iterator[Tuple[int, dict]]:
+    """
+    Number the rows of a bulk import.
+    
+    Args:
+        source: Text stream of CSV with an email,username,password header, or
+            an iterable of dicts with those keys or (email, username, password) tuples
+    
+    Yields:
+        (line or row number, row dict)
+    """
+    if hasattr(source, 'read'):
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, row in enumerate(source, 1):
+        if not isinstance(row, dict):
+            row = dict(zip(("email", "username", "password"), row))
+        yield number, row
+
+
+def bulk_register(
+    source: UserRows,
+    find_existing: Callable[[List[str], List[str]], Tuple[Set[str], Set[str]]],
+    insert_many: Callable[[List[UserRecord]], List[Optional[str]]],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Register users chunk by chunk, for any backend.
+    
+    Each chunk costs one duplicate lookup and one batched insert instead of
+    a lookup, an insert and a commit per user.
+    
+    Args:
+        source: Rows, as accepted by iter_user_rows
+        find_existing: (usernames, emails) -> the ones already registered
+        insert_many: Inserts a chunk; returns an error (or None) per record
+        chunk_size: Rows per lookup and insert transaction
+        progress: Called with (rows processed, users registered) after each chunk
+    
+    Returns:
+        (users registered, [(line or row number, error message)])
+    """
+    registered = 0
+    processed = 0
+    failures: List[Tuple[int, str]] = []
+    # Usernames and emails claimed earlier in this import
+    seen_usernames: Set[str] = set()
+    seen_emails: Set[str] = set()
+    
+    hasher = get_password_hasher()
+    rows = iter_user_rows(source)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        processed += len(chunk)
+        
+        candidates = []
+        for number, row in chunk:
+            email = (row.get('email') or '').strip()
+            username = (row.get('username') or '').strip()
+            password = row.get('password') or ''
+            if not email or not username or not password:
+                failures.append((number, "Missing email, username or password"))
+            elif username in seen_usernames:
+                failures.append((number, "Username already exists"))
+            elif email in seen_emails:
+                failures.append((number, "Email already exists"))
+            else:
+                seen_usernames.add(username)
+                seen_emails.add(email)
+                candidates.append((number, email, username, password))
+        if not candidates:
+            continue
+        
+        taken_usernames, taken_emails = find_existing(
+            [username for _, _, username, _ in candidates], [email for _, email, _, _ in candidates]
+        )
+        numbers = []
+        accepted = []
+        for number, email, username, password in candidates:
+            if username in taken_usernames:
+                failures.append((number, "Username already exists"))
+            elif email in taken_emails:
+                failures.append((number, "Email already exists"))
+            else:
+                numbers.append(number)
+                accepted.append((email, username, password, generate_salt()))
+        
+        # The whole chunk is hashed across the hashing pool's workers
+        hashes = hasher.hash_many([(password, salt) for _, _, password, salt in accepted])
+        records: List[UserRecord] = [
+            (email, username, salt, pwd_hash, hasher.kdf)
+            for (email, username, _, salt), pwd_hash in zip(accepted, hashes)
+        ]
+        
+        if records:
+            for number, error in zip(numbers, insert_many(records)):
+                if error:
+                    failures.append((number, error))
+                else:
+                    registered += 1
+        if progress:
+            progress(processed, registered)
+    
+    failures.sort()
+    return registered, failures
+
+
+def _find_existing(conn, usernames: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+    """Which of these usernames and emails are already in the MySQL users table."""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT username, email FROM users WHERE username IN ({}) OR email IN ({})".format(
+                ", ".join(["%s"] * len(usernames)), ", ".join(["%s"] * len(emails))
+            ),
+            usernames + emails
+        )
+        rows = cursor.fetchall()
+    return {row['username'] for row in rows}, {row['email'] for row in rows}
+
+
+def _insert_many(conn, records: List[UserRecord]) -> List[Optional[str]]:
+    """Insert a chunk in one transaction; on a conflict, retry row by row to find the culprits."""
+    query = "INSERT INTO users (email, username, salt, pwd_hash, kdf) VALUES (%s, %s, %s, %s, %s)"
+    try:
+        conn.begin()
+        with conn.cursor() as cursor:
+            cursor.executemany(query, records)
+        conn.commit()
+        return [None] * len(records)
+    except pymysql.err.IntegrityError:
+        # Someone registered one of these names since the duplicate lookup
+        conn.rollback()
+    
+    errors: List[Optional[str]] = []
+    with conn.cursor() as cursor:
+        for record in records:
+            try:
+                cursor.execute(query, record)
+                errors.append(None)
+            except pymysql.err.IntegrityError as e:
+                errors.append(_integrity_error_message(e))
+    return errors
+
+
+def _integrity_error_message(error: pymysql.err.IntegrityError) -> str:
+    """Registration error for a failed insert: a duplicate username, or the constraint MySQL reported."""
+    code, message = error.args[0], str(error.args[-1])
+    # "Duplicate entry 'alice' for key 'users.PRIMARY'" ('PRIMARY' before MySQL 8)
+    key = message.rsplit(" for key ", 1)[-1].strip("'").split('.')[-1]
+    if code == ER_DUP_ENTRY and key in ("PRIMARY", "username"):
+        return "Username already exists"
+    return f"Constraint violated: {message}"
+
+
+def register_users_bulk(
+    source: UserRows,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Register many users at once: batched duplicate detection and
+    executemany inserts, one transaction per chunk.
+    
+    Args:
+        source: Text stream of CSV (email,username,password header) or an
+            iterable of dicts or (email, username, password) tuples
+        chunk_size: Rows per duplicate lookup and insert transaction
+        progress: Called with (rows processed, users registered) after each chunk
+    
+    Returns:
+        (users registered, [(line or row number, error message)])
+    """
+    with get_pool().connection() as conn:
+        return bulk_register(
+            source,
+            lambda usernames, emails: _find_existing(conn, usernames, emails),
+            lambda records: _insert_many(conn, records),
+            chunk_size,
+            progress
+        )
+
+
+def import_users_csv(path: str, chunk_size: int = BULK_CHUNK_SIZE):
+    """Bulk-register users from a CSV file into the configured user store, reporting throughput."""
+    from app.storage.userstore import create_user_store
+    store = create_user_store()
+    start = time.perf_counter()
+    
+    def report(processed: int, registered: int):
+        elapsed = time.perf_counter() - start
+        print(f"  {processed} rows, {registered} registered, {processed / elapsed:.0f} rows/s")
+    
+    try:
+        with open(path, newline='', encoding='utf-8') as f:
+            registered, failures = store.register_users_bulk(f, chunk_size, report)
     finally:
-        conn.close()
+        store.close()
+    elapsed = time.perf_counter() - start
+    
+    for number, error in failures[:20]:
+        print(f"  line {number}: {error}")
+    if len(failures) > 20:
+        print(f"  ... and {len(failures) - 20} more")
+    print(f"Imported {registered} users in {elapsed:.2f}s ({registered / elapsed:.0f} users/s), "
+          f"{len(failures)} rows failed.")
 
 
 def verify_user(email: str, password: str, salt: bytes) -> bool:
@@ -136,21 +641,18 @@ def get_user_by_email(email: str) -> Optional[dict]:
         email: User email
     
     Returns:
-        User record with salt and pwd_hash, or None if not found
+        User record with salt, pwd_hash and kdf, or None if not found
     """
-    conn = get_db_connection()
     try:
-        with conn.cursor() as cursor:
+        with get_pool().connection() as conn, conn.cursor() as cursor:
             cursor.execute(
-                "SELECT email, username, salt, pwd_hash FROM users WHERE email = %s",
+                "SELECT email, username, salt, pwd_hash, kdf FROM users WHERE email = %s",
                 (email,)
             )
             return cursor.fetchone()
     except Exception as e:
         print(f"Error getting user: {e}")
         return None
-    finally:
-        conn.close()
 
 
 def authenticate_user(email: str, password: str) -> Tuple[bool, Optional[str]]:
@@ -164,22 +666,17 @@ def authenticate_user(email: str, password: str) -> Tuple[bool, Optional[str]]:
     Returns:
         (is_authenticated, username_or_error_message)
     """
-    user = get_user_by_email(email)
-    if not user:
-        return False, "User not found"
-    
-    # Get salt from database
-    salt = user['salt']
-    
-    # Compute password hash
-    computed_hash = compute_password_hash(password, salt)
-    
-    # Compare with stored hash (constant-time comparison to prevent timing attacks)
-    stored_hash = user['pwd_hash']
-    if constant_time_compare(computed_hash, stored_hash):
-        return True, user['username']
-    else:
-        return False, "Invalid password"
+    return check_password(get_user_by_email(email), password, update_password_hash)
+
+
+def update_password_hash(username: str, salt: bytes, pwd_hash: str, kdf: str):
+    """Replace a user's salt, hash and KDF (hash upgrade on login)."""
+    with get_pool().connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "UPDATE users SET salt = %s, pwd_hash = %s, kdf = %s WHERE username = %s",
+            (salt, pwd_hash, kdf, username)
+        )
+        conn.commit()
 
 
 def constant_time_compare(a: str, b: str) -> bool:
@@ -204,6 +701,13 @@ def constant_time_compare(a: str, b: str) -> bool:
 if __name__ == '__main__':
     # Allow initialization via command line
     if '--init' in sys.argv:
-        init_database()
+        # Initialize whichever backend USER_STORE selects
+        from app.storage.userstore import create_user_store
+        store = create_user_store()
+        store.init()
+        store.close()
+    elif '--import' in sys.argv and sys.argv.index('--import') + 1 < len(sys.argv):
+        import_users_csv(sys.argv[sys.argv.index('--import') + 1])
     else:
         print("Usage: python -m app.storage.db --init")
+        print("       python -m app.storage.db --import users.csv")
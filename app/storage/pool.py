@@ -0,0 +1,274 @@
+"""Thread-safe database connection pool with health checks, idle timeout and recycling."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout."""
+
+
+class PooledConnection:
+    """A pooled connection with the timestamps the pool needs."""
+    
+    __slots__ = ('conn', 'created_at', 'last_used')
+    
+    def __init__(self, conn: object):
+        """
+        Initialize pool entry.
+        
+        Args:
+            conn: Open DB-API connection
+        """
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Pool of DB-API connections shared by all threads of a process.
+    
+    Checkout hands out the most recently used idle connection, opens a new
+    one while fewer than max_size are open, and otherwise waits (up to
+    timeout) for one to come back. A connection idle for longer than
+    ping_interval is pinged before it is handed out and replaced if the
+    ping fails. Connections older than max_lifetime are recycled, and idle
+    connections beyond min_size are closed after idle_timeout. A connection
+    whose user raised is rolled back, or dropped if even that fails.
+    
+    Wait metrics cover the time from checkout request to having a
+    connection, including opening one.
+    """
+    
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 10.0,
+        idle_timeout: float = 300.0,
+        max_lifetime: float = 3600.0,
+        ping_interval: float = 5.0,
+        ping: Optional[Callable[[object], None]] = None
+    ):
+        """
+        Initialize connection pool.
+        
+        Args:
+            connect: Opens a new connection
+            min_size: Connections kept open even when idle
+            max_size: Most connections open at once (in use + idle)
+            timeout: Seconds a checkout waits for a connection before PoolTimeout
+            idle_timeout: Seconds an idle connection beyond min_size is kept
+            max_lifetime: Seconds after which a connection is replaced (0 = never)
+            ping_interval: Idle seconds after which a checkout pings first (0 = always)
+            ping: Health check raising on a dead connection (default conn.ping(reconnect=False))
+        """
+        self.connect = connect
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.ping = ping or (lambda conn: conn.ping(reconnect=False))
+        
+        self._idle: Deque[PooledConnection] = deque()
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        
+        # Metrics
+        self.checkouts = 0
+        self.waits = 0  # checkouts that blocked until a connection came back
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.failed_checks = 0
+    
+    @contextmanager
+    def connection(self) -> Iterator[object]:
+        """Check a connection out for the duration of a with block."""
+        entry = self.acquire()
+        try:
+            yield entry.conn
+        except BaseException:
+            self.release(entry, discard=not self._rollback(entry.conn))
+            raise
+        self.release(entry)
+    
+    def acquire(self) -> PooledConnection:
+        """
+        Check out a connection; prefer connection() which always returns it.
+        
+        Raises:
+            PoolTimeout: if none is available within the timeout
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+        waited = False
+        while entry is None:
+            stale: List[PooledConnection] = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("Connection pool is closed")
+                    now = time.monotonic()
+                    stale.extend(self._expire_idle_locked(now))
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._open < self.max_size:
+                        # Reserve a slot and open the connection outside the lock
+                        self._open += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                    waited = True
+                    self._cond.wait(remaining)
+            self._close_all(stale)
+            
+            if entry is None:
+                entry = self._open_new()
+            elif not self._healthy(entry):
+                self._discard(entry)
+                entry = None
+        
+        wait = time.monotonic() - start
+        with self._cond:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+        return entry
+    
+    def release(self, entry: PooledConnection, discard: bool = False):
+        """Return a checked-out connection (closing it if discard or past max_lifetime)."""
+        now = time.monotonic()
+        if discard or self._closed or self._expired(entry, now):
+            if not discard and not self._closed:
+                with self._cond:
+                    self.recycled += 1
+            self._discard(entry)
+            return
+        
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+    
+    def fill(self):
+        """Open connections until min_size are open."""
+        while True:
+            with self._cond:
+                if self._closed or self._open >= self.min_size:
+                    return
+                self._open += 1
+            entry = self._open_new()
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+    
+    def stats(self) -> Dict[str, float]:
+        """Checkout, wait-time and connection counters."""
+        with self._cond:
+            return {
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_avg_ms": round(1000 * self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 3),
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "recycled": self.recycled,
+                "failed_checks": self.failed_checks
+            }
+    
+    def close(self):
+        """Close idle connections and refuse further checkouts; in-use ones close on release."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+    
+    def _open_new(self) -> PooledConnection:
+        """Open a connection for a slot already reserved in _open."""
+        try:
+            entry = PooledConnection(self.connect())
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return entry
+    
+    def _healthy(self, entry: PooledConnection) -> bool:
+        """Check an idle connection before handing it out."""
+        now = time.monotonic()
+        if self._expired(entry, now):
+            with self._cond:
+                self.recycled += 1
+            return False
+        if now - entry.last_used < self.ping_interval:
+            return True
+        try:
+            self.ping(entry.conn)
+            return True
+        except Exception:
+            with self._cond:
+                self.failed_checks += 1
+            return False
+    
+    def _expired(self, entry: PooledConnection, now: float) -> bool:
+        """True if the connection is past max_lifetime."""
+        return self.max_lifetime > 0 and now - entry.created_at >= self.max_lifetime
+    
+    def _expire_idle_locked(self, now: float) -> List[PooledConnection]:
+        """Take idle connections beyond min_size that passed idle_timeout out of the pool; caller holds the lock."""
+        stale = []
+        # Oldest idle connections are at the left
+        while len(self._idle) > self.min_size and now - self._idle[0].last_used >= self.idle_timeout:
+            stale.append(self._idle.popleft())
+            self._open -= 1
+        return stale
+    
+    def _discard(self, entry: PooledConnection):
+        """Close a checked-out connection and free its slot."""
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+        self._close_all([entry])
+    
+    @staticmethod
+    def _close_all(entries: List[PooledConnection]):
+        """Close connections, ignoring errors from already dead ones."""
+        for entry in entries:
+            try:
+                entry.conn.close()
+            except Exception:
+                pass
+    
+    @staticmethod
+    def _rollback(conn: object) -> bool:
+        """Roll back after an error; False if the connection is unusable."""
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
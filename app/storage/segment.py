@@ -0,0 +1,321 @@
+"""Indexed binary transcript segments with an mmap reader.
+
+A segment holds the same entries as a text transcript, with raw bytes
+instead of base64 and a fixed-size header per record:
+    
+    segment    SEGMENT_MAGIC, then records back to back
+    record     seqno (8) | timestamp (8) | ciphertext length (4) |
+               signature length (4) | peer cert fingerprint (32) |
+               ciphertext | signature
+    index      INDEX_MAGIC, then seqno (8) | record offset (8) per record
+
+All integers are big-endian. The index sits next to the segment
+(<segment>.idx) and is ordered by seqno. Seqnos in a session normally
+run without gaps, so a lookup goes straight to index slot
+seqno - first_seq, and falls back to a binary search over the index
+when there are gaps. Both files are mapped with mmap. A record's
+ciphertext and signature are memoryview slices of the mapping, so
+reading them copies nothing.
+
+The transcript hash and Merkle root are defined over the text lines.
+The reader rebuilds each record's canonical line
+(seqno|timestamp|base64 ciphertext|base64 signature|fingerprint) to
+compute them, so they match the session receipt. The converter refuses
+any line that would not rebuild byte for byte, and checks the hash of
+the whole segment against the text transcript before returning.
+
+    python -m app.storage.segment --convert transcripts/client_alice_1700000000000.txt
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from typing import Iterator, Optional, Tuple
+
+from app.common.utils import b64e, b64d
+from app.storage.transcript import Transcript, build_merkle_tree
+
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+SEGMENT_MAGIC = b"SCTSEG01"
+INDEX_MAGIC = b"SCTIDX01"
+
+# seqno, timestamp, ciphertext length, signature length, fingerprint
+RECORD_HEADER = struct.Struct(">QQII32s")
+# seqno, record offset
+INDEX_ENTRY = struct.Struct(">QQ")
+
+
+class SegmentRecord:
+    """One transcript entry read from a segment; ciphertext and signature are views into the mapping."""
+    
+    __slots__ = ('seqno', 'timestamp', 'ciphertext', 'signature', 'fingerprint')
+    
+    def __init__(self, seqno: int, timestamp: int, ciphertext: memoryview, signature: memoryview, fingerprint: str):
+        """
+        Initialize record.
+        
+        Args:
+            seqno: Sequence number
+            timestamp: Timestamp in milliseconds
+            ciphertext: Raw ciphertext (view into the segment)
+            signature: Raw signature or HMAC tag (view into the segment)
+            fingerprint: Hexadecimal peer certificate fingerprint
+        """
+        self.seqno = seqno
+        self.timestamp = timestamp
+        self.ciphertext = ciphertext
+        self.signature = signature
+        self.fingerprint = fingerprint
+    
+    def canonical_entry(self) -> str:
+        """The text transcript line for this record, as hashed by receipts."""
+        return f"{self.seqno}|{self.timestamp}|{b64e(self.ciphertext)}|{b64e(self.signature)}|{self.fingerprint}"
+
+
+class SegmentWriter:
+    """Appends records to a new segment and its index."""
+    
+    def __init__(self, segment_file: str):
+        """
+        Create (or truncate) a segment and its index.
+        
+        Args:
+            segment_file: Path to the segment; the index goes to segment_file + INDEX_SUFFIX
+        """
+        self.segment_file = segment_file
+        os.makedirs(os.path.dirname(segment_file) or '.', exist_ok=True)
+        self._segment = open(segment_file, 'wb')
+        self._index = open(segment_file + INDEX_SUFFIX, 'wb')
+        self._segment.write(SEGMENT_MAGIC)
+        self._index.write(INDEX_MAGIC)
+        self._offset = len(SEGMENT_MAGIC)
+        self.last_seq: Optional[int] = None
+        self.count = 0
+    
+    def append(self, seqno: int, timestamp: int, ciphertext: bytes, signature: bytes, peer_cert_fingerprint: str):
+        """
+        Append a record.
+        
+        Args:
+            seqno: Sequence number (greater than the previous record's)
+            timestamp: Timestamp in milliseconds
+            ciphertext: Raw ciphertext
+            signature: Raw signature or HMAC tag
+            peer_cert_fingerprint: Hexadecimal SHA-256 certificate fingerprint
+        
+        Raises:
+            ValueError: if seqno does not increase or the fingerprint is not 32 bytes of hex
+        """
+        if self.last_seq is not None and seqno <= self.last_seq:
+            raise ValueError(f"Sequence number {seqno} does not follow {self.last_seq}")
+        fingerprint = bytes.fromhex(peer_cert_fingerprint)
+        if len(fingerprint) != 32:
+            raise ValueError(f"Fingerprint is not a SHA-256 hash: {peer_cert_fingerprint}")
+        
+        header = RECORD_HEADER.pack(seqno, timestamp, len(ciphertext), len(signature), fingerprint)
+        self._segment.write(header)
+        self._segment.write(ciphertext)
+        self._segment.write(signature)
+        self._index.write(INDEX_ENTRY.pack(seqno, self._offset))
+        self._offset += len(header) + len(ciphertext) + len(signature)
+        self.last_seq = seqno
+        self.count += 1
+    
+    def close(self):
+        """Flush and close both files."""
+        self._segment.close()
+        self._index.close()
+    
+    def __enter__(self) -> "SegmentWriter":
+        """Use as a context manager."""
+        return self
+    
+    def __exit__(self, *exc):
+        """Close on leaving the with block."""
+        self.close()
+
+
+class SegmentReader:
+    """
+    Random access to a segment by seqno through mmap.
+    
+    Records hold views into the mapping: release them (or copy what you
+    need with bytes()) before close(), which cannot unmap while views exist.
+    """
+    
+    def __init__(self, segment_file: str):
+        """
+        Map a segment and its index.
+        
+        Args:
+            segment_file: Path to the segment
+        
+        Raises:
+            ValueError: if either file is not a transcript segment
+        """
+        self.segment_file = segment_file
+        self._segment_fh = open(segment_file, 'rb')
+        self._index_fh = open(segment_file + INDEX_SUFFIX, 'rb')
+        self._segment = mmap.mmap(self._segment_fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = mmap.mmap(self._index_fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._segment[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC or self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"Not a transcript segment: {segment_file}")
+        self._view = memoryview(self._segment)
+        self._count = (len(self._index) - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+        self.first_seq = self._index_entry(0)[0] if self._count else None
+        self.last_seq = self._index_entry(self._count - 1)[0] if self._count else None
+    
+    def __len__(self) -> int:
+        """Number of records."""
+        return self._count
+    
+    def offset_of(self, seqno: int) -> Optional[int]:
+        """Offset of the record for seqno: O(1) without gaps, otherwise a binary search."""
+        if not self._count:
+            return None
+        slot = seqno - self.first_seq
+        if 0 <= slot < self._count:
+            found, offset = self._index_entry(slot)
+            if found == seqno:
+                return offset
+        
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, offset = self._index_entry(mid)
+            if found == seqno:
+                return offset
+            if found < seqno:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+    
+    def get(self, seqno: int) -> Optional[SegmentRecord]:
+        """Record for seqno, or None if the segment has none."""
+        offset = self.offset_of(seqno)
+        return self._record_at(offset)[0] if offset is not None else None
+    
+    def __iter__(self) -> Iterator[SegmentRecord]:
+        """Records in order."""
+        offset = len(SEGMENT_MAGIC)
+        for _ in range(self._count):
+            record, offset = self._record_at(offset)
+            yield record
+    
+    def entries(self) -> Iterator[str]:
+        """Canonical text lines, in order."""
+        for record in self:
+            yield record.canonical_entry()
+    
+    def compute_transcript_hash(self) -> str:
+        """Transcript hash over the canonical lines (equal to the text transcript's)."""
+        digest = hashlib.sha256()
+        for i, entry in enumerate(self.entries()):
+            digest.update((entry if i == 0 else '\n' + entry).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def compute_merkle_root(self, workers: int = 0) -> str:
+        """Merkle root over the canonical lines (equal to the text transcript's)."""
+        return build_merkle_tree(self.entries(), workers=workers)[1].hex()
+    
+    def close(self):
+        """Unmap and close both files."""
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        self._segment.close()
+        self._index.close()
+        self._segment_fh.close()
+        self._index_fh.close()
+    
+    def __enter__(self) -> "SegmentReader":
+        """Use as a context manager."""
+        return self
+    
+    def __exit__(self, *exc):
+        """Close on leaving the with block."""
+        self.close()
+    
+    def _index_entry(self, slot: int) -> Tuple[int, int]:
+        """(seqno, offset) in index slot."""
+        return INDEX_ENTRY.unpack_from(self._index, len(INDEX_MAGIC) + slot * INDEX_ENTRY.size)
+    
+    def _record_at(self, offset: int) -> Tuple[SegmentRecord, int]:
+        """Record at offset, and the offset of the next one."""
+        seqno, timestamp, ct_len, sig_len, fingerprint = RECORD_HEADER.unpack_from(self._segment, offset)
+        start = offset + RECORD_HEADER.size
+        ciphertext = self._view[start:start + ct_len]
+        signature = self._view[start + ct_len:start + ct_len + sig_len]
+        record = SegmentRecord(seqno, timestamp, ciphertext, signature, fingerprint.hex())
+        return record, start + ct_len + sig_len
+
+
+def parse_entry(entry: str) -> Tuple[int, int, bytes, bytes, str]:
+    """
+    Split a text transcript line into segment fields.
+    
+    Returns:
+        (seqno, timestamp, ciphertext, signature, fingerprint)
+    
+    Raises:
+        ValueError: if the line would not rebuild byte for byte from a segment record
+    """
+    parts = entry.split('|')
+    if len(parts) != 5:
+        raise ValueError("expected seqno|timestamp|ciphertext|signature|fingerprint")
+    seqno, timestamp, ciphertext, signature, fingerprint = parts
+    fields = (int(seqno), int(timestamp), b64d(ciphertext), b64d(signature), fingerprint)
+    if SegmentRecord(*fields).canonical_entry() != entry:
+        raise ValueError("not in canonical form (base64 padding, hex case or number formatting)")
+    return fields
+
+
+def convert_transcript(transcript_file: str, segment_file: Optional[str] = None) -> Tuple[str, int]:
+    """
+    Convert a text transcript to a segment and its index.
+    
+    Args:
+        transcript_file: Path to the text transcript
+        segment_file: Output path (default: the transcript path with SEGMENT_SUFFIX)
+    
+    Returns:
+        (segment path, number of records)
+    
+    Raises:
+        ValueError: if a line cannot be represented, or the hashes differ afterwards
+    """
+    if segment_file is None:
+        segment_file = os.path.splitext(transcript_file)[0] + SEGMENT_SUFFIX
+    transcript = Transcript(transcript_file, streaming=True)
+    
+    with SegmentWriter(segment_file) as writer:
+        for line_no, entry in enumerate(transcript.get_entries(), 1):
+            try:
+                writer.append(*parse_entry(entry))
+            except (ValueError, struct.error) as e:
+                raise ValueError(f"{transcript_file} entry {line_no}: {e}") from None
+    
+    with SegmentReader(segment_file) as reader:
+        segment_hash = reader.compute_transcript_hash()
+    if segment_hash != transcript.compute_transcript_hash():
+        raise ValueError(f"Segment hash {segment_hash} does not match transcript {transcript_file}")
+    return segment_file, writer.count
+
+
+if __name__ == '__main__':
+    if '--convert' in sys.argv and sys.argv.index('--convert') + 1 < len(sys.argv):
+        for path in sys.argv[sys.argv.index('--convert') + 1:]:
+            try:
+                segment_path, count = convert_transcript(path)
+                print(f"{path} -> {segment_path} ({count} records)")
+            except (OSError, ValueError) as e:
+                print(f"Error converting transcript: {e}")
+                sys.exit(1)
+    else:
+        print("Usage: python -m app.storage.segment --convert transcript.txt [transcript.txt ...]")
@@ -1,26 +1,386 @@
-"""Append-only transcript + TranscriptHash helpers."""
+"""Append-only transcript + TranscriptHash helpers.
+
+A transcript keeps one append handle open and buffers entries in it. When
+the buffer reaches the file depends on the flush policy:
+    
+    message  after every entry (default)
+    batch    after flush_entries entries, or once the oldest unflushed
+             entry is flush_ms old (a timer flushes a batch that stops
+             growing, so a quiet session still reaches the file)
+    receipt  only when the transcript is committed (receipt, close)
+
+With sync=fsync or fdatasync every flush is also made durable. Syncs are
+group commits: an entry appended while another thread is syncing waits
+for that sync, then one sync covers everything appended meanwhile.
+commit() flushes and syncs whatever is outstanding; receipts are only
+built after it returns.
+
+The transcript hash, SHA256 of the entries joined by newlines, is kept as
+a running SHA-256 state fed each entry as it is appended (with the newline
+before every entry but the first), so it costs nothing at receipt time and
+is byte-identical to hashing the joined entries. Every SNAPSHOT_INTERVAL
+entries a copy of the state is kept, so the hash of any prefix (up to a
+given seqno) replays at most that many entries.
+
+In streaming mode entries go only to the file: get_entries() reads them
+back lazily and hash_at() replays from the file offset saved with each
+state. Saved states are capped at MAX_STREAM_SNAPSHOTS (when full, every
+other one is dropped and the interval doubles), so a streaming transcript
+holds a fixed amount whatever its length:
+    
+    file buffers            ~16 KiB (byte buffer + text chunk)
+    saved hash states       up to MAX_STREAM_SNAPSHOTS x ~0.3 KiB
+    running hash, counters  < 1 KiB
+
+Over a 10M-entry synthetic transcript (scripts/bench_transcript.py
+--streaming) that was 42 KiB held and 74 KiB peak, with no measurable
+RSS growth beyond 256 KiB; the default mode holds about 0.5 KiB per
+entry (51 MiB per 100k). hash_at() in streaming mode reads back up to
+count / MAX_STREAM_SNAPSHOTS * 2 entries from the file.
+
+With merkle=True the transcript also keeps a Merkle tree root over its
+entries (RFC 6962 shape), which the session receipt signs alongside the
+flat hash. One entry can then be shown to be in the session with an
+inclusion proof of log2(n) hashes instead of the whole transcript:
+    
+    leaf = SHA256(0x00 || entry)
+    node = SHA256(0x01 || left || right)
+
+Only the roots of the perfect subtrees appended so far are kept (at most
+log2(n) hashes), so the root is cheap in either mode. Proofs are built
+from the entries in aligned chunks of MERKLE_CHUNK_LEAVES, each of which
+is a subtree of the final tree, so chunks can be hashed on a process pool.
+"""
 
 import os
 import hashlib
-from typing import List, Optional
+import multiprocessing
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 
 
+# Checkpoints (hmac integrity mode) are kept next to the transcript file
+CHECKPOINT_SUFFIX = ".checkpoints"
+
+FLUSH_MESSAGE = "message"
+FLUSH_BATCH = "batch"
+FLUSH_RECEIPT = "receipt"
+FLUSH_POLICIES = [FLUSH_MESSAGE, FLUSH_BATCH, FLUSH_RECEIPT]
+
+SYNC_NONE = "none"
+SYNC_FSYNC = "fsync"
+SYNC_FDATASYNC = "fdatasync"
+SYNC_MODES = [SYNC_NONE, SYNC_FSYNC, SYNC_FDATASYNC]
+
+# Entries between saved running-hash states (for hash_at)
+SNAPSHOT_INTERVAL = 256
+# Most saved states a streaming transcript keeps
+MAX_STREAM_SNAPSHOTS = 256
+
+MERKLE_LEAF_PREFIX = b"\x00"
+MERKLE_NODE_PREFIX = b"\x01"
+# Leaves per chunk when building a tree from entries (a power of two)
+MERKLE_CHUNK_LEAVES = 1 << 16
+# Signed by receipts that carry a Merkle root, ahead of hash, size and root
+RECEIPT_MERKLE_LABEL = b"receipt merkle"
+
+
+def entry_seqno(entry: str) -> Optional[int]:
+    """Sequence number of a transcript line, or None if it has none."""
+    try:
+        return int(entry.split('|', 1)[0])
+    except ValueError:
+        return None
+
+
+def transcript_options_from_env() -> Dict[str, object]:
+    """
+    Transcript settings from TRANSCRIPT_FLUSH, TRANSCRIPT_FLUSH_ENTRIES,
+    TRANSCRIPT_FLUSH_MS, TRANSCRIPT_SYNC, TRANSCRIPT_STREAMING and
+    TRANSCRIPT_MERKLE, as Transcript keyword arguments.
+    
+    Raises:
+        ValueError: for an unknown policy or sync mode
+    """
+    flush = os.getenv("TRANSCRIPT_FLUSH", FLUSH_MESSAGE).strip().lower()
+    sync = os.getenv("TRANSCRIPT_SYNC", SYNC_NONE).strip().lower()
+    if flush not in FLUSH_POLICIES:
+        raise ValueError(f"Unknown TRANSCRIPT_FLUSH: {flush} (expected {', '.join(FLUSH_POLICIES)})")
+    if sync not in SYNC_MODES:
+        raise ValueError(f"Unknown TRANSCRIPT_SYNC: {sync} (expected {', '.join(SYNC_MODES)})")
+    return {
+        "flush": flush,
+        "flush_entries": int(os.getenv("TRANSCRIPT_FLUSH_ENTRIES", 64)),
+        "flush_ms": float(os.getenv("TRANSCRIPT_FLUSH_MS", 100)),
+        "sync": sync,
+        "streaming": os.getenv("TRANSCRIPT_STREAMING", "0").strip().lower() in ("1", "true", "yes"),
+        "merkle": os.getenv("TRANSCRIPT_MERKLE", "0").strip().lower() in ("1", "true", "yes")
+    }
+
+
+def merkle_leaf_hash(entry: str) -> bytes:
+    """Merkle leaf hash of a transcript line."""
+    return hashlib.sha256(MERKLE_LEAF_PREFIX + entry.encode('utf-8')).digest()
+
+
+def merkle_node_hash(left: bytes, right: bytes) -> bytes:
+    """Merkle hash of an interior node."""
+    return hashlib.sha256(MERKLE_NODE_PREFIX + left + right).digest()
+
+
+def merkle_tree_root(nodes: List[bytes]) -> bytes:
+    """
+    Root over a level of nodes: pairs are hashed left to right and an odd
+    last node moves up unchanged (the same tree as RFC 6962).
+    """
+    if not nodes:
+        return hashlib.sha256(b"").digest()
+    while len(nodes) > 1:
+        paired = [merkle_node_hash(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+        if len(nodes) % 2:
+            paired.append(nodes[-1])
+        nodes = paired
+    return nodes[0]
+
+
+def merkle_tree_path(nodes: List[bytes], index: int) -> List[bytes]:
+    """Inclusion path (sibling hashes, bottom up) for nodes[index] in merkle_tree_root(nodes)."""
+    path = []
+    while len(nodes) > 1:
+        sibling = index ^ 1
+        if sibling < len(nodes):
+            path.append(nodes[sibling])
+        paired = [merkle_node_hash(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+        if len(nodes) % 2:
+            paired.append(nodes[-1])
+        nodes = paired
+        index //= 2
+    return path
+
+
+def _merkle_chunk_root(entries: List[str]) -> bytes:
+    """Root of the subtree over one chunk of entries (runs in worker processes)."""
+    return merkle_tree_root([merkle_leaf_hash(entry) for entry in entries])
+
+
+def verify_merkle_inclusion(entry: str, index: int, size: int, path: List[bytes], root: bytes) -> bool:
+    """
+    Check an inclusion proof (RFC 9162 section 2.1.3.2).
+    
+    Args:
+        entry: Transcript line
+        index: Its position among the entries (0-based)
+        size: Number of entries under the root
+        path: Sibling hashes, bottom up
+        root: Merkle root (e.g. from a signed receipt)
+    
+    Returns:
+        True if the entry is at index in the tree with that root
+    """
+    if index < 0 or index >= size:
+        return False
+    fn, sn = index, size - 1
+    node = merkle_leaf_hash(entry)
+    for sibling in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            node = merkle_node_hash(sibling, node)
+            # Levels where this node had no sibling (it moved up unchanged)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            node = merkle_node_hash(node, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and node == root
+
+
+def build_merkle_tree(
+    entries: Iterable[str],
+    seqno: Optional[int] = None,
+    workers: int = 0
+) -> Tuple[int, bytes, Optional[int], Optional[str], List[bytes]]:
+    """
+    Merkle tree over transcript entries, optionally with the inclusion proof for one seqno.
+    
+    Entries are consumed one chunk at a time; with workers > 1 the chunks
+    are hashed on a process pool (a few in flight, so memory stays bounded
+    for lazily read transcripts). Sequence numbers are assumed to increase,
+    as the transcript's replay checks ensure.
+    
+    Args:
+        entries: Transcript lines, in order
+        seqno: Sequence number to prove, or None for the root only
+        workers: Worker processes (0 or 1 hashes inline)
+    
+    Returns:
+        (number of entries, root, index of seqno, its entry, its inclusion path);
+        index and entry are None if seqno is None or not found
+    """
+    roots: List[Union[bytes, "Future[bytes]"]] = []
+    index: Optional[int] = None
+    proved: Optional[str] = None
+    path: List[bytes] = []
+    searching = seqno is not None
+    size = 0
+    pool = None
+    iterator = iter(entries)
+    try:
+        while True:
+            chunk = list(islice(iterator, MERKLE_CHUNK_LEAVES))
+            if not chunk:
+                break
+            if searching:
+                last = entry_seqno(chunk[-1])
+                if last is None or last >= seqno:
+                    found = next((k for k, entry in enumerate(chunk) if entry_seqno(entry) == seqno), None)
+                    if found is not None:
+                        index = size + found
+                        proved = chunk[found]
+                        leaves = [merkle_leaf_hash(entry) for entry in chunk]
+                        path = merkle_tree_path(leaves, found)
+                        roots.append(merkle_tree_root(leaves))
+                        size += len(chunk)
+                        searching = False
+                        continue
+                    searching = last is None
+            
+            if workers > 1 and size > 0:
+                if pool is None:
+                    # spawn, not fork: this may run inside a threaded server
+                    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                # Wait for older chunks so only a few are held in memory
+                if len(roots) >= 2 * workers and isinstance(roots[-2 * workers], Future):
+                    roots[-2 * workers] = roots[-2 * workers].result()
+                roots.append(pool.submit(_merkle_chunk_root, chunk))
+            else:
+                roots.append(_merkle_chunk_root(chunk))
+            size += len(chunk)
+        roots = [root.result() if isinstance(root, Future) else root for root in roots]
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    # Chunks are aligned subtrees, so their roots are one level of the same tree
+    if index is not None:
+        path += merkle_tree_path(roots, index // MERKLE_CHUNK_LEAVES)
+    return size, merkle_tree_root(roots), index, proved, path
+
+
+def receipt_data(transcript_sha256: str, merkle_root: Optional[str] = None, merkle_size: Optional[int] = None) -> bytes:
+    """
+    Bytes covered by a session receipt's RSA signature: the transcript hash,
+    or with a Merkle root RECEIPT_MERKLE_LABEL || hash || size (8 bytes) || root.
+    """
+    if merkle_root is None:
+        return bytes.fromhex(transcript_sha256)
+    return (RECEIPT_MERKLE_LABEL + bytes.fromhex(transcript_sha256)
+            + (merkle_size or 0).to_bytes(8, byteorder='big') + bytes.fromhex(merkle_root))
+
+
+class MerkleProof:
+    """Inclusion proof for one transcript entry."""
+    
+    __slots__ = ('seqno', 'index', 'size', 'entry', 'path', 'root')
+    
+    def __init__(self, seqno: int, index: int, size: int, entry: str, path: List[bytes], root: bytes):
+        """
+        Initialize proof.
+        
+        Args:
+            seqno: Sequence number of the entry
+            index: Position of the entry (0-based)
+            size: Number of entries under the root
+            entry: The transcript line
+            path: Sibling hashes, bottom up
+            root: Merkle root
+        """
+        self.seqno = seqno
+        self.index = index
+        self.size = size
+        self.entry = entry
+        self.path = path
+        self.root = root
+    
+    def verify(self, root: Optional[str] = None) -> bool:
+        """Check the proof against a hexadecimal root (default: the one it was built with)."""
+        expected = bytes.fromhex(root) if root is not None else self.root
+        return verify_merkle_inclusion(self.entry, self.index, self.size, self.path, expected)
+    
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-serializable form."""
+        return {
+            "seqno": self.seqno,
+            "index": self.index,
+            "size": self.size,
+            "entry": self.entry,
+            "path": [node.hex() for node in self.path],
+            "root": self.root.hex()
+        }
+
+
 class Transcript:
-    """Append-only transcript for session messages."""
+    """Append-only transcript for session messages. Safe to append to from several threads."""
     
-    def __init__(self, transcript_file: str):
+    def __init__(
+        self,
+        transcript_file: str,
+        flush: str = FLUSH_MESSAGE,
+        flush_entries: int = 64,
+        flush_ms: float = 100,
+        sync: str = SYNC_NONE,
+        streaming: bool = False,
+        merkle: bool = False
+    ):
         """
         Initialize transcript.
         
         Args:
             transcript_file: Path to transcript file
+            flush: Flush policy (message, batch or receipt)
+            flush_entries: batch: flush after this many entries
+            flush_ms: batch: flush once the oldest unflushed entry is this old
+            sync: none, fsync or fdatasync on every flush
+            streaming: Keep entries only in the file (bounded memory)
+            merkle: Also keep a Merkle root over the entries
         """
         self.transcript_file = transcript_file
-        self.entries: List[str] = []
+        self.streaming = streaming
+        self.merkle = merkle
+        self.entries: List[str] = []  # stays empty in streaming mode
         self.first_seq: Optional[int] = None
         self.last_seq: Optional[int] = None
         
+        self.flush = flush
+        self.flush_entries = max(1, flush_entries)
+        self.flush_ms = flush_ms
+        self.sync = sync
+        self._file = None
+        self._lock = threading.Lock()  # entries and the file handle
+        self._sync_lock = threading.Lock()  # one sync at a time
+        self._appended = 0  # entries appended by this process
+        self._written = 0  # ...of which flushed to the OS
+        self._durable = 0  # ...of which synced
+        self._oldest_unflushed = 0.0
+        self._timer: Optional[threading.Timer] = None  # batch: flushes the batch at flush_ms
+        
+        # Running transcript hash, and saved copies of it every _snapshot_interval entries
+        self._count = 0  # entries in the transcript
+        self._size = 0  # file bytes, i.e. offset of the next entry
+        self._hash = hashlib.sha256()
+        self._snapshot_interval = SNAPSHOT_INTERVAL
+        self._snapshot_seqs: List[int] = []
+        self._snapshots: List[Tuple[int, int, "hashlib._Hash"]] = []  # (entry index, offset after it, state)
+        # Roots of the perfect Merkle subtrees so far, largest first: (leaves, hash)
+        self._merkle_frontier: List[Tuple[int, bytes]] = []
+        
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(transcript_file) if os.path.dirname(transcript_file) else '.', exist_ok=True)
         
@@ -31,21 +391,18 @@ class Transcript:
     def _load_transcript(self):
         """Load existing transcript from file."""
         try:
-            with open(self.transcript_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
+            with open(self.transcript_file, 'rb') as f:
+                for raw in f:
+                    self._size += len(raw)
+                    line = raw.decode('utf-8').strip()
                     if line:
-                        self.entries.append(line)
                         # Extract sequence number from line
-                        parts = line.split('|')
-                        if len(parts) > 0:
-                            try:
-                                seqno = int(parts[0])
-                                if self.first_seq is None:
-                                    self.first_seq = seqno
-                                self.last_seq = seqno
-                            except ValueError:
-                                pass
+                        seqno = entry_seqno(line)
+                        self._add_entry_locked(line, seqno)
+                        if seqno is not None:
+                            if self.first_seq is None:
+                                self.first_seq = seqno
+                            self.last_seq = seqno
         except Exception as e:
             print(f"Error loading transcript: {e}")
     
@@ -62,16 +419,150 @@ class Transcript:
         """
         # Format: seqno | timestamp | ciphertext | signature | peer_cert_fingerprint
         entry = f"{seqno}|{timestamp}|{ciphertext}|{signature}|{peer_cert_fingerprint}"
-        self.entries.append(entry)
+        with self._lock:
+            self._size += len(entry.encode('utf-8')) + 1
+            self._add_entry_locked(entry, seqno)
         
-        # Update sequence number range
-        if self.first_seq is None:
-            self.first_seq = seqno
-        self.last_seq = seqno
+            # Update sequence number range
+            if self.first_seq is None:
+                self.first_seq = seqno
+            self.last_seq = seqno
         
-        # Append to file (append-only)
-        with open(self.transcript_file, 'a') as f:
-            f.write(entry + '\n')
+            # Append to file (append-only)
+            if self._file is None:
+                # No newline translation: hash_at() seeks to byte offsets
+                self._file = open(self.transcript_file, 'a', encoding='utf-8', newline='\n')
+            self._file.write(entry + '\n')
+            now = time.monotonic()
+            if self._written == self._appended:
+                self._oldest_unflushed = now
+                if self.flush == FLUSH_BATCH and self._timer is None:
+                    self._start_timer_locked(self.flush_ms / 1000)
+            self._appended += 1
+            
+            due = self.flush == FLUSH_MESSAGE or (self.flush == FLUSH_BATCH and (
+                self._appended - self._written >= self.flush_entries
+                or (now - self._oldest_unflushed) * 1000 >= self.flush_ms
+            ))
+            if due:
+                self._flush_locked()
+            target = self._appended
+        if due and self.sync != SYNC_NONE:
+            self._sync_to(target)
+    
+    def commit(self):
+        """Flush (and sync, if configured) every entry appended so far; returns once they are durable."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_locked()
+            target = self._appended
+        if self.sync != SYNC_NONE:
+            self._sync_to(target)
+    
+    def close(self):
+        """Commit and close the file handle; entries stay available for hashing."""
+        self.commit()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _start_timer_locked(self, delay: float):
+        """Run _flush_expired after delay seconds; caller holds _lock."""
+        self._timer = threading.Timer(delay, self._flush_expired)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _flush_expired(self):
+        """Timer: flush (and sync) the batch once its oldest entry is flush_ms old."""
+        with self._lock:
+            self._timer = None
+            if self._file is None or self._written == self._appended:
+                return
+            remaining = self.flush_ms / 1000 - (time.monotonic() - self._oldest_unflushed)
+            if remaining > 0:
+                # The batch this timer was set for was flushed by count; wait for the newer one
+                self._start_timer_locked(remaining)
+                return
+            self._flush_locked()
+            target = self._appended
+        if self.sync != SYNC_NONE:
+            self._sync_to(target)
+    
+    def _add_entry_locked(self, entry: str, seqno: Optional[int]):
+        """Add an entry to the running hash (and, unless streaming, to entries); caller holds _lock (or is loading)."""
+        if not self.streaming:
+            self.entries.append(entry)
+        self._count += 1
+        self._hash.update((entry if self._count == 1 else '\n' + entry).encode('utf-8'))
+        if seqno is not None and self._count % self._snapshot_interval == 0:
+            self._snapshot_seqs.append(seqno)
+            self._snapshots.append((self._count - 1, self._size, self._hash.copy()))
+            if self.streaming and len(self._snapshots) > MAX_STREAM_SNAPSHOTS:
+                # Keep every other state (still evenly spaced) and save half as often
+                self._snapshot_seqs = self._snapshot_seqs[1::2]
+                self._snapshots = self._snapshots[1::2]
+                self._snapshot_interval *= 2
+        if self.merkle:
+            frontier = self._merkle_frontier
+            frontier.append((1, merkle_leaf_hash(entry)))
+            while len(frontier) > 1 and frontier[-2][0] == frontier[-1][0]:
+                right = frontier.pop()
+                left = frontier.pop()
+                frontier.append((left[0] * 2, merkle_node_hash(left[1], right[1])))
+    
+    def _read_entries(self, offset: int = 0) -> Iterator[str]:
+        """Entries in the file from a byte offset on."""
+        if not os.path.exists(self.transcript_file):
+            return
+        with open(self.transcript_file, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                line = raw.decode('utf-8').strip()
+                if line:
+                    yield line
+    
+    def _flush_locked(self):
+        """Hand buffered entries to the OS; caller holds _lock."""
+        if self._written < self._appended:
+            self._file.flush()
+            self._written = self._appended
+    
+    def _sync_to(self, target: int):
+        """Make the first target appended entries durable (group commit)."""
+        with self._sync_lock:
+            if self._durable >= target:
+                # A sync that ran while we waited already covered these entries
+                return
+            with self._lock:
+                # Everything appended meanwhile rides along with this sync
+                self._flush_locked()
+                covered = self._written
+                fd = self._file.fileno()
+            if self.sync == SYNC_FDATASYNC and hasattr(os, 'fdatasync'):
+                os.fdatasync(fd)
+            else:
+                os.fsync(fd)
+            self._durable = covered
+    
+    def append_checkpoint(self, seqno: int, chain: str, signature: str):
+        """
+        Record a verified checkpoint (hmac integrity mode).
+        
+        Checkpoints go to a separate file so transcript lines and the
+        transcript hash are the same in every integrity mode.
+        
+        Args:
+            seqno: Last sequence number covered
+            chain: Hexadecimal hash chain head
+            signature: Base64 encoded RSA signature
+        """
+        with open(self.transcript_file + CHECKPOINT_SUFFIX, 'a') as f:
+            f.write(f"{seqno}|{chain}|{signature}\n")
     
     def compute_transcript_hash(self) -> str:
         """
@@ -79,17 +570,100 @@ class Transcript:
         
         TranscriptHash = SHA256(concatenation of all transcript lines)
         
+        Read from the running hash, so this is O(1).
+        
         Returns:
             Hexadecimal SHA-256 hash of the transcript
         """
-        # Concatenate all transcript entries
-        transcript_content = '\n'.join(self.entries)
+        with self._lock:
+            return self._hash.hexdigest()
         
-        # Compute SHA-256 hash
-        hash_value = hashlib.sha256(transcript_content.encode('utf-8')).digest()
+    def compute_merkle_root(self) -> Optional[str]:
+        """
+        Merkle root over the entries so far, from the subtree roots kept as
+        they were appended (O(log n)).
         
-        # Return as hexadecimal string
-        return hash_value.hex()
+        Returns:
+            Hexadecimal root, or None if the transcript was opened without merkle
+        """
+        if not self.merkle:
+            return None
+        with self._lock:
+            if not self._merkle_frontier:
+                return hashlib.sha256(b"").hexdigest()
+            # Fold the smaller subtrees into the larger ones, right to left
+            root = self._merkle_frontier[-1][1]
+            for _, left in reversed(self._merkle_frontier[:-1]):
+                root = merkle_node_hash(left, root)
+            return root.hex()
+    
+    def merkle_proof(self, seqno: int, workers: int = 0) -> Optional[MerkleProof]:
+        """
+        Inclusion proof for the entry with a sequence number.
+        
+        Rebuilds the tree from the entries (read back from the file in
+        streaming mode), so this is O(n); the proof itself is log2(n) hashes.
+        
+        Args:
+            seqno: Sequence number to prove
+            workers: Worker processes for hashing large transcripts
+        
+        Returns:
+            The proof, or None if no entry has that seqno
+        """
+        size, root, index, entry, path = build_merkle_tree(self.get_entries(), seqno, workers)
+        if index is None:
+            return None
+        return MerkleProof(seqno, index, size, entry, path, root)
+    
+    def snapshot(self) -> Tuple[Optional[int], str]:
+        """
+        Current position and hash, taken atomically (for mid-session checkpoints).
+        
+        Returns:
+            (last sequence number, transcript hash up to and including it)
+        """
+        with self._lock:
+            return self.last_seq, self._hash.hexdigest()
+    
+    def hash_at(self, seqno: int) -> Optional[str]:
+        """
+        Transcript hash of the prefix ending with the entry for seqno, i.e.
+        what compute_transcript_hash() returned right after it was appended.
+        
+        Starts from the nearest saved state, so only the entries since
+        then are rehashed (read back from the file in streaming mode).
+        
+        Returns:
+            Hexadecimal SHA-256 hash, or None if no entry has that seqno
+        """
+        with self._lock:
+            i = bisect_right(self._snapshot_seqs, seqno) - 1
+            if i >= 0:
+                index, offset, saved = self._snapshots[i]
+                if self._snapshot_seqs[i] == seqno:
+                    return saved.hexdigest()
+                state = saved.copy()
+            else:
+                index, offset, state = -1, 0, hashlib.sha256()
+            
+            if self.streaming:
+                if self._file is not None:
+                    self._flush_locked()
+                entries = self._read_entries(offset)
+            else:
+                entries = (self.entries[k] for k in range(index + 1, len(self.entries)))
+            
+            first = index < 0
+            for entry in entries:
+                state.update((entry if first else '\n' + entry).encode('utf-8'))
+                first = False
+                entry_seq = entry_seqno(entry)
+                if entry_seq == seqno:
+                    return state.hexdigest()
+                if entry_seq is not None and entry_seq > seqno:
+                    break
+            return None
     
     def get_first_seq(self) -> Optional[int]:
         """Get first sequence number."""
@@ -99,17 +673,55 @@ class Transcript:
         """Get last sequence number."""
         return self.last_seq
     
-    def get_entries(self) -> List[str]:
-        """Get all transcript entries."""
-        return self.entries.copy()
+    def get_entry_count(self) -> int:
+        """Get number of entries."""
+        return self._count
+    
+    def get_entries(self) -> Iterable[str]:
+        """Get all transcript entries: a list copy, or in streaming mode a lazy iterator over the file."""
+        with self._lock:
+            if not self.streaming:
+                return self.entries.copy()
+            if self._file is not None:
+                self._flush_locked()
+        return self._read_entries()
     
     def clear(self):
         """Clear transcript (for testing purposes)."""
+        self.close()
         self.entries = []
         self.first_seq = None
         self.last_seq = None
+        self._count = 0
+        self._size = 0
+        self._hash = hashlib.sha256()
+        self._snapshot_interval = SNAPSHOT_INTERVAL
+        self._snapshot_seqs = []
+        self._snapshots = []
+        self._merkle_frontier = []
         if os.path.exists(self.transcript_file):
             os.remove(self.transcript_file)
+        if os.path.exists(self.transcript_file + CHECKPOINT_SUFFIX):
+            os.remove(self.transcript_file + CHECKPOINT_SUFFIX)
+
+
+def load_checkpoints(transcript_file: str) -> List[Tuple[int, str, str]]:
+    """
+    Load the checkpoints recorded for a transcript.
+    
+    Returns:
+        List of (seqno, chain_hex, signature_b64); empty if there are none
+    """
+    checkpoints = []
+    path = transcript_file + CHECKPOINT_SUFFIX
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    seqno, chain, signature = line.split('|')
+                    checkpoints.append((int(seqno), chain, signature))
+    return checkpoints
 
 
 def verify_transcript(transcript_file: str, expected_hash: str) -> bool:
@@ -124,7 +736,8 @@ def verify_transcript(transcript_file: str, expected_hash: str) -> bool:
         True if hash matches, False otherwise
     """
     try:
-        transcript = Transcript(transcript_file)
+        # Streaming: only the running hash is needed, whatever the transcript's size
+        transcript = Transcript(transcript_file, streaming=True)
         computed_hash = transcript.compute_transcript_hash()
         return computed_hash.lower() == expected_hash.lower()
     except Exception as e:
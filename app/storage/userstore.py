@@ -0,0 +1,381 @@
+"""Pluggable user store: MySQL, embedded SQLite (WAL) or in-memory.
+
+Every backend holds the users table of schema.sql (email, username, salt,
+pwd_hash, kdf; username unique, email indexed) and the same salted password
+hashes, so records move between them unchanged. The server picks one with
+USER_STORE:
+    
+    mysql   (default) the MySQL server from DB_*, schema created (and
+            migrated) when the server starts or by `python -m app.storage.db --init`
+    sqlite  a single file (USER_STORE_PATH), created on first use; fine for
+            single-node deployments and load tests without MySQL
+    memory  a dict per server process, empty on start; benchmarks only
+            (prefork workers do not see each other's registrations)
+"""
+
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.storage.db import (
+    BULK_CHUNK_SIZE, HasherBusy, UserRecord, UserRows, bulk_register, check_password, new_password_hash,
+    init_database, register_user, register_users_bulk, get_user_by_email, update_password_hash,
+    pool_stats, close_pool
+)
+from app.storage.pool import ConnectionPool
+
+
+STORE_MYSQL = "mysql"
+STORE_SQLITE = "sqlite"
+STORE_MEMORY = "memory"
+
+# schema.sql mapped onto SQLite types
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        email TEXT NOT NULL,
+        username TEXT NOT NULL PRIMARY KEY,
+        salt BLOB NOT NULL CHECK (length(salt) <= 16),
+        pwd_hash TEXT NOT NULL CHECK (length(pwd_hash) = 64),
+        kdf TEXT NOT NULL DEFAULT 'sha256'
+    );
+    CREATE INDEX IF NOT EXISTS idx_email ON users (email);
+"""
+
+
+class UserStore(ABC):
+    """Where registered users live. Implementations must be safe to share between threads."""
+    
+    def init(self):
+        """Create the users table if it does not exist."""
+    
+    @abstractmethod
+    def register_user(self, email: str, username: str, password: str) -> Tuple[bool, str]:
+        """
+        Register a new user with salted password hash.
+        
+        Args:
+            email: User email
+            username: Username (must be unique)
+            password: Plain text password
+        
+        Returns:
+            (success, error_message)
+        """
+    
+    @abstractmethod
+    def register_users_bulk(
+        self,
+        source: UserRows,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Tuple[int, List[Tuple[int, str]]]:
+        """
+        Register many users with batched duplicate detection and inserts.
+        
+        Args:
+            source: CSV text stream (email,username,password header) or an
+                iterable of dicts or (email, username, password) tuples
+            chunk_size: Rows per duplicate lookup and insert transaction
+            progress: Called with (rows processed, users registered) after each chunk
+        
+        Returns:
+            (users registered, [(line or row number, error message)])
+        """
+    
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        """
+        Get user by email.
+        
+        Returns:
+            User record (email, username, salt, pwd_hash, kdf), or None if not found
+        """
+    
+    @abstractmethod
+    def update_password_hash(self, username: str, salt: bytes, pwd_hash: str, kdf: str):
+        """Replace a user's salt, hash and KDF (hash upgrade on login)."""
+    
+    def authenticate_user(self, email: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Authenticate user by email and password, upgrading an outdated hash.
+        
+        Returns:
+            (is_authenticated, username_or_error_message)
+        """
+        return check_password(self.get_user_by_email(email), password, self.update_password_hash)
+    
+    def stats(self) -> Optional[dict]:
+        """Backend metrics worth reporting at shutdown, if any."""
+        return None
+    
+    def close(self):
+        """Release connections."""
+
+
+class MySQLUserStore(UserStore):
+    """The MySQL users table, through the pooled functions of app.storage.db."""
+    
+    def init(self):
+        """Create the users table if it does not exist."""
+        init_database()
+    
+    def register_user(self, email: str, username: str, password: str) -> Tuple[bool, str]:
+        """Register a new user with salted password hash."""
+        return register_user(email, username, password)
+    
+    def register_users_bulk(self, source: UserRows, chunk_size: int = BULK_CHUNK_SIZE,
+                            progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, List[Tuple[int, str]]]:
+        """Register many users with batched duplicate detection and inserts."""
+        return register_users_bulk(source, chunk_size, progress)
+    
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        """Get user by email."""
+        return get_user_by_email(email)
+    
+    def update_password_hash(self, username: str, salt: bytes, pwd_hash: str, kdf: str):
+        """Replace a user's salt, hash and KDF."""
+        update_password_hash(username, salt, pwd_hash, kdf)
+    
+    def stats(self) -> Optional[dict]:
+        """Connection pool wait-time metrics."""
+        return pool_stats()
+    
+    def close(self):
+        """Close the connection pool."""
+        close_pool()
+
+
+class SQLiteUserStore(UserStore):
+    """
+    Users table in an SQLite file, in WAL mode so logins (reads) never wait
+    for a registration (write). Connections come from a ConnectionPool like
+    the MySQL ones.
+    """
+    
+    def __init__(self, path: str, busy_timeout: float = 5.0, pool_size: int = 10):
+        """
+        Initialize SQLite user store; creates the file and table if needed.
+        
+        Args:
+            path: Database file
+            busy_timeout: Seconds a write waits for another writer
+            pool_size: Most connections open at once
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.pool = ConnectionPool(
+            self._connect, min_size=1, max_size=pool_size, max_lifetime=0,
+            ping=lambda conn: conn.execute("SELECT 1")
+        )
+        self.init()
+    
+    def init(self):
+        """Create the users table if it does not exist."""
+        with self.pool.connection() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+            # Files created before per-user KDFs: existing hashes are SHA-256
+            if 'kdf' not in {row['name'] for row in conn.execute("PRAGMA table_info(users)")}:
+                conn.execute("ALTER TABLE users ADD COLUMN kdf TEXT NOT NULL DEFAULT 'sha256'")
+    
+    def register_user(self, email: str, username: str, password: str) -> Tuple[bool, str]:
+        """Register a new user with salted password hash."""
+        try:
+            salt, pwd_hash, kdf = new_password_hash(password)
+        except HasherBusy as e:
+            return False, f"BUSY: {e}"
+        try:
+            with self.pool.connection() as conn:
+                # Take the write lock up front so the duplicate check and the insert are atomic
+                conn.execute("BEGIN IMMEDIATE")
+                existing = conn.execute(
+                    "SELECT username, email FROM users WHERE username = ? OR email = ?", (username, email)
+                ).fetchone()
+                if existing:
+                    conn.execute("ROLLBACK")
+                    if existing['username'] == username:
+                        return False, "Username already exists"
+                    return False, "Email already exists"
+                conn.execute(
+                    "INSERT INTO users (email, username, salt, pwd_hash, kdf) VALUES (?, ?, ?, ?, ?)",
+                    (email, username, salt, pwd_hash, kdf)
+                )
+                conn.execute("COMMIT")
+            return True, "User registered successfully"
+        except Exception as e:
+            # The pool has already rolled the connection back
+            return False, f"Registration failed: {str(e)}"
+    
+    def register_users_bulk(self, source: UserRows, chunk_size: int = BULK_CHUNK_SIZE,
+                            progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, List[Tuple[int, str]]]:
+        """Register many users with batched duplicate detection and inserts."""
+        with self.pool.connection() as conn:
+            return bulk_register(
+                source,
+                lambda usernames, emails: self._find_existing(conn, usernames, emails),
+                lambda records: self._insert_many(conn, records),
+                chunk_size,
+                progress
+            )
+    
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        """Get user by email."""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT email, username, salt, pwd_hash, kdf FROM users WHERE email = ?", (email,)
+                ).fetchone()
+            return dict(row) if row else None
+        except Exception as e:
+            print(f"Error getting user: {e}")
+            return None
+    
+    def update_password_hash(self, username: str, salt: bytes, pwd_hash: str, kdf: str):
+        """Replace a user's salt, hash and KDF."""
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE users SET salt = ?, pwd_hash = ?, kdf = ? WHERE username = ?", (salt, pwd_hash, kdf, username)
+            )
+    
+    def stats(self) -> Optional[dict]:
+        """Connection pool wait-time metrics."""
+        return self.pool.stats()
+    
+    def close(self):
+        """Close the connection pool."""
+        self.pool.close()
+    
+    @staticmethod
+    def _find_existing(conn: sqlite3.Connection, usernames: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+        """Which of these usernames and emails are already registered."""
+        rows = conn.execute(
+            "SELECT username, email FROM users WHERE username IN ({}) OR email IN ({})".format(
+                ", ".join("?" * len(usernames)), ", ".join("?" * len(emails))
+            ),
+            usernames + emails
+        ).fetchall()
+        return {row['username'] for row in rows}, {row['email'] for row in rows}
+    
+    @staticmethod
+    def _insert_many(conn: sqlite3.Connection, records: List[UserRecord]) -> List[Optional[str]]:
+        """Insert a chunk in one transaction; on a conflict, retry row by row to find the culprits."""
+        query = "INSERT INTO users (email, username, salt, pwd_hash, kdf) VALUES (?, ?, ?, ?, ?)"
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(query, records)
+            conn.execute("COMMIT")
+            return [None] * len(records)
+        except sqlite3.IntegrityError:
+            # Someone registered one of these names since the duplicate lookup
+            conn.execute("ROLLBACK")
+        
+        errors: List[Optional[str]] = []
+        for record in records:
+            try:
+                conn.execute(query, record)
+                errors.append(None)
+            except sqlite3.IntegrityError as e:
+                errors.append(SQLiteUserStore._integrity_error_message(e))
+        return errors
+    
+    @staticmethod
+    def _integrity_error_message(error: sqlite3.IntegrityError) -> str:
+        """Registration error for a failed insert: a duplicate username, or the constraint SQLite reported."""
+        message = str(error)
+        if message == "UNIQUE constraint failed: users.username":
+            return "Username already exists"
+        return f"Constraint violated: {message}"
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in WAL mode."""
+        # Autocommit mode: transactions are begun explicitly where needed
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+
+class MemoryUserStore(UserStore):
+    """Users in a dict, lost when the process exits. For benchmarks and tests."""
+    
+    def __init__(self):
+        """Initialize an empty store."""
+        self._by_username: Dict[str, dict] = {}
+        self._by_email: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+    
+    def register_user(self, email: str, username: str, password: str) -> Tuple[bool, str]:
+        """Register a new user with salted password hash."""
+        try:
+            salt, pwd_hash, kdf = new_password_hash(password)
+        except HasherBusy as e:
+            return False, f"BUSY: {e}"
+        user = {"email": email, "username": username, "salt": salt, "pwd_hash": pwd_hash, "kdf": kdf}
+        with self._lock:
+            if username in self._by_username:
+                return False, "Username already exists"
+            if email in self._by_email:
+                return False, "Email already exists"
+            self._by_username[username] = user
+            self._by_email[email] = user
+        return True, "User registered successfully"
+    
+    def register_users_bulk(self, source: UserRows, chunk_size: int = BULK_CHUNK_SIZE,
+                            progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, List[Tuple[int, str]]]:
+        """Register many users with batched duplicate detection and inserts."""
+        return bulk_register(source, self._find_existing, self._insert_many, chunk_size, progress)
+    
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        """Get user by email."""
+        with self._lock:
+            user = self._by_email.get(email)
+            return dict(user) if user else None
+    
+    def update_password_hash(self, username: str, salt: bytes, pwd_hash: str, kdf: str):
+        """Replace a user's salt, hash and KDF."""
+        with self._lock:
+            self._by_username[username].update(salt=salt, pwd_hash=pwd_hash, kdf=kdf)
+    
+    def _find_existing(self, usernames: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+        """Which of these usernames and emails are already registered."""
+        with self._lock:
+            return {u for u in usernames if u in self._by_username}, {e for e in emails if e in self._by_email}
+    
+    def _insert_many(self, records: List[UserRecord]) -> List[Optional[str]]:
+        """Insert a chunk, skipping records registered since the duplicate lookup."""
+        errors: List[Optional[str]] = []
+        with self._lock:
+            for email, username, salt, pwd_hash, kdf in records:
+                if username in self._by_username:
+                    errors.append("Username already exists")
+                elif email in self._by_email:
+                    errors.append("Email already exists")
+                else:
+                    user = {"email": email, "username": username, "salt": salt, "pwd_hash": pwd_hash, "kdf": kdf}
+                    self._by_username[username] = user
+                    self._by_email[email] = user
+                    errors.append(None)
+        return errors
+
+
+def create_user_store(backend: Optional[str] = None) -> UserStore:
+    """
+    Open the user store selected by USER_STORE (or backend).
+    
+    Raises:
+        ValueError: for an unknown backend
+    """
+    backend = (backend or os.getenv("USER_STORE", STORE_MYSQL)).strip().lower()
+    if backend == STORE_MYSQL:
+        return MySQLUserStore()
+    if backend == STORE_SQLITE:
+        return SQLiteUserStore(
+            os.getenv("USER_STORE_PATH", "securechat.db"),
+            busy_timeout=float(os.getenv("USER_STORE_BUSY_TIMEOUT", 5)),
+            pool_size=int(os.getenv("DB_POOL_MAX_SIZE", 10))
+        )
+    if backend == STORE_MEMORY:
+        return MemoryUserStore()
+    raise ValueError(f"Unknown user store: {backend} (expected mysql, sqlite or memory)")
@@ -27,6 +27,7 @@ CREATE TABLE `users` (
   `username` varchar(255) NOT NULL,
   `salt` varbinary(16) NOT NULL,
   `pwd_hash` char(64) NOT NULL,
+  `kdf` varchar(64) NOT NULL DEFAULT 'sha256',
   PRIMARY KEY (`username`),
   UNIQUE KEY `username` (`username`),
   KEY `idx_email` (`email`)
@@ -39,7 +40,7 @@ CREATE TABLE `users` (
 
 LOCK TABLES `users` WRITE;
 /*!40000 ALTER TABLE `users` DISABLE KEYS */;
-INSERT INTO `users` VALUES ('test@example.com','testuser',_binary 'E?\\\Y\Zܓ2K','811a6e012e86b5e7d4d7d04e99d24c15c2c308d2768173dce8e7ae8cbb32e729');
+INSERT INTO `users` VALUES ('test@example.com','testuser',_binary 'E?\\\Y\Zܓ2K','811a6e012e86b5e7d4d7d04e99d24c15c2c308d2768173dce8e7ae8cbb32e729','sha256');
 /*!40000 ALTER TABLE `users` ENABLE KEYS */;
 UNLOCK TABLES;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
@@ -27,6 +27,7 @@ CREATE TABLE `users` (
   `username` varchar(255) NOT NULL,
   `salt` varbinary(16) NOT NULL,
   `pwd_hash` char(64) NOT NULL,
+  `kdf` varchar(64) NOT NULL DEFAULT 'sha256',
   PRIMARY KEY (`username`),
   UNIQUE KEY `username` (`username`),
   KEY `idx_email` (`email`)
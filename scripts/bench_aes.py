@@ -0,0 +1,57 @@
+"""Small-message AES throughput: per-call free functions vs a reused SessionCipher."""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.crypto.aes import encrypt_aes128, decrypt_aes128, SessionCipher
+
+
+def rate(fn, count: int) -> float:
+    """Run fn(), which processes count messages, and return messages/sec."""
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AES encrypt/decrypt of small messages")
+    parser.add_argument("--count", type=int, default=100000, help="Messages per measurement")
+    parser.add_argument("--size", type=int, default=64, help="Plaintext size (bytes)")
+    parser.add_argument("--batch", type=int, default=64, help="Messages per batch call")
+    args = parser.parse_args()
+    
+    key = os.urandom(16)
+    plaintexts = [os.urandom(args.size) for _ in range(args.count)]
+    ciphertexts = [encrypt_aes128(p, key) for p in plaintexts]
+    cipher = SessionCipher(key)
+    assert cipher.encrypt_batch(plaintexts[:args.batch]) == ciphertexts[:args.batch]
+    
+    def batched(fn, items):
+        for i in range(0, len(items), args.batch):
+            fn(items[i:i + args.batch])
+    
+    runs = (
+        ("free functions", lambda: [encrypt_aes128(p, key) for p in plaintexts],
+                           lambda: [decrypt_aes128(c, key) for c in ciphertexts]),
+        ("SessionCipher", lambda: [cipher.encrypt(p) for p in plaintexts],
+                          lambda: [cipher.decrypt(c) for c in ciphertexts]),
+        (f"batch of {args.batch}", lambda: batched(cipher.encrypt_batch, plaintexts),
+                                  lambda: batched(cipher.decrypt_batch, ciphertexts)),
+    )
+    
+    print(f"{args.count} messages x {args.size} bytes")
+    baseline = None
+    for name, encrypt, decrypt in runs:
+        enc = rate(encrypt, args.count)
+        dec = rate(decrypt, args.count)
+        baseline = baseline or (enc, dec)
+        print(f"  {name:<16} encrypt {enc:11,.0f} msg/s ({enc / baseline[0]:5.1f}x)   "
+              f"decrypt {dec:11,.0f} msg/s ({dec / baseline[1]:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Per-handshake client certificate handling: parse + validate every time vs CertificateCache."""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.crypto.pki import load_ca_cert, load_cert_from_pem, validate_certificate, get_cert_fingerprint, CertificateCache
+from app.crypto.sign import load_public_key_from_cert
+
+
+def uncached(pem_data: str, ca_cert):
+    """What process_hello and ClientSession did before the cache."""
+    cert = load_cert_from_pem(pem_data)
+    is_valid, _ = validate_certificate(cert, ca_cert)
+    assert is_valid
+    return get_cert_fingerprint(cert), load_public_key_from_cert(cert)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark certificate validation caching")
+    parser.add_argument("--ca", default=os.getenv("CA_CERT_PATH", "certs/ca_cert.pem"), help="CA certificate")
+    parser.add_argument("--cert", default=os.getenv("CLIENT_CERT_PATH", "certs/client_cert.pem"), help="Client certificate")
+    parser.add_argument("--count", type=int, default=5000, help="Handshakes per measurement")
+    args = parser.parse_args()
+    
+    # validate_certificate reads the deprecated naive datetime properties
+    warnings.simplefilter("ignore")
+    ca_cert = load_ca_cert(args.ca)
+    with open(args.cert, 'r') as f:
+        pem_data = f.read()
+    
+    start = time.perf_counter()
+    for _ in range(args.count):
+        uncached(pem_data, ca_cert)
+    before = (time.perf_counter() - start) / args.count * 1e6
+    
+    cache = CertificateCache()
+    start = time.perf_counter()
+    for _ in range(args.count):
+        entry, is_valid, _ = cache.validate_pem(pem_data, ca_cert)
+        assert is_valid
+        entry.fingerprint, entry.public_key
+    after = (time.perf_counter() - start) / args.count * 1e6
+    
+    print(f"{args.count} handshakes with the same client certificate")
+    print(f"  {'uncached':<10} {before:8.1f} us/handshake")
+    print(f"  {'cached':<10} {after:8.1f} us/handshake ({before / after:.1f}x)   {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
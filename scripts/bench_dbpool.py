@@ -0,0 +1,125 @@
+"""User store lookup cost: a new MySQL connection per call vs the connection pool.
+
+By default connections are simulated (a sleep for the connect and for each
+query) so the benchmark runs without a database; --mysql uses the server
+configured by the DB_* environment variables and looks up --email.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.storage.pool import ConnectionPool
+
+
+class SimulatedConnection:
+    """Stands in for a pymysql connection: fixed connect and query latency."""
+    
+    def __init__(self, connect_ms: float, query_ms: float):
+        """Open (sleep for connect_ms)."""
+        time.sleep(connect_ms / 1000)
+        self.query_ms = query_ms
+    
+    def query(self, email: str):
+        """Run the user lookup (sleep for query_ms)."""
+        time.sleep(self.query_ms / 1000)
+    
+    def ping(self, reconnect: bool = False):
+        """Health check."""
+    
+    def rollback(self):
+        """End the transaction."""
+    
+    def close(self):
+        """Close."""
+
+
+def mysql_connect():
+    """Real connection to the configured database."""
+    from app.storage.db import get_db_connection
+    conn = get_db_connection()
+    
+    def query(email: str):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT email, username, salt, pwd_hash FROM users WHERE email = %s", (email,))
+            cursor.fetchone()
+    conn.query = query
+    return conn
+
+
+def run(name: str, threads: int, count: int, lookup):
+    """Run count lookups on each of threads threads and print p50/p99 and throughput."""
+    latencies = []
+    lock = threading.Lock()
+    
+    def worker():
+        local = []
+        for _ in range(count):
+            start = time.perf_counter()
+            lookup()
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+    
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<22} p50 {statistics.median(ordered):8.3f} ms   p99 {p99:8.3f} ms   "
+          f"{len(ordered) / elapsed:8.1f} lookups/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark user lookups with and without the connection pool")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent lookup threads")
+    parser.add_argument("--count", type=int, default=50, help="Lookups per thread")
+    parser.add_argument("--pool-size", type=int, default=8, help="Pool max size")
+    parser.add_argument("--connect-ms", type=float, default=5.0, help="Simulated connect + auth latency")
+    parser.add_argument("--query-ms", type=float, default=0.5, help="Simulated query latency")
+    parser.add_argument("--mysql", action="store_true", help="Use the configured MySQL server instead of simulating")
+    parser.add_argument("--email", default="alice@example.com", help="Email to look up (--mysql)")
+    args = parser.parse_args()
+    
+    if args.mysql:
+        connect = mysql_connect
+        print(f"{args.threads} threads x {args.count} lookups against MySQL")
+    else:
+        connect = lambda: SimulatedConnection(args.connect_ms, args.query_ms)
+        print(f"{args.threads} threads x {args.count} lookups, simulated connect {args.connect_ms} ms, "
+              f"query {args.query_ms} ms")
+    
+    def unpooled():
+        conn = connect()
+        try:
+            conn.query(args.email)
+        finally:
+            conn.close()
+    run("connection per lookup", args.threads, args.count, unpooled)
+    
+    pool = ConnectionPool(connect, min_size=args.pool_size, max_size=args.pool_size)
+    pool.fill()
+    
+    def pooled():
+        with pool.connection() as conn:
+            conn.query(args.email)
+    run(f"pool (max {args.pool_size})", args.threads, args.count, pooled)
+    
+    stats = pool.stats()
+    print(f"  pool waits: {stats['waits']}/{stats['checkouts']} checkouts, avg {stats['wait_avg_ms']} ms, "
+          f"max {stats['wait_max_ms']} ms, {stats['created']} connections opened")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Server-side DH handshake latency with and without the precomputed DHKeyPool."""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.crypto.dh import (
+    DH_P, DH_G, DHKeyPool, generate_private_key, compute_public_value, compute_shared_secret, derive_session_key
+)
+
+
+def server_dh(client_public: int, pool: DHKeyPool = None) -> bytes:
+    """The server's half of one DH exchange (as in process_dh_client)."""
+    if pool:
+        private_key, _ = pool.acquire()
+    else:
+        private_key = generate_private_key()
+        # Sent to the client; part of the cost the pool takes off the handshake
+        compute_public_value(private_key, DH_P, DH_G)
+    return derive_session_key(compute_shared_secret(private_key, client_public, DH_P))
+
+
+def measure(count: int, gap: float, pool: DHKeyPool = None) -> list:
+    """Latency (ms) of count handshakes, each with two DH exchanges like a login."""
+    client_publics = [compute_public_value(generate_private_key(), DH_P, DH_G) for _ in range(2)]
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        for client_public in client_publics:
+            server_dh(client_public, pool)
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(gap)
+    return latencies
+
+
+def report(name: str, latencies: list):
+    """Print p50/p99 for a run."""
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<24} p50 {statistics.median(ordered):7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DH handshake latency")
+    parser.add_argument("--count", type=int, default=30, help="Handshakes per run")
+    parser.add_argument("--gap", type=float, default=0.05, help="Idle seconds between handshakes (refill time)")
+    parser.add_argument("--pool-size", type=int, default=16, help="DHKeyPool size")
+    args = parser.parse_args()
+    
+    print(f"{args.count} handshakes (2 DH exchanges each), {args.gap * 1000:.0f} ms apart")
+    report("per-handshake keypairs", measure(args.count, args.gap))
+    
+    pool = DHKeyPool(size=args.pool_size, low_water=max(1, args.pool_size // 4))
+    pool.wait_full()
+    report("DHKeyPool", measure(args.count, args.gap, pool))
+    print(f"  pool hits {pool.hits}, misses {pool.misses}")
+    
+    # Back-to-back handshakes: refill competes with the handshakes for the CPU
+    pool.wait_full()
+    report("DHKeyPool, no gap", measure(args.count, 0, pool))
+    print(f"  pool hits {pool.hits}, misses {pool.misses}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
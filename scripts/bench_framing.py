@@ -0,0 +1,98 @@
+"""Microbenchmark: FrameReader vs the original recv/concatenate receive_message."""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.common.framing import FrameReader
+
+
+def legacy_receive_message(sock: socket.socket) -> str:
+    """The receive_message implementation FrameReader replaced."""
+    length_data = sock.recv(4)
+    if not length_data:
+        return ""
+    
+    message_length = int.from_bytes(length_data, byteorder='big')
+    
+    message_data = b""
+    while len(message_data) < message_length:
+        chunk = sock.recv(message_length - len(message_data))
+        if not chunk:
+            break
+        message_data += chunk
+    
+    return message_data.decode('utf-8')
+
+
+def send_frames(sock: socket.socket, payload: bytes, count: int):
+    """Send count copies of payload as frames, batching writes like a busy peer."""
+    frame = len(payload).to_bytes(4, byteorder='big') + payload
+    batch = max(1, (256 * 1024) // len(frame))
+    sent = 0
+    while sent < count:
+        n = min(batch, count - sent)
+        sock.sendall(frame * n)
+        sent += n
+    sock.shutdown(socket.SHUT_WR)
+
+
+def run(name: str, receive, frame_size: int, count: int) -> float:
+    """Time receiving count frames of frame_size bytes; returns frames/sec."""
+    reader_sock, writer_sock = socket.socketpair()
+    payload = b"x" * frame_size
+    writer = threading.Thread(target=send_frames, args=(writer_sock, payload, count))
+    
+    start = time.perf_counter()
+    writer.start()
+    received = receive(reader_sock, count)
+    elapsed = time.perf_counter() - start
+    writer.join()
+    reader_sock.close()
+    writer_sock.close()
+    
+    assert received == count, f"{name}: received {received} of {count} frames"
+    rate = count / elapsed
+    mib = frame_size * count / elapsed / (1024 * 1024)
+    print(f"  {name:<12} {elapsed * 1000:9.1f} ms  {rate:12,.0f} frames/s  {mib:9.1f} MiB/s")
+    return rate
+
+
+def receive_legacy(sock: socket.socket, count: int) -> int:
+    """Receive frames with the legacy implementation until EOF."""
+    received = 0
+    while legacy_receive_message(sock):
+        received += 1
+    return received
+
+
+def receive_frame_reader(sock: socket.socket, count: int) -> int:
+    """Receive frames with FrameReader until EOF."""
+    received = 0
+    for frame in FrameReader(sock):
+        received += 1
+    return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark frame receiving")
+    parser.add_argument("--small-count", type=int, default=200000, help="Number of small frames")
+    parser.add_argument("--small-size", type=int, default=300, help="Small frame payload size (bytes)")
+    parser.add_argument("--large-count", type=int, default=20, help="Number of large frames")
+    parser.add_argument("--large-size", type=int, default=8 * 1024 * 1024, help="Large frame payload size (bytes)")
+    args = parser.parse_args()
+    
+    for size, count in ((args.small_size, args.small_count), (args.large_size, args.large_count)):
+        print(f"\n{count} frames x {size} bytes")
+        legacy = run("legacy", receive_legacy, size, count)
+        framed = run("FrameReader", receive_frame_reader, size, count)
+        print(f"  speedup: {framed / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
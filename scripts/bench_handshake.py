@@ -0,0 +1,85 @@
+"""Key agreement cost per login: classic DH groups vs X25519, classic vs collapsed handshake."""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.common.protocol import DHClientMessage, DHServerMessage
+from app.crypto.dh import (
+    X25519_GROUP, generate_private_key, compute_public_value, compute_shared_secret, derive_session_key,
+    get_group, x25519_generate_private_key, x25519_public_value, x25519_shared_secret
+)
+
+
+def classic_exchange(group: str) -> int:
+    """One classic DH exchange, both sides, through the dh_client/dh_server frames; returns the frame bytes."""
+    p, g = get_group(group)
+    client_private_key = generate_private_key()
+    request = DHClientMessage(group=group, A=compute_public_value(client_private_key, p, g)).model_dump_json(exclude_none=True)
+    
+    # Server side
+    dh_client = DHClientMessage(**json.loads(request))
+    server_private_key = generate_private_key()
+    response = DHServerMessage(B=compute_public_value(server_private_key, p, g)).model_dump_json()
+    server_key = derive_session_key(compute_shared_secret(server_private_key, dh_client.A, p))
+    
+    # Client side
+    dh_server = DHServerMessage(**json.loads(response))
+    client_key = derive_session_key(compute_shared_secret(client_private_key, dh_server.B, p))
+    assert client_key == server_key
+    return len(request) + len(response)
+
+
+def x25519_exchange(group: str) -> int:
+    """One X25519 exchange, both sides, through the dh_client/dh_server frames; returns the frame bytes."""
+    client_private_key = x25519_generate_private_key()
+    request = DHClientMessage(group=group, A=x25519_public_value(client_private_key)).model_dump_json(exclude_none=True)
+    
+    # Server side
+    dh_client = DHClientMessage(**json.loads(request))
+    server_private_key = x25519_generate_private_key()
+    response = DHServerMessage(B=x25519_public_value(server_private_key)).model_dump_json()
+    server_key = derive_session_key(x25519_shared_secret(server_private_key, dh_client.A))
+    
+    # Client side
+    dh_server = DHServerMessage(**json.loads(response))
+    client_key = derive_session_key(x25519_shared_secret(client_private_key, dh_server.B))
+    assert client_key == server_key
+    return len(request) + len(response)
+
+
+def bench(group: str, count: int, exchanges: int, handshake: str):
+    """Time count logins in one group, each running the given number of exchanges."""
+    exchange = x25519_exchange if group == X25519_GROUP else classic_exchange
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        wire_bytes = sum(exchange(group) for _ in range(exchanges))
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {group:<10} {handshake:<10} p50 {statistics.median(ordered):8.3f} ms   p99 {p99:8.3f} ms   "
+          f"{1000 / statistics.mean(ordered):8.1f} logins/s   {wire_bytes:5d} wire bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark handshake key agreement per group")
+    parser.add_argument("--count", type=int, default=50, help="Logins per group")
+    parser.add_argument("--groups", default="x25519,ffdhe2048,modp3072", help="Comma-separated groups to compare")
+    args = parser.parse_args()
+    
+    print(f"{args.count} logins per group (client and server work, no keypair pool)")
+    print("  classic: 4 round trips, 2 key exchanges   collapsed: 2 round trips, 1 key exchange")
+    for group in args.groups.split(","):
+        bench(group.strip(), args.count, 2, "classic")
+        bench(group.strip(), args.count, 1, "collapsed")
+
+
+if __name__ == "__main__":
+    main()
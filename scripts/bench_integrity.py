@@ -0,0 +1,84 @@
+"""Messages/sec of the data plane in rsa vs hmac integrity mode, as a function of the checkpoint interval N."""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.crypto.aes import SessionCipher
+from app.crypto.integrity import CLIENT_TO_SERVER, MessageAuthenticator, HashChain, checkpoint_data
+from app.crypto.sign import sign_data, verify_signature
+from app.common.wire import ENCODING_BINARY, encode_chat_message, decode_frame
+
+
+def run(count: int, plaintext: bytes, private_key, interval: int) -> float:
+    """
+    Send and receive count messages (sender and receiver in one loop).
+    
+    interval 0 means rsa mode: every message is RSA-signed and verified.
+    Otherwise messages carry HMAC tags and every interval-th one is followed
+    by an RSA-signed checkpoint over the hash chain.
+    
+    Returns:
+        Messages per second
+    """
+    session_key = os.urandom(16)
+    public_key = private_key.public_key()
+    sender_cipher, receiver_cipher = SessionCipher(session_key), SessionCipher(session_key)
+    sender_mac, receiver_mac = MessageAuthenticator(session_key, CLIENT_TO_SERVER), MessageAuthenticator(session_key, CLIENT_TO_SERVER)
+    sender_chain, receiver_chain = HashChain(), HashChain()
+    ts = 1700000000000
+    
+    start = time.perf_counter()
+    for seqno in range(1, count + 1):
+        # Sender
+        ct = sender_cipher.encrypt(plaintext)
+        signed_data = seqno.to_bytes(8, byteorder='big') + ts.to_bytes(8, byteorder='big') + ct
+        if interval:
+            tag = sender_mac.tag(signed_data)
+            sender_chain.update(seqno, signed_data)
+        else:
+            tag = sign_data(signed_data, private_key)
+        frame = encode_chat_message(seqno, ts, ct, tag, ENCODING_BINARY)
+        
+        # Receiver
+        msg = decode_frame(frame)
+        if interval:
+            assert receiver_mac.verify(msg.signed_data, msg.signature)
+            receiver_chain.update(msg.seqno, msg.signed_data)
+        else:
+            assert verify_signature(msg.signed_data, msg.signature, public_key)
+        receiver_cipher.decrypt(msg.ciphertext)
+        
+        # Checkpoint
+        if interval and seqno % interval == 0:
+            signature = sign_data(checkpoint_data(seqno, sender_chain.head), private_key)
+            assert verify_signature(checkpoint_data(seqno, receiver_chain.head), signature, public_key)
+    
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message integrity modes")
+    parser.add_argument("--count", type=int, default=5000, help="Messages per measurement")
+    parser.add_argument("--plaintext", type=int, default=64, help="Plaintext size (bytes)")
+    parser.add_argument("--intervals", default="1,10,100,1000", help="Comma-separated checkpoint intervals N")
+    args = parser.parse_args()
+    
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    plaintext = os.urandom(args.plaintext)
+    
+    print(f"{args.count} messages x {args.plaintext} bytes, sender + receiver CPU, RSA-2048")
+    baseline = run(args.count, plaintext, private_key, 0)
+    print(f"  {'rsa (every message)':<22} {baseline:10,.0f} msg/s")
+    for interval in [int(n) for n in args.intervals.split(',')]:
+        rate = run(args.count, plaintext, private_key, interval)
+        print(f"  {f'hmac, N={interval}':<22} {rate:10,.0f} msg/s ({rate / baseline:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
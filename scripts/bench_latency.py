@@ -0,0 +1,129 @@
+"""Latency benchmark: two-sendall framing vs single-sendmsg FrameWriter + TCP_NODELAY."""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.common.framing import FrameReader, FrameWriter, set_nodelay
+
+
+def legacy_send(sock: socket.socket, payload: bytes):
+    """The original send_message: header and body in two sendall calls."""
+    sock.sendall(len(payload).to_bytes(4, byteorder='big'))
+    sock.sendall(payload)
+
+
+def legacy_recv(sock: socket.socket) -> bytes:
+    """The original receive_message loop (bytes result)."""
+    length_data = sock.recv(4)
+    if not length_data:
+        return b""
+    message_length = int.from_bytes(length_data, byteorder='big')
+    message_data = b""
+    while len(message_data) < message_length:
+        chunk = sock.recv(message_length - len(message_data))
+        if not chunk:
+            break
+        message_data += chunk
+    return message_data
+
+
+class LegacyEndpoint:
+    """Framing as it was before FrameWriter."""
+    
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+    
+    def send(self, payload: bytes):
+        """Send one frame."""
+        legacy_send(self.sock, payload)
+    
+    def recv(self) -> bytes:
+        """Receive one frame."""
+        return legacy_recv(self.sock)
+
+
+class FramedEndpoint:
+    """FrameReader/FrameWriter with TCP_NODELAY."""
+    
+    def __init__(self, sock: socket.socket):
+        set_nodelay(sock)
+        self.reader = FrameReader(sock)
+        self.writer = FrameWriter(sock)
+    
+    def send(self, payload: bytes):
+        """Send one frame."""
+        self.writer.send_frame(payload)
+    
+    def recv(self) -> bytes:
+        """Receive one frame."""
+        frame = self.reader.read_frame()
+        return bytes(frame) if frame is not None else b""
+
+
+def ack_server(listener: socket.socket, endpoint_cls):
+    """Answer every frame with a small ack frame, like the data plane does."""
+    conn, _ = listener.accept()
+    endpoint = endpoint_cls(conn)
+    while True:
+        data = endpoint.recv()
+        if not data:
+            break
+        seqno = json.loads(data)["seqno"]
+        endpoint.send(json.dumps({"status": "ack", "seqno": seqno}).encode('utf-8'))
+    conn.close()
+
+
+def measure(endpoint_cls, count: int, payload_size: int) -> list:
+    """Return per-message round-trip latencies in milliseconds."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    server = threading.Thread(target=ack_server, args=(listener, endpoint_cls), daemon=True)
+    server.start()
+    
+    sock = socket.create_connection(listener.getsockname())
+    endpoint = endpoint_cls(sock)
+    filler = "A" * payload_size
+    latencies = []
+    for seqno in range(1, count + 1):
+        message = json.dumps({"type": "msg", "seqno": seqno, "ts": 0, "ct": filler, "sig": ""}).encode('utf-8')
+        start = time.perf_counter()
+        endpoint.send(message)
+        endpoint.recv()
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    sock.close()
+    server.join()
+    listener.close()
+    return latencies
+
+
+def report(name: str, latencies: list):
+    """Print p50/p99/max for a run."""
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<28} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms   max {ordered[-1]:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-message round-trip latency")
+    parser.add_argument("--count", type=int, default=500, help="Messages per run")
+    parser.add_argument("--payload", type=int, default=400, help="Ciphertext filler size (bytes)")
+    args = parser.parse_args()
+    
+    print(f"{args.count} request/ack round trips over TCP loopback, ~{args.payload}-byte messages")
+    report("before: 2x sendall, Nagle on", measure(LegacyEndpoint, args.count, args.payload))
+    report("after: sendmsg + TCP_NODELAY", measure(FramedEndpoint, args.count, args.payload))
+
+
+if __name__ == "__main__":
+    main()
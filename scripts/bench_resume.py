@@ -0,0 +1,63 @@
+"""Server-side reconnect cost: full key agreement vs session ticket resumption.
+
+A full reconnect also pays for the database login (and its password hash),
+which is not included here.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.crypto.dh import generate_group_keypair, compute_group_secret, derive_handshake_keys
+from app.crypto.ticket import TicketKeyring, derive_resumed_session_key
+
+
+def full_reconnect(group: str, client_public: int, salt: bytes):
+    """Collapsed handshake, server side: keypair, shared secret, both keys."""
+    private_key, _ = generate_group_keypair(group)
+    derive_handshake_keys(compute_group_secret(group, private_key, client_public), salt)
+
+
+def resumed_reconnect(keyring: TicketKeyring, ticket: str, fingerprint: str, salt: bytes):
+    """Ticket resumption, server side: open the ticket, derive the key, issue the next ticket."""
+    contents = keyring.open(ticket)
+    assert contents and contents.fingerprint == fingerprint
+    session_key = derive_resumed_session_key(contents.secret, salt)
+    keyring.issue(contents.username, fingerprint, session_key)
+
+
+def report(name: str, count: int, run):
+    """Time count runs and print p50/p99."""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<26} p50 {statistics.median(ordered):8.3f} ms   p99 {p99:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reconnect cost with and without session tickets")
+    parser.add_argument("--count", type=int, default=50, help="Reconnects per measurement")
+    args = parser.parse_args()
+    
+    salt = os.urandom(64)
+    fingerprint = "ab" * 32
+    keyring = TicketKeyring()
+    ticket = keyring.issue("alice", fingerprint, os.urandom(16))
+    
+    print(f"{args.count} reconnects, server-side key work only (no database login)")
+    for group in ("modp3072", "x25519"):
+        _, client_public = generate_group_keypair(group)
+        report(f"full ({group})", args.count, lambda: full_reconnect(group, client_public, salt))
+    report("resumed from ticket", args.count, lambda: resumed_reconnect(keyring, ticket, fingerprint, salt))
+
+
+if __name__ == "__main__":
+    main()
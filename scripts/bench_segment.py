@@ -0,0 +1,79 @@
+"""Lookup by seqno: scanning a text transcript vs the indexed binary segment."""
+
+import argparse
+import base64
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.storage.transcript import Transcript
+from app.storage.segment import INDEX_SUFFIX, SegmentReader, convert_transcript
+
+
+def scan_lookup(path: str, seqno: int) -> bytes:
+    """What a text transcript needs: read and split lines from the start until the seqno."""
+    prefix = f"{seqno}|"
+    with open(path, 'r') as f:
+        for line in f:
+            if line.startswith(prefix):
+                return base64.b64decode(line.split('|')[2])
+    return b""
+
+
+def report(name: str, latencies):
+    """Print p50/p99 per lookup."""
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<22} p50 {statistics.median(ordered) * 1000:10.1f} us   p99 {p99 * 1000:10.1f} us")
+
+
+def timed(count: int, run):
+    """Latencies in ms of count runs of run(i)."""
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        run(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript lookups by seqno, text vs segment")
+    parser.add_argument("--entries", type=int, default=100000, help="Entries in the synthetic transcript")
+    parser.add_argument("--lookups", type=int, default=200, help="Random lookups per measurement")
+    args = parser.parse_args()
+    
+    directory = tempfile.mkdtemp(prefix="bench_segment_")
+    try:
+        path = os.path.join(directory, "transcript.txt")
+        transcript = Transcript(path, flush="receipt")
+        for seqno in range(1, args.entries + 1):
+            transcript.append_message(seqno, 1700000000000 + seqno, base64.b64encode(os.urandom(48)).decode(),
+                                      base64.b64encode(os.urandom(256)).decode(), "ab" * 32)
+        transcript.close()
+        
+        start = time.perf_counter()
+        segment_path, _ = convert_transcript(path)
+        print(f"{args.entries} entries: text {os.path.getsize(path) / 2**20:.1f} MiB, segment "
+              f"{(os.path.getsize(segment_path) + os.path.getsize(segment_path + INDEX_SUFFIX)) / 2**20:.1f} MiB "
+              f"with index, converted in {time.perf_counter() - start:.2f} s")
+        
+        seqnos = [random.randint(1, args.entries) for _ in range(args.lookups)]
+        report("text scan", timed(args.lookups, lambda i: scan_lookup(path, seqnos[i])))
+        with SegmentReader(segment_path) as reader:
+            report("segment (mmap)", timed(args.lookups, lambda i: len(reader.get(seqnos[i]).ciphertext)))
+            start = time.perf_counter()
+            reader.compute_transcript_hash()
+            print(f"  transcript hash from segment {time.perf_counter() - start:.2f} s")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Transcript append cost per flush policy and sync mode, against reopening the file per entry.
+
+--streaming instead appends --count entries to a streaming transcript and
+reports the memory it holds (traced Python allocations and process RSS),
+then the receipt hash, a prefix hash and a full lazy read-back. The same
+is measured for the in-memory mode on up to 100k entries for comparison.
+"""
+
+import argparse
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.storage.transcript import Transcript
+
+
+# A chat line's worth of ciphertext and an RSA-2048 signature, base64
+CIPHERTEXT = "Q" * 44
+SIGNATURE = "S" * 344
+FINGERPRINT = "ab" * 32
+
+
+def reopen_append(path: str, count: int):
+    """The original writer: open, append and close for every entry."""
+    latencies = []
+    for seqno in range(1, count + 1):
+        start = time.perf_counter()
+        with open(path, 'a') as f:
+            f.write(f"{seqno}|{seqno}|{CIPHERTEXT}|{SIGNATURE}|{FINGERPRINT}\n")
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, 0.0
+
+
+def buffered_append(path: str, count: int, **durability):
+    """One handle, the given flush policy and sync mode; returns per-append latencies and the commit time."""
+    transcript = Transcript(path, **durability)
+    latencies = []
+    for seqno in range(1, count + 1):
+        start = time.perf_counter()
+        transcript.append_message(seqno, seqno, CIPHERTEXT, SIGNATURE, FINGERPRINT)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    transcript.close()
+    return latencies, (time.perf_counter() - start) * 1000
+
+
+def memory_run(path: str, count: int, streaming: bool):
+    """Append count entries and print the memory the transcript holds and the hash/read costs."""
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    start = time.perf_counter()
+    transcript = Transcript(path, flush="batch", streaming=streaming)
+    for seqno in range(1, count + 1):
+        transcript.append_message(seqno, seqno, CIPHERTEXT, SIGNATURE, FINGERPRINT)
+    transcript.commit()
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    
+    name = "streaming" if streaming else "in-memory"
+    print(f"  {name:<10} {count} entries in {elapsed:.1f} s ({count / elapsed:.0f} entries/s, traced)")
+    print(f"    held {held / 1024:10.1f} KiB   peak {peak / 1024:10.1f} KiB   "
+          f"max RSS growth {rss_growth:10d} KiB   {len(transcript._snapshots)} saved hash states")
+    
+    start = time.perf_counter()
+    transcript.compute_transcript_hash()
+    receipt_us = (time.perf_counter() - start) * 1e6
+    start = time.perf_counter()
+    transcript.hash_at(count // 2 + 1)
+    prefix_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    read = sum(1 for _ in transcript.get_entries())
+    read_s = time.perf_counter() - start
+    print(f"    receipt hash {receipt_us:.1f} us   hash_at(middle) {prefix_ms:.2f} ms   "
+          f"read back {read} entries in {read_s:.1f} s")
+    transcript.close()
+
+
+def report(name: str, latencies, commit_ms: float):
+    """Print p50/p99 per append, throughput and the final commit."""
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name:<26} p50 {statistics.median(ordered) * 1000:8.1f} us   p99 {p99 * 1000:8.1f} us   "
+          f"{len(ordered) / (sum(ordered) / 1000):10.0f} entries/s   commit {commit_ms:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript appends per flush policy")
+    parser.add_argument("--count", type=int, default=2000, help="Entries per run")
+    parser.add_argument("--dir", default=None, help="Directory to write in (default: a temporary one)")
+    parser.add_argument("--sync", action="store_true", help="Also measure fsync (slow on real disks)")
+    parser.add_argument("--streaming", action="store_true", help="Measure memory held in streaming vs in-memory mode")
+    args = parser.parse_args()
+    
+    directory = args.dir or tempfile.mkdtemp(prefix="bench_transcript_")
+    os.makedirs(directory, exist_ok=True)
+    if args.streaming:
+        print(f"Memory held per transcript in {directory}")
+        try:
+            memory_run(os.path.join(directory, "streaming.txt"), args.count, streaming=True)
+            memory_run(os.path.join(directory, "in_memory.txt"), min(args.count, 100000), streaming=False)
+        finally:
+            if not args.dir:
+                shutil.rmtree(directory)
+        return
+    
+    runs = [
+        ("reopen per entry", lambda path: reopen_append(path, args.count)),
+        ("message", lambda path: buffered_append(path, args.count, flush="message")),
+        ("batch (64 / 100 ms)", lambda path: buffered_append(path, args.count, flush="batch")),
+        ("receipt", lambda path: buffered_append(path, args.count, flush="receipt")),
+    ]
+    if args.sync:
+        runs += [
+            ("message + fdatasync", lambda path: buffered_append(path, args.count, flush="message", sync="fdatasync")),
+            ("batch + fdatasync", lambda path: buffered_append(path, args.count, flush="batch", sync="fdatasync")),
+            ("receipt + fdatasync", lambda path: buffered_append(path, args.count, flush="receipt", sync="fdatasync")),
+        ]
+    
+    print(f"{args.count} entries per run in {directory}")
+    try:
+        for index, (name, run) in enumerate(runs):
+            latencies, commit_ms = run(os.path.join(directory, f"run{index}.txt"))
+            report(name, latencies, commit_ms)
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""RSA verify throughput: inline vs CryptoExecutor process pools of various sizes."""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.crypto.sign import sign_data, verify_signature, CryptoExecutor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RSA-2048 signature verification")
+    parser.add_argument("--count", type=int, default=4000, help="Messages per measurement")
+    parser.add_argument("--batch", type=int, default=64, help="Pipelined messages per verify_batch call")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated pool sizes to try")
+    args = parser.parse_args()
+    
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = private_key.public_key()
+    items = []
+    for seqno in range(args.batch):
+        data = seqno.to_bytes(8, byteorder='big') + os.urandom(88)
+        items.append((data, sign_data(data, private_key)))
+    batches = max(1, args.count // args.batch)
+    total = batches * args.batch
+    
+    print(f"{os.cpu_count()} CPUs, {total} RSA-2048 verifies in batches of {args.batch}")
+    start = time.perf_counter()
+    for _ in range(batches):
+        assert all(verify_signature(data, sig, public_key) for data, sig in items)
+    inline = total / (time.perf_counter() - start)
+    print(f"  {'inline':<10} {inline:10,.0f} verifies/s")
+    
+    for workers in [int(w) for w in args.workers.split(',')]:
+        executor = CryptoExecutor(workers)
+        # Start the workers before timing
+        list(executor.verify_batch(items, public_key, "bench"))
+        start = time.perf_counter()
+        for _ in range(batches):
+            assert all(executor.verify_batch(items, public_key, "bench"))
+        rate = total / (time.perf_counter() - start)
+        executor.shutdown()
+        print(f"  {f'{workers} workers':<10} {rate:10,.0f} verifies/s ({rate / inline:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
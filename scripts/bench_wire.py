@@ -0,0 +1,69 @@
+"""Encode/decode throughput of chat message frames: JSON vs binary wire encoding."""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.common.protocol import ChatMessage
+from app.common.utils import b64e
+from app.common.wire import ENCODING_BINARY, ChatFrame, encode_chat_message, decode_frame
+
+
+def json_encode(seqno: int, ts: int, ct: bytes, sig: bytes) -> bytes:
+    """Encode as the client did before wire encodings existed."""
+    return ChatMessage(seqno=seqno, ts=ts, ct=b64e(ct), sig=b64e(sig)).model_dump_json().encode('utf-8')
+
+
+def json_decode(frame: bytes) -> ChatMessage:
+    """Decode as the server did before wire encodings existed."""
+    return ChatMessage(**json.loads(frame))
+
+
+def binary_encode(seqno: int, ts: int, ct: bytes, sig: bytes) -> bytes:
+    """Encode with the binary wire encoding."""
+    return encode_chat_message(seqno, ts, ct, sig, ENCODING_BINARY)
+
+
+def binary_decode(frame: bytes) -> ChatFrame:
+    """Decode a binary frame as the data plane does."""
+    return decode_frame(frame)
+
+
+def bench(name: str, encode, decode, count: int, ct: bytes, sig: bytes):
+    """Time count encodes and count decodes; print rates and frame size."""
+    ts = 1700000000000
+    
+    start = time.perf_counter()
+    for seqno in range(count):
+        frame = encode(seqno, ts, ct, sig)
+    encode_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(count):
+        decode(frame)
+    decode_time = time.perf_counter() - start
+    
+    print(f"  {name:<8} {len(frame):6d} bytes/frame   "
+          f"encode {count / encode_time:10,.0f} msg/s   decode {count / decode_time:10,.0f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat message wire encodings")
+    parser.add_argument("--count", type=int, default=100000, help="Messages per measurement")
+    parser.add_argument("--plaintext", type=int, default=64, help="Plaintext size (ciphertext is padded to 16 bytes)")
+    args = parser.parse_args()
+    
+    ct = os.urandom((args.plaintext // 16 + 1) * 16)
+    sig = os.urandom(256)  # RSA-2048 signature
+    
+    print(f"{args.count} chat messages, {len(ct)}-byte ciphertext, 256-byte signature")
+    bench("json", json_encode, json_decode, args.count, ct, sig)
+    bench("binary", binary_encode, binary_decode, args.count, ct, sig)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,16 @@ import os
 import json
 import glob
 import argparse
+import shutil
+import tempfile
 from dotenv import load_dotenv
 
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from app.storage.transcript import Transcript
+from app.storage.transcript import Transcript, load_checkpoints, build_merkle_tree, receipt_data
 from app.crypto.sign import verify_signature, load_public_key_from_cert
+from app.crypto.integrity import HashChain, checkpoint_data
 from app.crypto.pki import load_certificate_from_file, get_cert_fingerprint
 from app.common.utils import b64d
 
@@ -82,8 +85,8 @@ def verify_transcript(transcript_file: str):
     return transcript_hash
 
 
-def verify_receipt(receipt_file: str, transcript_hash: str, cert_path: str):
-    """Verify session receipt signature."""
+def verify_receipt(receipt_file: str, transcript_hash: str, cert_path: str, transcript_file: str, workers: int = 0):
+    """Verify session receipt signature (and its Merkle root, if it has one)."""
     print("\n" + "=" * 60)
     print("Session Receipt Verification")
     print("=" * 60)
@@ -102,6 +105,10 @@ def verify_receipt(receipt_file: str, transcript_hash: str, cert_path: str):
     print(f"   ✓ First seq: {receipt.get('first_seq')}")
     print(f"   ✓ Last seq: {receipt.get('last_seq')}")
     print(f"   ✓ Transcript hash: {receipt.get('transcript_sha256')}")
+    merkle_root = receipt.get('merkle_root')
+    merkle_size = receipt.get('merkle_size')
+    if merkle_root:
+        print(f"   ✓ Merkle root: {merkle_root} ({merkle_size} entries)")
     
     # Verify transcript hash matches
     receipt_hash = receipt.get('transcript_sha256', '')
@@ -113,6 +120,17 @@ def verify_receipt(receipt_file: str, transcript_hash: str, cert_path: str):
         print(f"   Receipt hash: {receipt_hash}")
         return False
     
+    if merkle_root:
+        # Rebuild the tree from the transcript (on worker processes if asked)
+        transcript = Transcript(transcript_file, streaming=True)
+        size, root, _, _, _ = build_merkle_tree(transcript.get_entries(), workers=workers)
+        if root.hex() == merkle_root and size == merkle_size:
+            print("   Merkle root matches transcript ✅")
+        else:
+            print("   Merkle root does not match transcript ❌")
+            print(f"   Transcript root: {root.hex()} ({size} entries)")
+            return False
+    
     # Load certificate
     if not os.path.exists(cert_path):
         print(f"❌ ERROR: Certificate file not found: {cert_path}")
@@ -129,10 +147,10 @@ def verify_receipt(receipt_file: str, transcript_hash: str, cert_path: str):
     # Verify signature
     print(f"\n4. Verifying receipt signature...")
     signature = receipt.get('sig', '')
-    hash_bytes = bytes.fromhex(receipt_hash)
+    signed_data = receipt_data(receipt_hash, merkle_root, merkle_size)
     signature_bytes = b64d(signature)
     
-    is_valid = verify_signature(hash_bytes, signature_bytes, public_key)
+    is_valid = verify_signature(signed_data, signature_bytes, public_key)
     
     if is_valid:
         print(f"   ✅ Receipt signature is valid!")
@@ -202,6 +220,63 @@ def verify_message_signature(transcript_file: str, cert_path: str):
     return all_valid
 
 
+def verify_checkpoints(transcript_file: str, cert_path: str):
+    """Verify hmac-mode checkpoints: rebuild the hash chain and check each RSA signature."""
+    print("\n" + "=" * 60)
+    print("Checkpoint Verification")
+    print("=" * 60)
+    
+    checkpoints = load_checkpoints(transcript_file)
+    if not checkpoints:
+        print(f"❌ ERROR: No checkpoints recorded for: {transcript_file}")
+        return False
+    
+    if not os.path.exists(cert_path):
+        print(f"❌ ERROR: Certificate file not found: {cert_path}")
+        return False
+    
+    print(f"\n1. Rebuilding hash chain from: {transcript_file}")
+    transcript = Transcript(transcript_file)
+    chain = HashChain()
+    heads = {}
+    for entry in transcript.get_entries():
+        parts = entry.split('|')
+        if len(parts) >= 5:
+            seqno = int(parts[0])
+            timestamp = int(parts[1])
+            signed_data = seqno.to_bytes(8, byteorder='big') + timestamp.to_bytes(8, byteorder='big') + b64d(parts[2])
+            heads[seqno] = chain.update(seqno, signed_data)
+    print(f"   ✓ Chain covers {len(heads)} message(s)")
+    
+    print(f"\n2. Loading certificate: {cert_path}")
+    cert = load_certificate_from_file(cert_path)
+    public_key = load_public_key_from_cert(cert)
+    
+    print(f"\n3. Verifying {len(checkpoints)} checkpoint(s)...")
+    all_valid = True
+    for seqno, chain_hex, signature in checkpoints:
+        head = heads.get(seqno)
+        if head is None or head.hex() != chain_hex:
+            print(f"   Checkpoint seqno={seqno}: ❌ Hash chain does not match transcript")
+            all_valid = False
+        elif verify_signature(checkpoint_data(seqno, head), b64d(signature), public_key):
+            print(f"   Checkpoint seqno={seqno}: ✅ Valid signature")
+        else:
+            print(f"   Checkpoint seqno={seqno}: ❌ Invalid signature")
+            all_valid = False
+    
+    last_covered = max(seqno for seqno, _, _ in checkpoints)
+    if transcript.get_last_seq() is not None and last_covered < transcript.get_last_seq():
+        print(f"   ⚠️  Messages after seqno {last_covered} are not covered by a checkpoint")
+    
+    if all_valid:
+        print("\n✅ All checkpoints are valid!")
+    else:
+        print("\n❌ Some checkpoints are invalid!")
+    
+    return all_valid
+
+
 def test_transcript_modification(transcript_file: str):
     """Test that transcript modification breaks verification."""
     print("\n" + "=" * 60)
@@ -217,11 +292,14 @@ def test_transcript_modification(transcript_file: str):
     original_hash = transcript.compute_transcript_hash()
     print(f"   ✓ Original hash: {original_hash}")
     
-    # Modify transcript
+    # Modify a copy of the transcript file (the hash is computed as entries load)
     print(f"\n2. Modifying transcript...")
-    modified_transcript = Transcript(transcript_file)
-    modified_transcript.entries.append("999|9999999999999|fake_ciphertext|fake_signature|fake_fingerprint")
-    modified_hash = modified_transcript.compute_transcript_hash()
+    with tempfile.TemporaryDirectory() as tmp:
+        modified_file = os.path.join(tmp, os.path.basename(transcript_file))
+        shutil.copyfile(transcript_file, modified_file)
+        with open(modified_file, 'a') as f:
+            f.write("999|9999999999999|fake_ciphertext|fake_signature|fake_fingerprint\n")
+        modified_hash = Transcript(modified_file).compute_transcript_hash()
     print(f"   ✓ Modified hash: {modified_hash}")
     
     # Verify hash changed
@@ -236,13 +314,63 @@ def test_transcript_modification(transcript_file: str):
         return False
 
 
+def prove_seq(transcript_file: str, seqno: int, receipt_file: str = None, workers: int = 0, proof_out: str = None):
+    """Build the Merkle inclusion proof for one message and check it against the receipt's root."""
+    print("\n" + "=" * 60)
+    print("Merkle Inclusion Proof")
+    print("=" * 60)
+    
+    print(f"\n1. Building Merkle tree over: {transcript_file}")
+    transcript = Transcript(transcript_file, streaming=True, merkle=True)
+    proof = transcript.merkle_proof(seqno, workers=workers)
+    if proof is None:
+        print(f"❌ ERROR: No entry with seqno {seqno}")
+        return False
+    print(f"   ✓ Entry {proof.index} of {proof.size} (seqno={seqno})")
+    print(f"   ✓ Root: {proof.root.hex()}")
+    print(f"   ✓ Proof: {len(proof.path)} hash(es)")
+    for node in proof.path:
+        print(f"      {node.hex()}")
+    
+    if proof_out:
+        with open(proof_out, 'w') as f:
+            json.dump(proof.to_dict(), f, indent=2)
+        print(f"   ✓ Proof written to: {proof_out}")
+    
+    # Only the entry, the path and the signed root are needed from here on
+    root = proof.root.hex()
+    if receipt_file:
+        with open(receipt_file, 'r') as f:
+            receipt = json.load(f)
+        if not receipt.get('merkle_root'):
+            print("❌ ERROR: Receipt has no Merkle root (session ran without TRANSCRIPT_MERKLE)")
+            return False
+        if receipt.get('merkle_size') != proof.size:
+            print(f"❌ ERROR: Receipt covers {receipt.get('merkle_size')} entries, transcript has {proof.size}")
+            return False
+        root = receipt['merkle_root']
+        print(f"\n2. Checking proof against receipt root: {root}")
+    else:
+        print("\n2. Checking proof against transcript root (no receipt given)")
+    
+    if proof.verify(root):
+        print(f"   ✅ Entry seqno={seqno} is included")
+        return True
+    print("   ❌ Inclusion proof does not match the root")
+    return False
+
+
 def main():
     parser = argparse.ArgumentParser(description="Verify transcript and session receipt")
     parser.add_argument("--transcript", type=str, help="Transcript file path")
     parser.add_argument("--receipt", type=str, help="Receipt file path (JSON)")
     parser.add_argument("--cert", type=str, help="Certificate file path")
     parser.add_argument("--verify-messages", action="store_true", help="Verify each message signature")
+    parser.add_argument("--verify-checkpoints", action="store_true", help="Verify hash chain checkpoints (hmac integrity mode)")
     parser.add_argument("--test-modification", action="store_true", help="Test transcript modification")
+    parser.add_argument("--prove-seq", type=int, help="Build and check a Merkle inclusion proof for this seqno")
+    parser.add_argument("--proof-out", type=str, help="Write the inclusion proof (JSON) to this file")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes for building Merkle trees")
     
     args = parser.parse_args()
     
@@ -265,7 +393,12 @@ def main():
     
     # Verify receipt if provided
     if args.receipt and args.cert:
-        if not verify_receipt(args.receipt, transcript_hash, args.cert):
+        if not verify_receipt(args.receipt, transcript_hash, args.cert, args.transcript, args.workers):
+            return 1
+    
+    # Prove one message's inclusion if requested
+    if args.prove_seq is not None:
+        if not prove_seq(args.transcript, args.prove_seq, args.receipt, args.workers, args.proof_out):
             return 1
     
     # Verify message signatures if requested
@@ -276,6 +409,14 @@ def main():
         if not verify_message_signature(args.transcript, args.cert):
             return 1
     
+    # Verify checkpoints if requested
+    if args.verify_checkpoints:
+        if not args.cert:
+            print("❌ ERROR: Certificate file required for checkpoint verification")
+            return 1
+        if not verify_checkpoints(args.transcript, args.cert):
+            return 1
+    
     # Test transcript modification if requested
     if args.test_modification:
         if not test_transcript_modification(args.transcript):